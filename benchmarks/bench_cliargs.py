@@ -0,0 +1,95 @@
+"""Memory and repeated-parse benchmark for ``CliArgs`` and the parse cache.
+
+Compares the memory held per parsed invocation against the previous mutable
+``@dataclass`` layout, and the latency of parsing the same argv repeatedly
+with and without :func:`rcli.parser.enable_parse_cache`.
+
+Usage::
+
+    python benchmarks/bench_cliargs.py [--count 1000000]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from rcli import parser  # noqa: E402
+
+ARGV = ["prog", "--verbose", "deploy", "service", "--region=eu", "-f", "a", "b"]
+
+
+@dataclass
+class MutableCliArgs:
+    """The layout CliArgs had before it became frozen and slotted."""
+    program: str = ""
+    global_options: Dict[str, str] = field(default_factory=dict)
+    global_flags: Set[str] = field(default_factory=set)
+    command: str = ""
+    subcommands: List[str] = field(default_factory=list)
+    local_options: Dict[str, str] = field(default_factory=dict)
+    local_flags: Set[str] = field(default_factory=set)
+    positionals: List[str] = field(default_factory=list)
+    context_args: List[str] = field(default_factory=list)
+
+
+def as_mutable(parsed):
+    return MutableCliArgs(
+        parsed.program, dict(parsed.global_options), set(parsed.global_flags),
+        parsed.command, list(parsed.subcommands), dict(parsed.local_options),
+        set(parsed.local_flags), list(parsed.positionals), list(parsed.context_args),
+    )
+
+
+def bytes_per_instance(make, n=100_000):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [make() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return (after - before) / n
+
+
+def time_parses(count):
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(count):
+            parser.parse_args(ARGV)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--count", type=int, default=1_000_000)
+    opts = ap.parse_args(argv)
+
+    parsed = parser.parse_args(ARGV)
+    old_mem = bytes_per_instance(lambda: as_mutable(parsed))
+    new_mem = bytes_per_instance(lambda: parser.parse_args(ARGV))
+    print(f"memory per invocation: mutable {old_mem:.0f} B, "
+          f"frozen/slots {new_mem:.0f} B")
+
+    parser.disable_parse_cache()
+    uncached = time_parses(opts.count)
+    parser.enable_parse_cache()
+    cached = time_parses(opts.count)
+    info = parser.parse_cache_info()
+    parser.disable_parse_cache()
+    print(f"{opts.count} parses: uncached {uncached * 1e9 / opts.count:.0f} ns/parse, "
+          f"cached {cached * 1e9 / opts.count:.0f} ns/parse "
+          f"({info.hits} hits, {info.misses} misses)")
+    return 0 if new_mem < old_mem and cached < uncached else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
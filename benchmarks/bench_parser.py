@@ -0,0 +1,96 @@
+"""Scaling benchmark for ``rcli.parser.parse_args``.
+
+Times ``parse_args`` over synthetic argv lists from 10 to 1,000,000 tokens and
+prints the cost per token. With a linear parser the per-token figure stays
+flat as the argv grows.
+
+Usage::
+
+    python benchmarks/bench_parser.py [--max 1000000] [--repeat 5] [--shape repeated]
+
+``--shape repeated`` passes the same ``--include`` option for every token,
+which exercises accumulation of repeated option values.
+"""
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from rcli.parser import parse_args  # noqa: E402
+
+# A mix of every token class the parser knows about. Option names are made
+# unique per position so repeated-option joining does not skew the result.
+SHAPES = (
+    lambda i: f"--opt{i}={i}",
+    lambda i: f"--flag{i}",
+    lambda i: "-abc",
+    lambda i: f"/ctx/{i}",
+    lambda i: f"file{i}.txt",
+    lambda i: f"-x{i}" if i % 2 else "-v",
+    lambda i: f"pos{i}",
+)
+
+
+def make_argv(n_tokens, shape="mixed"):
+    argv = ["prog", "cmd", "sub"]
+    if shape == "repeated":
+        argv.extend(f"--include=dir{i}" for i in range(max(n_tokens - 2, 0)))
+    else:
+        argv.extend(SHAPES[i % len(SHAPES)](i) for i in range(max(n_tokens - 2, 0)))
+    return argv
+
+
+def time_parse(argv, repeat):
+    best = float("inf")
+    # Like timeit, keep the cyclic GC out of the measurement.
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse_args(argv)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--max", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--shape", choices=("mixed", "repeated"), default="mixed")
+    ap.add_argument("--tolerance", type=float, default=3.0,
+                    help="max allowed ratio between the slowest and fastest "
+                         "per-token cost")
+    opts = ap.parse_args(argv)
+
+    sizes = []
+    n = 10
+    while n <= opts.max:
+        sizes.append(n)
+        n *= 10
+
+    print(f"{'tokens':>10} {'total ms':>12} {'ns/token':>10}")
+    per_token = []
+    for size in sizes:
+        tokens = make_argv(size, opts.shape)
+        elapsed = time_parse(tokens, opts.repeat)
+        ns = elapsed * 1e9 / (len(tokens) - 1)
+        per_token.append(ns)
+        print(f"{size:>10} {elapsed * 1e3:>12.3f} {ns:>10.1f}")
+
+    # Ignore the smallest size: fixed call overhead dominates at 10 tokens.
+    steady = per_token[1:] or per_token
+    ratio = max(steady) / min(steady)
+    print(f"per-token spread (>=100 tokens): {ratio:.2f}x")
+    if ratio > opts.tolerance:
+        print("parse_args does not scale linearly")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
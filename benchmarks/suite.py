@@ -0,0 +1,279 @@
+"""Regression benchmark suite for the rCli hot paths.
+
+Each case is timed best-of-``--repeat`` with the cyclic GC disabled and
+reported in nanoseconds per operation:
+
+* ``parse/*``: ``parse_args`` over short, typical, long and repeated-option argv
+* ``reconstruct/roundtrip``: ``reconstruct_args`` followed by a re-parse
+* ``registry/*``: ``CommandRegistry.register`` and ``get`` at 10,000 commands
+* ``meta/*``: ``CommandMeta`` class creation with hundreds of subcommands
+* ``import/*``: ``auto_import_subcommands`` over a generated tree of 1,000 modules,
+  scanning every module and through a warm manifest
+
+Results are compared against ``benchmarks/baselines.json``; a case slower than
+``--threshold`` times its baseline fails the run with exit code 1. Baselines
+are machine specific, so refresh them on the machine that runs the check::
+
+    python benchmarks/suite.py --save
+    python benchmarks/suite.py [--threshold 1.3] [--only parse/] [--repeat 7]
+"""
+import argparse
+import contextlib
+import gc
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from rcli.commands import (CommandHandler, auto_import_subcommands,  # noqa: E402
+                           subcommand)
+from rcli.parser import disable_parse_cache, parse_args, reconstruct_args  # noqa: E402
+from rcli.registry import CommandRegistry  # noqa: E402
+
+BASELINES = Path(__file__).resolve().with_name("baselines.json")
+
+N_COMMANDS = 10_000
+N_SUBCOMMANDS = 300
+N_MODULES = 1_000
+
+ARGV = {
+    "short": ["prog", "ping"],
+    "typical": ["prog", "--verbose", "deploy", "service", "--region=eu", "-f", "--tag",
+                "a", "b", "c"],
+    "context": ["prog", "/ctx", "?#42", "deploy", "-abc", "--dry-run", "target"],
+    "long": ["prog", "cmd", "sub"] + [
+        t for i in range(250) for t in (f"--opt{i}={i}", f"pos{i}", "-v", f"/c{i}")],
+    "repeated": ["prog", "build"] + [f"--include=dir{i}" for i in range(1000)],
+}
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], None]
+    setup: Optional[Callable[[], None]] = None
+    number: int = 1  # operations per timed run(); the result is divided by it
+
+
+def measure(case: Case, repeat: int) -> float:
+    """Best nanoseconds per operation over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        if case.setup is not None:
+            case.setup()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            case.run()
+            best = min(best, time.perf_counter_ns() - start)
+        finally:
+            gc.enable()
+    return best / case.number
+
+
+def parse_cases() -> List[Case]:
+    disable_parse_cache()
+    cases = []
+    for shape, argv in ARGV.items():
+        loops = max(10_000 // len(argv), 10)
+
+        def run(argv=argv, loops=loops):
+            for _ in range(loops):
+                parse_args(argv)
+        cases.append(Case(f"parse/{shape}", run, number=loops))
+
+    # Global options are written after the command by reconstruct_args, so
+    # round-trip only the local part.
+    parsed = parse_args(["prog", "deploy", "service", "--region=eu", "--tag=a",
+                         "--tag=b", "--force", "x", "y"])
+
+    def roundtrip():
+        for _ in range(1000):
+            again = parse_args(["prog", *reconstruct_args(parsed)])
+            assert again.local_options == parsed.local_options
+    cases.append(Case("reconstruct/roundtrip", roundtrip, number=1000))
+    return cases
+
+
+def registry_cases() -> List[Case]:
+    registry = CommandRegistry()
+    names = [f"cmd{i}" for i in range(N_COMMANDS)]
+    handler = lambda args, ctx=None: None  # noqa: E731
+
+    def register():
+        for name in names:
+            registry.register(handler, name)
+
+    def get():
+        for name in names:
+            registry.get(name)
+
+    def fill():
+        registry.__init__()
+        register()
+    return [
+        Case("registry/register_10k", register, setup=registry.__init__,
+             number=N_COMMANDS),
+        Case("registry/get_10k", get, setup=fill, number=N_COMMANDS),
+    ]
+
+
+def meta_cases() -> List[Case]:
+    def make_body():
+        body = {}
+        for i in range(N_SUBCOMMANDS):
+            body[f"sub{i}"] = subcommand(f"sub{i}")(lambda self, args, ctx=None: None)
+        return body
+    bodies = []
+
+    def prepare():
+        bodies[:] = [make_body() for _ in range(10)]
+
+    def create():
+        for body in bodies:
+            type("Big", (CommandHandler,), body)
+    return [Case(f"meta/class_{N_SUBCOMMANDS}_subcommands", create, setup=prepare,
+                 number=10)]
+
+
+def import_cases(root: Path) -> List[Case]:
+    package = root / "bench_cmds"
+    for group in range(N_MODULES // 100):
+        sub = package / f"g{group}"
+        sub.mkdir(parents=True)
+        (sub / "__init__.py").write_text("")
+        for i in range(100):
+            n = group * 100 + i
+            (sub / f"m{n}.py").write_text(
+                "from rcli.commands import CommandHandler, cog, subcommand\n"
+                f"@cog('c{n}')\n"
+                f"class C{n}(CommandHandler):\n"
+                "    def run(self, args, ctx=None):\n"
+                "        return None\n"
+                "    @subcommand('list')\n"
+                "    def list(self, args, ctx=None):\n"
+                "        return []\n"
+            )
+    (package / "__init__.py").write_text("")
+
+    def forget():
+        CommandRegistry().__init__()
+        for name in [m for m in sys.modules
+                     if m == "bench_cmds" or m.startswith("bench_cmds.")]:
+            del sys.modules[name]
+        importlib.invalidate_caches()
+
+    def scan():
+        # auto_import_subcommands reports each module on stdout.
+        with contextlib.redirect_stdout(io.StringIO()):
+            auto_import_subcommands("bench_cmds")
+
+    def warm_manifest():
+        forget()
+        auto_import_subcommands("bench_cmds", use_manifest=True)
+        forget()
+
+    def manifest():
+        auto_import_subcommands("bench_cmds", use_manifest=True)
+    return [
+        Case(f"import/scan_{N_MODULES}_modules", scan, setup=forget),
+        Case(f"import/manifest_{N_MODULES}_modules", manifest, setup=warm_manifest),
+    ]
+
+
+def run_suite(only: Optional[str], repeat: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    cwd = os.getcwd()
+    root = Path(tempfile.mkdtemp(prefix="rcli-bench-"))
+    registry = CommandRegistry()
+    saved = (registry._commands, registry._lazy, registry.version)
+    try:
+        os.chdir(root)
+        sys.path.insert(0, str(root))
+        cases = parse_cases() + registry_cases() + meta_cases()
+        if only is None or "import/".startswith(only) or only.startswith("import/"):
+            cases += import_cases(root)
+        for case in cases:
+            if only is not None and not case.name.startswith(only):
+                continue
+            results[case.name] = measure(case, repeat)
+            print(f"{case.name:<32} {results[case.name]:>14.1f} ns/op", flush=True)
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(str(root))
+        shutil.rmtree(root, ignore_errors=True)
+        registry.__init__()
+        registry._commands, registry._lazy, registry.version = saved
+    return results
+
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "system": platform.system()}
+
+
+def compare(results: Dict[str, float], baseline: dict, threshold: float) -> List[str]:
+    """Names of the cases slower than ``threshold`` times their baseline."""
+    if baseline.get("environment") != environment():
+        print(f"warning: baselines were recorded on {baseline.get('environment')}, "
+              f"this is {environment()}")
+    regressions = []
+    print(f"\n{'case':<32} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, current in results.items():
+        before = baseline.get("cases", {}).get(name)
+        if before is None:
+            print(f"{name:<32} {'-':>12} {current:>12.1f} {'new':>7}")
+            continue
+        ratio = current / before
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<32} {before:>12.1f} {current:>12.1f} {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only",
+                    help="run only the cases whose name starts with this prefix")
+    ap.add_argument("--threshold", type=float, default=1.3,
+                    help="fail when a case is slower than this multiple of its "
+                         "baseline")
+    ap.add_argument("--baselines", type=Path, default=BASELINES)
+    ap.add_argument("--save", action="store_true",
+                    help="record the results as the new baselines")
+    opts = ap.parse_args(argv)
+
+    results = run_suite(opts.only, opts.repeat)
+    if opts.save:
+        stored = {"environment": environment(), "cases": {}}
+        if opts.baselines.exists():
+            stored["cases"] = json.loads(opts.baselines.read_text()).get("cases", {})
+        stored["cases"].update({name: round(ns, 1) for name, ns in results.items()})
+        opts.baselines.write_text(json.dumps(stored, indent=1, sort_keys=True) + "\n")
+        print(f"saved {len(results)} baselines to {opts.baselines}")
+        return 0
+    if not opts.baselines.exists():
+        print(f"no baselines at {opts.baselines}; run with --save first")
+        return 1
+    baselines = json.loads(opts.baselines.read_text())
+    regressions = compare(results, baselines, opts.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed beyond {opts.threshold}x: "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
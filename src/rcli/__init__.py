@@ -1,6 +1,8 @@
+import os
 import sys
-import logging
-import sys
+from time import perf_counter_ns, process_time_ns
+
+_import_started = (perf_counter_ns(), process_time_ns())
 
 #from rcli import __version__
 
@@ -8,46 +10,214 @@ __author__ = "rrenode"
 __copyright__ = "rrenode"
 __license__ = "MIT"
 
-_logger = logging.getLogger(__name__)
+# Importing rcli stays cheap: submodules, their public names and __version__
+# are only loaded on first attribute access (see __getattr__ below). Scripts
+# that invoke the CLI thousands of times pay for what they use.
+_LAZY_ATTRS = {
+    "CommandRegistry": "registry",
+    "Dispatcher": "dispatch",
+    "auto_import_subcommands": "commands",
+    "parse_args": "parser",
+}
+_SUBMODULES = frozenset({
+    "aio", "argfile", "batch", "cache", "client", "commands", "completion", "config",
+    "context", "daemon", "dispatch", "fanout", "freeze", "help", "manifest", "parser",
+    "pipeline", "profiling", "registry", "reload", "resolver", "schema", "shell",
+})
+
+def _resolve_version():
+    if sys.version_info[:2] >= (3, 8):
+        # TODO: Import directly (no need for conditional) when
+        # `python_requires = >= 3.8`
+        from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
+    else:
+        from importlib_metadata import PackageNotFoundError, version  # pragma: no cover
 
-if sys.version_info[:2] >= (3, 8):
-    # TODO: Import directly (no need for conditional) when `python_requires = >= 3.8`
-    from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
-else:
-    from importlib_metadata import PackageNotFoundError, version  # pragma: no cover
+    try:
+        # Change here if project is renamed and does not equal the package name
+        dist_name = "rCli"
+        return version(dist_name)
+    except PackageNotFoundError:  # pragma: no cover
+        return "unknown"
 
-try:
-    # Change here if project is renamed and does not equal the package name
-    dist_name = "rCli"
-    __version__ = version(dist_name)
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "unknown"
-finally:
-    del version, PackageNotFoundError
+def __getattr__(name):
+    if name == "__version__":
+        value = _resolve_version()
+    elif name == "_logger":
+        import logging
+        value = logging.getLogger(__name__)
+    elif name in _LAZY_ATTRS:
+        value = getattr(__getattr__(_LAZY_ATTRS[name]), name)
+    elif name in _SUBMODULES:
+        import importlib
+        value = importlib.import_module(f"{__name__}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
-from .registry import CommandRegistry
-from .commands import auto_import_subcommands
-from .parser import parse_args
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | _SUBMODULES | {"__version__"})
 
 class rCli:
-    def __init__(self, auto_import=False):
-        if auto_import:
-            raise NotImplementedError("pph help not yet implemented.")
-            auto_import_subcommands("commands")
-        self.registry = CommandRegistry()
-        self.raw_args = sys.argv
+    def __init__(self, auto_import=False, argfiles=False, registry=None, config=None,
+                 argv=None, dispatcher=None):
+        from .registry import CommandRegistry
+        if registry is None and dispatcher is not None:
+            registry = dispatcher.registry
+        # The process-wide registry unless the application brings its own.
+        self.registry = registry if registry is not None else CommandRegistry()
+        if dispatcher is not None:
+            # An already compiled Dispatcher, e.g. the warm one in rcli.daemon.
+            self._dispatcher = dispatcher
+        # auto_import is True for the "commands" directory, or a directory name.
+        self.commands_dir = ("commands" if auto_import is True else auto_import) or None
+        if self.commands_dir:
+            # Lazily, via the manifest: only the dispatched command's module
+            # is imported, and --help imports none.
+            from .commands import auto_import_subcommands
+            auto_import_subcommands(self.commands_dir, use_manifest=True,
+                                    registry=self.registry)
+        self.raw_args = sys.argv if argv is None else argv
+        self.argfiles = argfiles
+        # True for the default rcli.config.LayeredConfig, or a LayeredConfig.
+        self.config = config
+        self.profiler = None
         self.__parse__()
-    
+
     @property
     def commands(self):
+        """Read-only view of every registered handler; taking it copies nothing."""
         return self.registry.all_commands()
-    
+
     @commands.setter
     def commands(self, value):
-        raise Exception("Do not set the commands for rCli. Instead use rCli().register_command(handler, name) or alternitively register with rCli.CommandRegistry().register(handler, name)")
-    
+        raise Exception("Do not set the commands for rCli. Instead use "
+                        "rCli().register_command(handler, name) or alternitively "
+                        "register with rCli.CommandRegistry().register(handler, name)")
+
     def register_command(self, handler, name):
         self.registry.register(handler, name)
-    
+
+    @property
+    def dispatcher(self):
+        dispatcher = self.__dict__.get("_dispatcher")
+        if dispatcher is None:
+            from .dispatch import Dispatcher
+            dispatcher = self._dispatcher = Dispatcher(self.registry)
+        return dispatcher
+
+    def dispatch(self, ctx=None):
+        """Run the handler for the parsed arguments and return its result.
+
+        ``--help``, ``-h`` or ``help`` print help instead; see :meth:`help`.
+        With ``--rcli-profile=FORMAT`` the phase timings are reported once the
+        handler returns; see :mod:`rcli.profiling`. An argv with ``|`` tokens
+        runs as a pipeline and returns an iterator over the last stage's
+        records; see :mod:`rcli.pipeline`.
+        """
+        if self.profiler is None:
+            return self._dispatch(ctx)
+        try:
+            result = self._dispatch(ctx)
+        except BaseException:
+            self._report_profile()
+            raise
+        if self.stages is not None and result is not None:
+            # The stages only run as the records are pulled.
+            return self._profiled(result)
+        self._report_profile()
+        return result
+
+    def _dispatch(self, ctx):
+        from .help import help_path
+        path = help_path(self.args, self.registry)
+        if path is not None:
+            return self.help(path)
+        if self.stages is not None:
+            from .pipeline import Pipeline
+            return Pipeline(self.stages, self.dispatcher).run(ctx=ctx)
+        return self.dispatcher.dispatch(self.args, ctx)
+
+    def _profiled(self, records):
+        try:
+            yield from records
+        finally:
+            self._report_profile()
+
+    def _report_profile(self):
+        from . import profiling
+        if profiling.active is self.profiler:
+            profiling.stop()
+        self.profiler.report()
+
+    def help(self, path=(), stream=None):
+        """Print help for the command at ``path`` (every command when empty), paged.
+
+        Rendered from the command manifest and the loaded handlers, so no
+        command module is imported; see :mod:`rcli.help`.
+        """
+        from .help import HelpModel, page
+        manifest = None
+        if self.commands_dir:
+            from .manifest import CommandManifest, manifest_path
+            manifest = CommandManifest.load(manifest_path(self.commands_dir))
+        program = os.path.basename(self.args.program) or "rcli"
+        model = HelpModel.from_registry(self.registry, manifest)
+        page(model.render(path, program), stream)
+
+    def batch(self, source, **kwargs):
+        """Dispatch every command line in ``source``; see
+        :func:`rcli.batch.run_batch`.
+        """
+        from .batch import run_batch
+        return run_batch(source, self.dispatcher, program=self.args.program, **kwargs)
+
+    def shell(self, **kwargs):
+        """Run an interactive shell over the loaded commands; see :mod:`rcli.shell`."""
+        from .shell import Shell
+        Shell(self.dispatcher, program=self.args.program, **kwargs).run()
+
+    def _parse_argv(self):
+        """The parsed argv, one CliArgs per stage of a pipeline."""
+        from .parser import parse_args
+        argv = self.raw_args
+        if "|" in argv[1:]:
+            from .pipeline import split_pipeline
+            return [parse_args([argv[0], *stage]) for stage in split_pipeline(argv[1:])]
+        if self.argfiles:
+            from .argfile import expand_argfiles, has_argfiles
+            if has_argfiles(argv):
+                # Stream @file arguments through to the handler; see rcli.argfile.
+                from .parser import parse_stream
+                return [parse_stream(expand_argfiles(argv), lazy_positionals=True)]
+        return [parse_args(argv)]
+
+    def _layered_config(self):
+        if self.config is True:
+            from .config import LayeredConfig
+            self.config = LayeredConfig()
+        return self.config
+
     def __parse__(self):
-        self.args = parse_args(self.raw_args)
\ No newline at end of file
+        from . import profiling
+        with profiling.startup_phase("parse_args", "parse"):
+            stages = self._parse_argv()
+        if self.config:
+            with profiling.startup_phase("config", "config"):
+                config = self._layered_config()
+                stages = [config.apply(args) for args in stages]
+        for i, args in enumerate(stages):
+            if (profiling.PROFILE_OPTION in args.global_options
+                    or profiling.PROFILE_OPTION in args.global_flags):
+                profiler, stages[i] = profiling.start_from_args(args)
+                self.profiler = self.profiler or profiler
+        self.args = stages[0]
+        # Every stage of a pipeline (argv with "|" tokens), else None.
+        self.stages = stages if len(stages) > 1 else None
+
+_import_stamps = (_import_started[0], perf_counter_ns(),
+                  _import_started[1], process_time_ns())
+if os.environ.get("RCLI_PROFILE"):
+    from .profiling import start_from_environment
+    start_from_environment()
@@ -0,0 +1,146 @@
+"""asyncio support for ``async def`` handlers and subcommands.
+
+Coroutines returned by a handler are run on one event loop that the
+:class:`LoopRunner` keeps alive in a background thread for the life of the
+process. Because the loop outlives a single dispatch, pooled resources such
+as connections are reused across calls::
+
+    dispatcher.resources.register("db", create_pool, close=lambda pool: pool.close())
+
+    @cog("users")
+    class Users(CommandHandler):
+        async def run(self, args, ctx=None):
+            pool = await resource("db")
+            ...
+"""
+import asyncio
+import atexit
+import contextvars
+import inspect
+import os
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+class AsyncResources:
+    """Named async resources, created on first use and shared by every handler."""
+    def __init__(self):
+        self._factories: Dict[str, Tuple[Callable, Optional[Callable]]] = {}
+        self._instances: Dict[str, object] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def register(self, name: str, factory: Callable,
+                 close: Optional[Callable] = None) -> None:
+        """``factory()`` (sync or async) builds the resource; ``close(resource)``
+        tears it down.
+        """
+        self._factories[name] = (factory, close)
+
+    async def get(self, name: str):
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._factories:
+            raise KeyError(f"No async resource registered as '{name}'")
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name not in self._instances:
+                value = self._factories[name][0]()
+                if inspect.isawaitable(value):
+                    value = await value
+                self._instances[name] = value
+        return self._instances[name]
+
+    async def aclose(self) -> None:
+        while self._instances:
+            name, value = self._instances.popitem()
+            close = self._factories[name][1]
+            if close is not None:
+                result = close(value)
+                if inspect.isawaitable(result):
+                    await result
+
+_current_resources: contextvars.ContextVar = contextvars.ContextVar("rcli_resources")
+
+async def resource(name: str):
+    """The shared resource ``name`` for the running invocation."""
+    return await _current_resources.get().get(name)
+
+class LoopRunner:
+    """Runs coroutines on a persistent event loop in a daemon thread.
+
+    Safe to call from any thread except the loop's own; code already running
+    on the loop should use :meth:`rcli.dispatch.Dispatcher.dispatch_async`.
+    """
+    def __init__(self):
+        self.resources = AsyncResources()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._fork_hook = False
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever,
+                                                    name="rcli-event-loop", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+                    atexit.register(self.close)
+                    if not self._fork_hook and hasattr(os, "register_at_fork"):
+                        os.register_at_fork(after_in_child=self._after_fork)
+                        self._fork_hook = True
+        return self._loop
+
+    def _after_fork(self) -> None:
+        # The loop thread does not survive fork() and pooled connections must
+        # not be shared with the parent: start over with the same factories.
+        self._loop = self._thread = None
+        self._lock = threading.Lock()
+        resources, self.resources = self.resources, AsyncResources()
+        self.resources._factories = dict(resources._factories)
+
+    async def _with_resources(self, awaitable: Awaitable):
+        _current_resources.set(self.resources)
+        return await awaitable
+
+    def run(self, awaitable: Awaitable):
+        """Run ``awaitable`` on the managed loop and return its result."""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(
+                "LoopRunner.run() called from the event loop thread; await instead")
+        future = asyncio.run_coroutine_threadsafe(self._with_resources(awaitable), loop)
+        return future.result()
+
+    def gather(self, calls: Iterable[Tuple[Callable, tuple]]) -> List[object]:
+        """Run every ``func(*args)`` concurrently; sync ones on the loop's thread
+        pool.
+        """
+        async def fan_out():
+            loop = asyncio.get_running_loop()
+            pending = []
+            for func, args in calls:
+                if inspect.iscoroutinefunction(func):
+                    pending.append(func(*args))
+                else:
+                    # A context can only be entered by one thread at a time.
+                    ctx = contextvars.copy_context()
+                    pending.append(loop.run_in_executor(None, ctx.run, func, *args))
+            results = await asyncio.gather(*pending)
+            # Sync handlers may still hand back a coroutine.
+            return [await r if inspect.isawaitable(r) else r for r in results]
+        return self.run(fan_out())
+
+    def close(self) -> None:
+        """Close the shared resources and stop the loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.resources.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        atexit.unregister(self.close)
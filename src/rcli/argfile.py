@@ -0,0 +1,112 @@
+"""Response files: ``@path`` in argv stands for the arguments listed in a file.
+
+For argument lists beyond ``ARG_MAX``, write one argument per line (or
+NUL-separated, as ``find -print0`` does) and pass the file instead::
+
+    find /data -name '*.csv' -print0 > targets
+    mycli ingest --workers 8 @targets
+    find /data -name '*.csv' | mycli ingest @-      # "@-" reads stdin
+
+Files are memory-mapped and split in place, stdin is read in fixed-size
+chunks, and arguments are yielded one at a time, so a file with millions of
+paths is never held in memory as a list. Combine with
+:func:`rcli.parser.parse_stream` to hand them to the handler lazily::
+
+    args = parse_stream(expand_argfiles(sys.argv), lazy_positionals=True)
+
+``@name`` is only expanded when ``name`` is an existing file (or ``-``);
+otherwise the token is left alone, so ``@alias`` command queries keep
+working. Argument files are not expanded recursively.
+"""
+import mmap
+import os
+import sys
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+PREFIX = "@"
+STDIN = "-"
+
+# How much of a file is checked for NUL bytes to pick the separator, and
+# the read size for stdin.
+_SNIFF_SIZE = 64 * 1024
+_CHUNK_SIZE = 1024 * 1024
+
+def is_argfile(token: str, prefix: str = PREFIX) -> bool:
+    """Whether ``token`` names an argument file to expand."""
+    if not token.startswith(prefix) or len(token) == len(prefix):
+        return False
+    path = token[len(prefix):]
+    return path == STDIN or os.path.isfile(path)
+
+def _decode(raw: bytes, sep: bytes) -> Optional[str]:
+    if sep == b"\n" and raw.endswith(b"\r"):
+        raw = raw[:-1]
+    # Undecodable bytes survive as surrogates, as in sys.argv itself.
+    return os.fsdecode(raw) if raw else None
+
+def _split_mapped(data: mmap.mmap, sep: Optional[bytes]) -> Iterator[str]:
+    if sep is None:
+        sep = b"\0" if data.find(b"\0", 0, _SNIFF_SIZE) != -1 else b"\n"
+    start, size = 0, len(data)
+    while start < size:
+        end = data.find(sep, start)
+        if end == -1:
+            end = size
+        arg = _decode(data[start:end], sep)
+        if arg is not None:
+            yield arg
+        start = end + 1
+
+def _split_stream(stream: BinaryIO, sep: Optional[bytes]) -> Iterator[str]:
+    pending = b""
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        if sep is None:
+            sep = b"\0" if b"\0" in chunk else b"\n"
+        *complete, pending = (pending + chunk).split(sep)
+        for raw in complete:
+            arg = _decode(raw, sep)
+            if arg is not None:
+                yield arg
+    arg = _decode(pending, sep or b"\n")
+    if arg is not None:
+        yield arg
+
+def read_argfile(path: str, sep: Optional[bytes] = None) -> Iterator[str]:
+    """Yield the arguments in ``path`` (``"-"`` for stdin) one at a time.
+
+    Arguments are separated by ``sep``; by default by NUL when the start of
+    the input contains one and by newlines otherwise. Empty entries are
+    skipped and a trailing ``\\r`` is dropped from newline-separated ones.
+    """
+    if path == STDIN:
+        yield from _split_stream(sys.stdin.buffer, sep)
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from _split_mapped(data, sep)
+
+def expand_argfiles(argv: Iterable[str], prefix: str = PREFIX) -> Iterator[str]:
+    """Yield ``argv`` with every ``@file`` token replaced by the file's arguments.
+
+    The first token is the program name and never expanded.
+    """
+    argv = iter(argv)
+    program = next(argv, None)
+    if program is None:
+        return
+    yield program
+    for token in argv:
+        if is_argfile(token, prefix):
+            yield from read_argfile(token[len(prefix):])
+        else:
+            yield token
+
+def has_argfiles(argv: Iterable[str], prefix: str = PREFIX) -> bool:
+    """Whether any token after the program name is an argument file."""
+    return any(is_argfile(token, prefix) for token in islice(argv, 1, None))
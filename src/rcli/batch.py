@@ -0,0 +1,210 @@
+"""Run many command lines in one process.
+
+Each non-blank line of the input is tokenised with :func:`shlex.split`,
+parsed with :func:`~rcli.parser.parse_args` and dispatched in-process,
+sequentially or on a thread or process pool::
+
+    python -m rcli.batch --commands commands --mode thread --workers 8 jobs.txt
+    generate-jobs | python -m rcli.batch --commands commands --unordered -
+"""
+import argparse
+import os
+import shlex
+import sys
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from functools import partial
+from itertools import islice
+from types import GeneratorType
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .commands import auto_import_subcommands
+from .dispatch import Dispatcher
+from .parser import parse_args
+from .registry import CommandRegistry
+
+MODES = ("sequential", "thread", "process")
+
+Line = Tuple[int, str]
+
+class BatchResult(NamedTuple):
+    lineno: int
+    line: str
+    result: object = None
+    error: Optional[str] = None
+    # What a streaming handler (a generator, e.g. rcli.fanout) yielded, in
+    # order; ``result`` is None then.
+    records: Optional[List[object]] = None
+
+def iter_command_lines(source: Iterable[str]) -> Iterator[Line]:
+    """Number the lines of ``source`` (from 1) and drop blank ones."""
+    for lineno, line in enumerate(source, 1):
+        line = line.strip()
+        if line:
+            yield lineno, line
+
+def execute_line(dispatcher: Dispatcher, program: str, lineno: int,
+                 line: str) -> BatchResult:
+    """Dispatch one command line; a failure is recorded rather than raised."""
+    try:
+        args = parse_args([program, *shlex.split(line)])
+        result = dispatcher.dispatch(args)
+        if isinstance(result, GeneratorType):
+            # Generators run only when pulled, and do not pickle back from
+            # a process worker.
+            return BatchResult(lineno, line, records=list(result))
+        return BatchResult(lineno, line, result)
+    except Exception as e:
+        return BatchResult(lineno, line, error=f"{type(e).__name__}: {e}")
+
+def execute_chunk(dispatcher: Dispatcher, program: str,
+                  chunk: Sequence[Line]) -> List[BatchResult]:
+    return [execute_line(dispatcher, program, lineno, line) for lineno, line in chunk]
+
+# Process pool workers keep their own dispatcher over the (inherited or
+# re-imported) registry the batch was started with.
+_worker_dispatcher: Optional[Dispatcher] = None
+
+def _worker_registry_key(registry: CommandRegistry) -> Tuple[type, Optional[str]]:
+    """How a worker finds ``registry`` again: its class and
+    :meth:`~CommandRegistry.scope`.
+    """
+    if registry is CommandRegistry():
+        return type(registry), None
+    scope = registry.scope()
+    if scope is None:
+        raise ValueError("process mode needs the global registry or one from "
+                         "CommandRegistry.scoped(); other registries cannot be "
+                         "found again in a worker process")
+    return type(registry), scope
+
+def _init_worker(registry_key: Tuple[type, Optional[str]],
+                 commands_dirs: Sequence[str]) -> None:
+    global _worker_dispatcher
+    cls, scope = registry_key
+    registry = cls() if scope is None else cls.scoped(scope)
+    if not registry.names():
+        # Spawned rather than forked: nothing was inherited.
+        for commands_dir in commands_dirs:
+            auto_import_subcommands(commands_dir, registry=registry)
+    _worker_dispatcher = Dispatcher(registry)
+
+def _execute_chunk_in_worker(program: str, chunk: Sequence[Line]) -> List[BatchResult]:
+    return execute_chunk(_worker_dispatcher, program, chunk)
+
+def _chunks(lines: Iterator[Line], size: int) -> Iterator[List[Line]]:
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+def run_batch(source: Iterable[str], dispatcher: Optional[Dispatcher] = None,
+              mode: str = "sequential", workers: Optional[int] = None,
+              ordered: bool = True, max_pending: Optional[int] = None,
+              chunksize: Optional[int] = None, program: str = "rcli",
+              commands_dirs: Sequence[str] = ()) -> Iterator[BatchResult]:
+    """Dispatch every command line in ``source`` and yield a :class:`BatchResult`
+    per line.
+
+    ``source`` is read lazily, so files and stdin are streamed. In ``thread``
+    and ``process`` mode at most ``max_pending`` chunks of ``chunksize``
+    lines are in flight (default: twice the worker count), which bounds
+    memory for arbitrarily long inputs. With ``ordered=False`` results are
+    yielded as they complete instead of in input order.
+
+    Process workers use the registry of ``dispatcher``, which must be the
+    global :class:`~rcli.registry.CommandRegistry` or a
+    :meth:`~rcli.registry.CommandRegistry.scoped` one: it is inherited where
+    processes are forked, and ``commands_dirs`` are imported into it in each
+    worker otherwise.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}, not '{mode}'")
+    lines = iter_command_lines(source)
+
+    if mode == "sequential":
+        dispatcher = dispatcher or Dispatcher()
+        for lineno, line in lines:
+            yield execute_line(dispatcher, program, lineno, line)
+        return
+
+    executor: Executor
+    if mode == "thread":
+        dispatcher = dispatcher or Dispatcher()
+        dispatcher.compile()  # once, before the threads share it
+        executor = ThreadPoolExecutor(workers)
+        task = partial(execute_chunk, dispatcher, program)
+        chunksize = chunksize or 1
+    else:
+        registry = dispatcher.registry if dispatcher else CommandRegistry()
+        registry_key = _worker_registry_key(registry)
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                       initargs=(registry_key, tuple(commands_dirs)))
+        task = partial(_execute_chunk_in_worker, program)
+        # Amortise the pickling round trip over several lines.
+        chunksize = chunksize or 64
+    max_pending = max_pending or 2 * (workers or os.cpu_count() or 1)
+
+    with executor:
+        pending = deque()
+        for chunk in _chunks(lines, chunksize):
+            pending.append(executor.submit(task, chunk))
+            if len(pending) >= max_pending:
+                yield from _drain(pending, ordered)
+        while pending:
+            yield from _drain(pending, ordered)
+
+def _drain(pending: deque, ordered: bool) -> Iterator[BatchResult]:
+    """Wait for the oldest chunk (ordered) or any finished chunk and yield its
+    results.
+    """
+    if ordered:
+        yield from pending.popleft().result()
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        yield from future.result()
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rcli.batch",
+                                 description="Run command lines from a file or stdin.")
+    ap.add_argument("source",
+                    help="file with one command line per line, or - for stdin")
+    ap.add_argument("--commands", action="append", default=[],
+                    help="commands directory to import; repeatable")
+    ap.add_argument("--mode", choices=MODES, default="sequential")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--unordered", action="store_true",
+                    help="print results as they complete")
+    ap.add_argument("--max-pending", type=int, default=None)
+    ap.add_argument("--chunksize", type=int, default=None)
+    opts = ap.parse_args(argv)
+
+    for commands_dir in opts.commands:
+        auto_import_subcommands(commands_dir)
+
+    if opts.source == "-":
+        source = sys.stdin
+    else:
+        source = open(opts.source, "r", encoding="utf-8")
+    failed = False
+    with source:
+        results = run_batch(source, mode=opts.mode, workers=opts.workers,
+                            ordered=not opts.unordered, max_pending=opts.max_pending,
+                            chunksize=opts.chunksize, commands_dirs=opts.commands)
+        for res in results:
+            if res.error is not None:
+                failed = True
+                print(f"[rCli] line {res.lineno}: {res.error}", file=sys.stderr)
+            elif res.records is not None:
+                for record in res.records:
+                    print(record)
+            elif res.result is not None:
+                print(res.result)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""Opt-in result cache for idempotent commands.
+
+Mark a read-only command, ``@subcommand`` or plain handler function with
+:func:`cached` and repeated invocations with the same arguments are answered
+from the cache instead of running the handler::
+
+    @cog("report")
+    class Report(CommandHandler):
+        @cached(ttl=300)
+        def run(self, args, ctx=None):
+            return expensive_query(args.positionals)
+
+        @subcommand("rebuild")
+        @invalidates("report")
+        def rebuild(self, args, ctx=None):
+            ...
+
+The key is the handler plus :func:`~rcli.parser.reconstruct_args` of the
+invocation in canonical form, so option and flag order do not matter. The
+context args are part of the key as written, not as resolved. Results are
+kept in an in-memory LRU tier in front of a directory of pickles
+(``$RCLI_CACHE_DIR``, else ``$XDG_CACHE_HOME/rcli/results``, else
+``~/.cache/rcli/results``), which also serves later processes. Both tiers
+expire entries after ``ttl`` seconds and are bounded in entries.
+
+Not cached: iterators and generators (they can only be consumed once),
+pipeline stages with ``args.input`` and lazily streamed positionals.
+Results that do not pickle are only kept in memory.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from functools import wraps
+from inspect import iscoroutinefunction, signature
+from logging import getLogger
+from pathlib import Path
+from time import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from .parser import CliArgs, LazyPositionals, reconstruct_args
+
+logger = getLogger("rCli.cache")
+
+def default_directory() -> Path:
+    """Where the disk tier lives unless a directory is given."""
+    configured = os.environ.get("RCLI_CACHE_DIR")
+    if configured:
+        return Path(configured)
+    base = (os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return Path(base) / "rcli" / "results"
+
+def cache_key(args: CliArgs) -> Optional[str]:
+    """Canonical key for an invocation, or ``None`` when it cannot be cached."""
+    if args.input is not None or isinstance(args.positionals, LazyPositionals):
+        return None
+    return "\0".join(reconstruct_args(args, canonical=True))
+
+class ResultCache:
+    """Handler results by command and canonical arguments, in memory and on disk.
+
+    ``directory=False`` keeps the cache in memory only. Entries live for
+    ``ttl`` seconds; the least recently used are evicted beyond ``maxsize``
+    entries in memory and ``disk_maxsize`` on disk.
+    """
+    def __init__(self, directory=None, ttl: Optional[float] = 300.0, maxsize: int = 256,
+                 disk_maxsize: int = 4096, clock: Callable[[], float] = time):
+        self.directory: Optional[Path] = (
+            None if directory is False else Path(directory or default_directory()))
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.disk_maxsize = disk_maxsize
+        self.clock = clock
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        # Entries on disk, counted on first use; None until then.
+        self._disk_count: Optional[int] = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, command: str, key: str) -> Path:
+        digest = hashlib.blake2b(key.encode("utf-8", "surrogatepass"),
+                                 digest_size=16).hexdigest()
+        return self.directory / quote(command, safe="") / f"{digest}.pickle"
+
+    def get(self, command: str, key: str, default: Any = None) -> Any:
+        """The fresh cached result for ``key`` under ``command``, or ``default``."""
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get((command, key))
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end((command, key))
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[(command, key)]
+        entry = self._read(command, key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return default
+            self.disk_hits += 1
+            self._remember((command, key), entry)
+        return entry[1]
+
+    def put(self, command: str, key: str, result: Any,
+            ttl: Optional[float] = None) -> None:
+        """Cache ``result`` for ``ttl`` seconds (the cache's default when ``None``)."""
+        ttl = self.ttl if ttl is None else ttl
+        if not ttl:
+            return
+        entry = (self.clock() + ttl, result)
+        with self._lock:
+            self._remember((command, key), entry)
+        self._write(command, key, entry)
+
+    def _remember(self, key: Tuple[str, str], entry: Tuple[float, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _read(self, command: str, key: str, now: float) -> Optional[Tuple[float, Any]]:
+        if self.directory is None:
+            return None
+        path = self._path(command, key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, expires, result = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Dropping unreadable cache entry {path}: {e}")
+            self._unlink(path)
+            return None
+        if stored_key != key or expires <= now:
+            self._unlink(path)
+            return None
+        # The file's mtime is its LRU stamp.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return expires, result
+
+    def _write(self, command: str, key: str, entry: Tuple[float, Any]) -> None:
+        if self.directory is None:
+            return
+        path = self._path(command, key)
+        try:
+            data = pickle.dumps((key, *entry), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Keeping result of '{command}' in memory only: {e}")
+            return
+        temp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        existed = path.exists()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp.write_bytes(data)
+            # Atomic, so concurrent readers never see a partial entry.
+            os.replace(temp, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            return
+        if not existed:
+            self._count_written()
+
+    def _disk_entries(self) -> Iterator[Path]:
+        return self.directory.glob("*/*.pickle")
+
+    def _count_written(self) -> None:
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = sum(1 for _ in self._disk_entries())
+            else:
+                self._disk_count += 1
+            if self._disk_count <= self.disk_maxsize:
+                return
+        self._evict()
+
+    def _evict(self) -> None:
+        # Trim to 90% so eviction does not run again on the next write.
+        entries = []
+        for path in self._disk_entries():
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        excess = len(entries) - int(self.disk_maxsize * 0.9)
+        for _, path in entries[:max(excess, 0)]:
+            self._unlink(path)
+        with self._lock:
+            self._disk_count = len(entries) - max(excess, 0)
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, command: Optional[str] = None,
+                   key: Optional[str] = None) -> None:
+        """Forget one result, every result of ``command``, or everything."""
+        with self._lock:
+            if command is None:
+                self._memory.clear()
+            else:
+                for entry in [k for k in self._memory
+                              if k[0] == command and (key is None or k[1] == key)]:
+                    del self._memory[entry]
+            self._disk_count = None
+        if self.directory is not None:
+            if command is not None and key is not None:
+                self._unlink(self._path(command, key))
+            else:
+                # Only the entries this cache wrote; the directory may be shared.
+                owned = "*" if command is None else glob.escape(quote(command, safe=""))
+                folders = set()
+                for path in self.directory.glob(f"{owned}/*.pickle"):
+                    self._unlink(path)
+                    folders.add(path.parent)
+                for folder in folders:
+                    try:
+                        folder.rmdir()
+                    except OSError:
+                        pass  # still holds something we did not write
+        for listener in self._listeners:
+            listener(command, key)
+
+    def on_invalidate(self,
+                      listener: Callable[[Optional[str], Optional[str]], None]) -> None:
+        """Call ``listener(command, key)`` after every :meth:`invalidate`."""
+        self._listeners.append(listener)
+
+    def watch(self, registry) -> None:
+        """Invalidate a command's results whenever it is replaced by another
+        handler or removed.
+
+        Keeps results from a handler's previous code out of reach after a
+        reload (see :mod:`rcli.reload`). First registrations, lazy ones
+        included, keep the disk tier so later processes are still served.
+        """
+        handlers = dict(registry.loaded())
+
+        def registered(name, handler):
+            if handler is None:
+                return
+            previous = handlers.get(name)
+            handlers[name] = handler
+            if previous is not None and previous is not handler:
+                self.invalidate(name)
+
+        def removed(name):
+            handlers.pop(name, None)
+            self.invalidate(name)
+
+        registry.subscribe(registered, removed)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "size": len(self._memory),
+        }
+
+# The cache @cached handlers use unless given another.
+results = ResultCache()
+
+_MISSING = object()
+
+def cached(ttl: Optional[float] = None, cache: Optional[ResultCache] = None):
+    """Cache a handler's results; ``ttl`` overrides the cache's default.
+
+    Decorates ``run``, a ``@subcommand`` method or a plain ``(args, ctx)``
+    handler function, sync or async. Results are stored under ``args.command``,
+    which :func:`invalidates` and :meth:`ResultCache.invalidate` use.
+    """
+    def decorator(func):
+        bound = next(iter(signature(func).parameters), None) == "self"
+        namespace = f"{func.__module__}.{func.__qualname__}"
+
+        def lookup(args: CliArgs):
+            store = cache or results
+            key = cache_key(args)
+            if key is None:
+                return store, None, _MISSING
+            key = f"{namespace}\0{key}"
+            return store, key, store.get(args.command, key, _MISSING)
+
+        def keep(store: ResultCache, args: CliArgs, key: Optional[str],
+                 result: Any) -> Any:
+            if key is not None and not isinstance(result, Iterator):
+                store.put(args.command, key, result, ttl)
+            return result
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def handler(*call, **kwargs):
+                args = call[1] if bound else call[0]
+                store, key, result = lookup(args)
+                if result is _MISSING:
+                    result = keep(store, args, key, await func(*call, **kwargs))
+                return result
+        else:
+            @wraps(func)
+            def handler(*call, **kwargs):
+                args = call[1] if bound else call[0]
+                store, key, result = lookup(args)
+                if result is _MISSING:
+                    result = keep(store, args, key, func(*call, **kwargs))
+                return result
+        return handler
+    return decorator
+
+def invalidates(*commands: str, cache: Optional[ResultCache] = None):
+    """Invalidate the cached results of ``commands`` after the handler succeeds.
+
+    For commands that change what cached, read-only commands return.
+    """
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def handler(*call, **kwargs):
+                result = await func(*call, **kwargs)
+                for command in commands:
+                    (cache or results).invalidate(command)
+                return result
+        else:
+            @wraps(func)
+            def handler(*call, **kwargs):
+                result = func(*call, **kwargs)
+                for command in commands:
+                    (cache or results).invalidate(command)
+                return result
+        return handler
+    return decorator
@@ -0,0 +1,120 @@
+"""Tiny client for the rCli warm daemon (see :mod:`rcli.daemon`).
+
+Forwards ``sys.argv``, the environment, the working directory and the stdio
+file descriptors to a running server over a Unix socket and exits with the
+command's exit code. Only the standard library is imported so the client
+itself starts in a few milliseconds::
+
+    python -m rcli.client mycommand --flag value
+
+The default socket lives in ``rcli-<uid>``, a directory under
+``$XDG_RUNTIME_DIR`` (or the temp directory) that must be owned by the user
+and mode 0700. Nothing is sent to a server running as another user.
+"""
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+from typing import Optional
+
+SOCKET_ENV = "RCLI_SOCKET"
+EXIT_NO_SERVER = 255
+
+_LENGTH = struct.Struct("!i")
+# struct ucred: pid, uid, gid.
+_CREDS = struct.Struct("3i")
+
+def default_socket_dir() -> str:
+    """The per-user directory holding the default socket; see
+    :func:`check_private_dir`.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(base, f"rcli-{os.getuid()}")
+
+def default_socket_path() -> str:
+    """``$RCLI_SOCKET``, else ``server.sock`` in :func:`default_socket_dir`."""
+    return (os.environ.get(SOCKET_ENV)
+            or os.path.join(default_socket_dir(), "server.sock"))
+
+def check_private_dir(path: str) -> None:
+    """Raise ``PermissionError`` unless ``path`` is a directory only the current
+    user can use.
+
+    The temp directory is shared, so anyone could create the default socket
+    directory first; it is trusted only when it is ours and mode 0700.
+    """
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(
+            f"{path} must be a directory owned by uid {os.getuid()} with mode 0700")
+
+def peer_uid(sock: socket.socket) -> Optional[int]:
+    """The uid of the process at the other end of ``sock``; ``None`` without
+    ``SO_PEERCRED``.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _CREDS.size)
+    return _CREDS.unpack(creds)[1]
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("rCli server closed the connection")
+        data += chunk
+    return data
+
+def run(argv, socket_path: str = None) -> int:
+    """Run ``argv`` (program name first) on the server and return its exit code."""
+    path = socket_path or default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        if not socket_path and not os.environ.get(SOCKET_ENV):
+            check_private_dir(default_socket_dir())
+        sock.connect(path)
+    except PermissionError as e:
+        sock.close()
+        print(f"[rCli] Refusing to use {path}: {e}", file=sys.stderr)
+        return EXIT_NO_SERVER
+    except OSError as e:
+        sock.close()
+        print(f"[rCli] No server at {path}: {e}", file=sys.stderr)
+        return EXIT_NO_SERVER
+
+    with sock:
+        # The environment and the terminal go only to a server run by this user.
+        uid = peer_uid(sock)
+        if uid is None:
+            # No SO_PEERCRED (e.g. macOS): go by who owns the socket file.
+            uid = os.stat(path).st_uid
+        if uid != os.getuid():
+            print(f"[rCli] Refusing to use {path}: the server runs as uid {uid}",
+                  file=sys.stderr)
+            return EXIT_NO_SERVER
+        request = {"argv": list(argv), "env": dict(os.environ), "cwd": os.getcwd()}
+        header = json.dumps(request).encode()
+        # The stdio descriptors travel with the length prefix; the server
+        # process writes straight to them.
+        socket.send_fds(sock, [_LENGTH.pack(len(header))], [0, 1, 2])
+        sock.sendall(header)
+
+        # The server answers with the pid running the command, then its exit code.
+        (pid,) = _LENGTH.unpack(recv_exact(sock, _LENGTH.size))
+        previous = signal.signal(signal.SIGINT,
+                                 lambda signum, frame: os.kill(pid, signal.SIGINT))
+        try:
+            (code,) = _LENGTH.unpack(recv_exact(sock, _LENGTH.size))
+        finally:
+            signal.signal(signal.SIGINT, previous)
+    return code
+
+def main() -> None:
+    sys.exit(run(sys.argv))
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import importlib
 import pkgutil
 import sys
-from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
 from logging import getLogger
 
+from .profiling import startup_phase
 from .registry import CommandRegistry
+from .schema import attach_plans
+
+if TYPE_CHECKING:
+    from .parser import CliArgs
 
 logger = getLogger("rCli.commands")
 registry = CommandRegistry()
@@ -17,14 +21,23 @@ class CommandMeta(type):
         for attr_name, attr_value in dct.items():
             if hasattr(attr_value, '_command_name'):
                 dct['commands'][attr_value._command_name] = attr_value
-        return super().__new__(cls, name, bases, dct)
+        new_cls = super().__new__(cls, name, bases, dct)
+        # Option schemas are compiled once, when the handler is defined.
+        attach_plans(new_cls)
+        return new_cls
 
 class CommandHandler(metaclass=CommandMeta):
     # Class-level dictionary to store commands
     commands = {}
+    # Handlers get a lazily resolved rcli.context.Context as ``ctx``; set to
+    # False to skip context resolution entirely.
     depends_context = True
-    """Abstract base for all subcommand handlers."""
-    def run(self, args: List[str], ctx: Optional[object] = None):
+    """Abstract base for all subcommand handlers.
+
+    ``run`` and every ``@subcommand`` method are called with the parsed
+    :class:`~rcli.parser.CliArgs` and the invocation context.
+    """
+    def run(self, args: "CliArgs", ctx: Optional[object] = None):
         raise NotImplementedError("Subcommands must implement run()")
 
 def subcommand(name):
@@ -33,65 +46,93 @@ def subcommand(name):
         return func
     return decorator
 
-def auto_import_subcommands(commands_dir: str) -> None:
-    """Automatically imports all Python modules in the commands directory."""
+def auto_import_subcommands(commands_dir: str, use_manifest: bool = False,
+                            registry: Optional[CommandRegistry] = None) -> None:
+    """Automatically imports all Python modules in the commands directory.
+
+    With ``use_manifest`` the modules are not imported up front. Their command
+    names are read from an on-disk manifest (see :mod:`rcli.manifest`) and
+    each module is imported by ``CommandRegistry.get`` when it is dispatched.
+
+    Calling it again imports new modules and reloads only the ones whose
+    content changed (and their dependents); see :mod:`rcli.reload`.
+    Commands go into the process-wide registry unless ``registry`` is given.
+    """
+    registry = registry if registry is not None else CommandRegistry()
     #abs_path = Path(commands_dir).resolve()
     #sys.path.append(abs_path)
     
     if getattr(sys, 'frozen', False):
         # PyInstaller EXE mode
-        print("[rCli] Running in frozen mode. Importing submodules dynamically.")
         package_name = commands_dir.replace('/', '.').replace('\\', '.')
-        import_frozen_submodules(package_name)
+        import_frozen_submodules(package_name, lazy=use_manifest, registry=registry)
+    elif use_manifest:
+        from .manifest import load_command_manifest
+        load_command_manifest(commands_dir, registry)
     else:
-        # Normal filesystem mode
-        commands_path = Path(commands_dir)
-        
-        print("[rCli] Importing subcommands from filesystem.")
-        
-        # Import manually by scanning files
-        for file in commands_path.rglob("*.py"):
-            if file.name == "__init__.py":
-                continue  # Skip __init__.py
-            
-            # Build full module path
-            rel_path = file.relative_to(Path.cwd())
-            module_name = ".".join(rel_path.with_suffix('').parts)
-            print(f"[rCli] Importing {module_name}")
-
-            if module_name in sys.modules:
-                importlib.reload(sys.modules[module_name])
-            else:
+        # Normal filesystem mode: import new modules, reload only changed ones.
+        from .reload import reloader_for
+
+        # Logged, not printed: stdout belongs to the commands (see rcli.batch).
+        logger.debug(f"Importing subcommands of {commands_dir} from the filesystem")
+        reloader_for(commands_dir, registry).refresh(
+            lambda module_name: logger.debug(f"Importing {module_name}"))
+
+def import_frozen_submodules(package_name: str, lazy: bool = False,
+                             registry: Optional[CommandRegistry] = None) -> None:
+    """Import the command modules of ``package_name`` when running frozen.
+
+    If the bundle carries the manifest written by ``python -m rcli.freeze``,
+    exactly the modules it lists are imported, or with ``lazy`` only their
+    command names are registered and the dispatched module is imported on
+    first use. Without a manifest the package is walked through its importer.
+    """
+    from .manifest import CommandManifest, bundled_manifest_path
+
+    registry = registry if registry is not None else CommandRegistry()
+
+    manifest = CommandManifest.load(bundled_manifest_path(package_name))
+    if manifest.modules:
+        logger.debug(f"Loading frozen commands of {package_name} from {manifest.path}")
+        if lazy:
+            manifest.register_lazy(registry)
+            return
+        for module_name in manifest.modules:
+            with startup_phase(f"import {module_name}", "import"), registry.active():
                 importlib.import_module(module_name)
+        return
+
+    logger.debug(f"No bundled manifest for {package_name}, walking the frozen package")
+    package = importlib.import_module(package_name)
+    for info in pkgutil.walk_packages(package.__path__, package_name + "."):
+        if not info.ispkg:
+            with startup_phase(f"import {info.name}", "import"), registry.active():
+                importlib.import_module(info.name)
+
+def cog(name_or_cls=None, registry: Optional[CommandRegistry] = None):
+    """Decorator to register a subcommand handler.
 
-def import_frozen_submodules(package_name: str) -> None:
-    """Import all submodules when running frozen."""
-    # Todo: Remove all uses of print in favor of logger
-    print("[rCli] Importing frozen modules:")
-    for name in list(sys.modules):
-        if name.startswith(package_name + "."):
-            try:
-                print(f"[rCli] Importing {name}")
-                importlib.import_module(name)
-            except ModuleNotFoundError:
-                pass  # Skip missing ones
-
-def cog(name_or_cls=None):
-    """Decorator to register a subcommand handler."""
+    Handlers go into the given ``registry``, else the one made active with
+    :meth:`CommandRegistry.active` (as imports done for a registry are),
+    else the process-wide one.
+    """
+    target = registry if registry is not None else CommandRegistry.current()
 
     def decorator(command_cls):
         # If no name is provided, use the class's name (lowercased)
         if isinstance(name_or_cls, str):
             name = name_or_cls  # The name was passed directly as a string
         elif name_or_cls is None:
-            name = command_cls.__name__.lower()  # Use the lowercase class name if no name is provided
+            # Use the lowercase class name if no name is provided
+            name = command_cls.__name__.lower()
         else:
             # In case name_or_cls is a class, we need to handle this case
             name = name_or_cls.__name__.lower()
 
-        logger.debug(f"Registering subcommand '{name}' for class {command_cls.__name__}")  # Debugging print
+        logger.debug(
+            f"Registering subcommand '{name}' for class {command_cls.__name__}")
         # Register the class handler for the subcommand name
-        registry.register(command_cls, name)
+        target.register(command_cls, name)
         return command_cls
 
     return decorator
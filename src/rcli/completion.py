@@ -0,0 +1,205 @@
+"""Shell completion for bash, zsh and fish, served from a precomputed index.
+
+The index is a flat text file written next to the command manifest (see
+:mod:`rcli.manifest`) whenever the manifest changes, so it is invalidated by
+the same module mtimes. Each line is ``<command path>\\t<candidate>``::
+
+    \\tgit
+    \\t@g
+    git\\tremote
+    git\\t--verbose
+    git remote\\tadd
+
+The generated shell functions query it with a small ``awk`` program, so a
+keypress neither starts Python nor imports a handler module::
+
+    python -m rcli.completion build commands
+    python -m rcli.completion script bash --prog mycli \\
+        --index commands/.rcli_completion >> ~/.bashrc
+"""
+import argparse
+import os
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+INDEX_NAME = ".rcli_completion"
+SHELLS = ("bash", "zsh", "fish")
+
+def _option_flag(name: str) -> str:
+    return f"-{name}" if len(name) == 1 else f"--{name}"
+
+def _walk(path: str, node: dict) -> Iterator[Tuple[str, str]]:
+    for name in node.get("options", ()):
+        yield path, _option_flag(name)
+    for sub_name, child in node.get("subcommands", {}).items():
+        yield path, sub_name
+        yield from _walk(f"{path} {sub_name}", child)
+
+def index_entries(manifest) -> Iterator[Tuple[str, str]]:
+    """``(path, candidate)`` pairs for every command in a
+    :class:`~rcli.manifest.CommandManifest`.
+    """
+    for entry in manifest.modules.values():
+        for name, node in entry.get("details", {}).items():
+            yield "", name
+            for alias in node.get("aliases", ()):
+                yield "", f"@{alias}"
+            if node.get("id") is not None:
+                yield "", f"#{node['id']}"
+            yield from _walk(name, node)
+
+def completion_index_path(manifest) -> str:
+    return str(manifest.path.with_name(INDEX_NAME))
+
+def write_completion_index(manifest) -> str:
+    """Write the completion index for ``manifest`` next to it and return its path."""
+    path = completion_index_path(manifest)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        for parent, candidate in sorted(set(index_entries(manifest))):
+            fh.write(f"{parent}\t{candidate}\n")
+    os.replace(tmp, path)
+    return path
+
+def read_index(path: str) -> Dict[str, List[str]]:
+    children: Dict[str, List[str]] = {}
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            parent, _, candidate = line.rstrip("\n").partition("\t")
+            children.setdefault(parent, []).append(candidate)
+    return children
+
+def complete(children: Dict[str, List[str]], words: Iterable[str],
+             cur: str) -> List[str]:
+    """Candidates for ``cur`` after the already typed ``words`` (program name excluded).
+
+    Mirrors the ``awk`` program the shell scripts run.
+    """
+    path = ""
+    for word in words:
+        if word.startswith("-"):
+            continue
+        candidate = f"{path} {word}" if path else word
+        if word in children.get(path, ()):
+            path = candidate
+    out = []
+    for c in children.get(path, ()):
+        if path == "" and cur.startswith(":"):
+            if c[:1] not in ("-", "@", "#") and c.startswith(cur[1:]):
+                out.append(f":{c}")
+            continue
+        if not c.startswith(cur):
+            continue
+        if cur == "" and c[:1] in ("-", "@", "#"):
+            continue
+        out.append(c)
+    return out
+
+# Same logic as complete(), for the shell scripts. Kept free of single quotes
+# and backslashes so it embeds verbatim in bash, zsh and fish strings.
+_AWK = """
+BEGIN { FS = "	" }
+{ child[$1 SUBSEP $2] = 1; n[$1]++; cand[$1, n[$1]] = $2 }
+END {
+    path = ""
+    count = split(words, w, " ")
+    for (i = 1; i <= count; i++) {
+        if (w[i] ~ /^-/) continue
+        if ((path SUBSEP w[i]) in child) path = (path == "" ? w[i] : path " " w[i])
+    }
+    for (j = 1; j <= n[path]; j++) {
+        c = cand[path, j]
+        if (path == "" && substr(cur, 1, 1) == ":") {
+            if (c !~ /^[-@#]/ && index(c, substr(cur, 2)) == 1) print ":" c
+            continue
+        }
+        if (index(c, cur) != 1) continue
+        if (cur == "" && c ~ /^[-@#]/) continue
+        print c
+    }
+}
+"""
+
+_BASH = """# rCli completion for {prog}, generated by python -m rcli.completion
+_rcli_awk_{ident}='{awk}'
+_rcli_complete_{ident}() {{
+    local line="${{COMP_LINE:0:COMP_POINT}}" cur="" words
+    local -a parts
+    read -ra parts <<< "$line"
+    [[ $line == *[[:space:]] ]] || {{ cur="${{parts[-1]}}"; unset 'parts[-1]'; }}
+    words="${{parts[*]:1}}"
+    COMPREPLY=($(awk -v words="$words" -v cur="$cur" "$_rcli_awk_{ident}" \\
+        '{index}' 2>/dev/null))
+    # Bash splits words on ":"; only complete the part after the last one.
+    if [[ $cur == *:* && $COMP_WORDBREAKS == *:* ]]; then
+        local colon_prefix="${{cur%"${{cur##*:}}"}}"
+        COMPREPLY=("${{COMPREPLY[@]#"$colon_prefix"}}")
+    fi
+}}
+complete -F _rcli_complete_{ident} {prog}
+"""
+
+_ZSH = """#compdef {prog}
+# rCli completion for {prog}, generated by python -m rcli.completion
+_rcli_awk_{ident}='{awk}'
+_rcli_complete_{ident}() {{
+    local -a candidates
+    local typed="${{(j: :)words[2,CURRENT-1]}}" out
+    out="$(awk -v words="$typed" -v cur="${{words[CURRENT]}}" "$_rcli_awk_{ident}" \\
+        '{index}' 2>/dev/null)"
+    candidates=(${{(f)out}})
+    compadd -- "${{candidates[@]}}"
+}}
+compdef _rcli_complete_{ident} {prog}
+"""
+
+_FISH = """# rCli completion for {prog}, generated by python -m rcli.completion
+set -g __rcli_awk_{ident} '{awk}'
+function __rcli_complete_{ident}
+    set -l tokens (commandline -opc)
+    awk -v words="$tokens[2..-1]" -v cur=(commandline -ct) $__rcli_awk_{ident} \\
+        '{index}' 2>/dev/null
+end
+complete -c {prog} -f -a '(__rcli_complete_{ident})'
+"""
+
+_SCRIPTS = {"bash": _BASH, "zsh": _ZSH, "fish": _FISH}
+
+def completion_script(shell: str, prog: str, index_path: str) -> str:
+    """The completion function for ``prog`` in ``shell``, reading ``index_path``."""
+    if shell not in _SCRIPTS:
+        raise ValueError(f"shell must be one of {', '.join(SHELLS)}, not '{shell}'")
+    ident = re.sub(r"\W", "_", prog)
+    return _SCRIPTS[shell].format(prog=prog, ident=ident, awk=_AWK,
+                                  index=os.path.abspath(index_path))
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rcli.completion",
+                                 description="rCli shell completion.")
+    sub = ap.add_subparsers(dest="action", required=True)
+    build = sub.add_parser("build", help="refresh the manifest and completion index "
+                                         "of a commands directory")
+    build.add_argument("commands_dir")
+    script = sub.add_parser("script", help="print the completion script for a shell")
+    script.add_argument("shell", choices=SHELLS)
+    script.add_argument("--prog", required=True, help="name of the command to complete")
+    script.add_argument("--index", required=True, help="path to the completion index")
+    query = sub.add_parser("complete",
+                           help="print candidates for the last word (debugging aid)")
+    query.add_argument("--index", required=True)
+    query.add_argument("words", nargs=argparse.REMAINDER)
+    opts = ap.parse_args(argv)
+
+    if opts.action == "build":
+        from .manifest import load_command_manifest
+        print(write_completion_index(load_command_manifest(opts.commands_dir)))
+    elif opts.action == "script":
+        sys.stdout.write(completion_script(opts.shell, opts.prog, opts.index))
+    else:
+        words = [w for w in opts.words if w != "--"] or [""]
+        for candidate in complete(read_index(opts.index), words[:-1], words[-1]):
+            print(candidate)
+
+if __name__ == "__main__":
+    main()
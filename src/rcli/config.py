@@ -0,0 +1,313 @@
+"""Layered option defaults from config files and the environment.
+
+Instead of passing the same options on every call, put them in a config
+file. Lowest to highest precedence:
+
+1. the user file, ``$XDG_CONFIG_HOME/rcli/config.toml`` (or ``config.ini``;
+   ``~/.config`` when ``XDG_CONFIG_HOME`` is unset, ``$RCLI_CONFIG`` to
+   point elsewhere),
+2. the project file, the nearest ``.rcli.toml`` or ``.rcli.ini`` in the
+   working directory or one of its parents,
+3. ``RCLI_OPT_<NAME>`` environment variables for global options and
+   ``RCLI_OPT_<COMMAND>__<NAME>`` for a command's options (``_`` stands
+   for ``-`` in names),
+4. the command line.
+
+A layer replaces all values a lower one gave for an option. Flags add up,
+and ``false`` turns off a flag (or drops an option) a lower layer set. An
+option or flag given on the command line is never overridden::
+
+    # .rcli.toml
+    [global]
+    verbose = true              # a flag; false unsets it
+    profile = "staging"         # --profile=staging
+    include = ["a", "b"]        # --include=a --include=b
+
+    [command.deploy]
+    region = "eu-west-1"        # applies to `deploy` only
+
+INI files use ``[global]`` and ``[command deploy]`` sections, with one value
+per line for repeated options and ``true``/``false`` (``yes``/``no``,
+``on``/``off``) for flags. Use it with ``rCli(config=True)``, or
+``LayeredConfig(app="mycli").apply(args)`` for an application's own file
+names and ``MYCLI_OPT_`` prefix.
+
+Parsed files are compiled to a small ``marshal`` file under
+``$XDG_CACHE_HOME/rcli`` and reused while every source file keeps its mtime
+and size, so a start only stats the files.
+"""
+import marshal
+import os
+import zlib
+from dataclasses import replace
+from logging import getLogger
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .parser import CliArgs
+
+logger = getLogger("rCli.config")
+
+# A layer: {"global": scope, "commands": {name: scope}} where a scope is
+# {"options": {name: [values]}, "flags": [names], "unset": [names]}, "unset"
+# holding what was set to false; plain types only, so it marshals.
+Layer = Dict[str, Any]
+
+FLAG_ON = frozenset({"true", "yes", "on"})
+FLAG_OFF = frozenset({"false", "no", "off"})
+# Bump when the compiled layout changes.
+_COMPILED_FORMAT = 2
+
+class ConfigError(ValueError):
+    """Raised for a config file that cannot be read or has unsupported values."""
+
+def _scope() -> Dict[str, Any]:
+    return {"options": {}, "flags": [], "unset": []}
+
+def _layer() -> Layer:
+    return {"global": _scope(), "commands": {}}
+
+def _set(scope: Dict[str, Any], name: str, value: Any, source: str) -> None:
+    if isinstance(value, bool):
+        scope["flags" if value else "unset"].append(name)
+    elif isinstance(value, list):
+        scope["options"][name] = [str(v) for v in value]
+    elif isinstance(value, (str, int, float)):
+        scope["options"][name] = [str(value)]
+    else:
+        raise ConfigError(f"{source}: unsupported value for '{name}': {value!r}")
+
+def _set_text(scope: Dict[str, Any], name: str, text: str, source: str) -> None:
+    lowered = text.strip().lower()
+    if lowered in FLAG_ON or lowered in FLAG_OFF:
+        _set(scope, name, lowered in FLAG_ON, source)
+    else:
+        values = [line.strip() for line in text.strip().splitlines() if line.strip()]
+        _set(scope, name, values, source)
+
+def parse_toml(text: str, source: str = "<toml>") -> Layer:
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ConfigError(f"{source}: reading TOML config needs Python 3.11+ "
+                              "or the 'tomli' package")
+    try:
+        data = tomllib.loads(text)
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"{source}: {e}") from e
+    layer = _layer()
+    for name, value in data.get("global", {}).items():
+        _set(layer["global"], name, value, source)
+    for command, values in data.get("command", {}).items():
+        scope = layer["commands"][command] = _scope()
+        for name, value in values.items():
+            _set(scope, name, value, source)
+    return layer
+
+def parse_ini(text: str, source: str = "<ini>") -> Layer:
+    import configparser
+    parser = configparser.ConfigParser(interpolation=None, default_section="\0")
+    parser.optionxform = str
+    try:
+        parser.read_string(text, source)
+    except configparser.Error as e:
+        raise ConfigError(f"{source}: {e}") from e
+    layer = _layer()
+    for section in parser.sections():
+        if section == "global":
+            scope = layer["global"]
+        elif section.startswith("command "):
+            command = section[len("command "):].strip()
+            scope = layer["commands"].setdefault(command, _scope())
+        else:
+            logger.debug(f"{source}: ignoring section [{section}]")
+            continue
+        for name, text in parser.items(section):
+            _set_text(scope, name, text, source)
+    return layer
+
+def parse_file(path: Path) -> Layer:
+    """The layer in a ``.toml`` or ``.ini`` config file."""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise ConfigError(f"Cannot read config file {path}: {e}") from e
+    if path.suffix == ".toml":
+        return parse_toml(text, str(path))
+    return parse_ini(text, str(path))
+
+def environment_layer(environ: Mapping[str, str], prefix: str = "RCLI_OPT_") -> Layer:
+    """The layer given by ``<prefix><NAME>`` and ``<prefix><COMMAND>__<NAME>``
+    variables.
+    """
+    layer = _layer()
+    for key, text in environ.items():
+        if not key.startswith(prefix):
+            continue
+        command, _, name = key[len(prefix):].rpartition("__")
+        name = name.lower().replace("_", "-")
+        if command:
+            command = command.lower().replace("_", "-")
+            scope = layer["commands"].setdefault(command, _scope())
+        else:
+            scope = layer["global"]
+        _set_text(scope, name, text, key)
+    return layer
+
+def merge(layers: List[Layer]) -> Layer:
+    """One layer from ``layers``, lowest precedence first."""
+    merged = _layer()
+
+    def merge_scope(into: Dict[str, Any], scope: Dict[str, Any]) -> None:
+        for name in scope["unset"]:
+            into["options"].pop(name, None)
+            if name in into["flags"]:
+                into["flags"].remove(name)
+            if name not in into["unset"]:
+                into["unset"].append(name)
+        for name in (*scope["options"], *scope["flags"]):
+            if name in into["unset"]:
+                into["unset"].remove(name)
+        into["options"].update(scope["options"])
+        into["flags"].extend(flag for flag in scope["flags"]
+                             if flag not in into["flags"])
+
+    for layer in layers:
+        merge_scope(merged["global"], layer["global"])
+        for command, scope in layer["commands"].items():
+            merge_scope(merged["commands"].setdefault(command, _scope()), scope)
+    return merged
+
+def _cache_home() -> Path:
+    base = (os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return Path(base) / "rcli"
+
+class LayeredConfig:
+    """The config layers of one application, compiled once and cached by mtime."""
+    def __init__(self, app: str = "rcli", cwd: Optional[str] = None,
+                 environ: Optional[Mapping[str, str]] = None, cache_dir=None):
+        self.app = app
+        self.cwd = Path(cwd or os.getcwd())
+        self.environ = os.environ if environ is None else environ
+        self.env_prefix = f"{app.upper().replace('-', '_')}_OPT_"
+        # False disables the compiled cache.
+        self.cache_dir: Optional[Path] = (
+            None if cache_dir is False else Path(cache_dir or _cache_home()))
+        self._merged: Optional[Layer] = None
+
+    def user_file(self) -> Optional[Path]:
+        variable = f"{self.app.upper().replace('-', '_')}_CONFIG"
+        configured = self.environ.get(variable)
+        if configured:
+            if not Path(configured).is_file():
+                raise ConfigError(
+                    f"${variable} points at {configured}, which is not a file")
+            return Path(configured)
+        base = (self.environ.get("XDG_CONFIG_HOME")
+                or os.path.join(os.path.expanduser("~"), ".config"))
+        for name in ("config.toml", "config.ini"):
+            path = Path(base) / self.app / name
+            if path.is_file():
+                return path
+        return None
+
+    def project_file(self) -> Optional[Path]:
+        for directory in (self.cwd, *self.cwd.parents):
+            for name in (f".{self.app}.toml", f".{self.app}.ini"):
+                path = directory / name
+                if path.is_file():
+                    return path
+        return None
+
+    def files(self) -> List[Path]:
+        """Existing config files, lowest precedence first."""
+        return [path for path in (self.user_file(), self.project_file())
+                if path is not None]
+
+    def file_layers(self) -> List[Layer]:
+        """The layers of :meth:`files`, from the compiled cache while they are
+        unchanged.
+        """
+        paths = self.files()
+        if not paths:
+            return []
+        stamps = []
+        for path in paths:
+            try:
+                st = path.stat()
+            except OSError as e:
+                raise ConfigError(f"Cannot read config file {path}: {e}") from e
+            stamps.append((str(path), st.st_mtime_ns, st.st_size))
+        stamps = tuple(stamps)
+        compiled = None
+        if self.cache_dir is not None:
+            # One compiled file per set of source files, so projects do not
+            # evict each other.
+            joined = "\0".join(str(path) for path in paths)
+            key = zlib.crc32(joined.encode("utf-8", "surrogateescape"))
+            compiled = self.cache_dir / f"config-{self.app}-{key:08x}.bin"
+            layers = self._read_compiled(compiled, stamps)
+            if layers is not None:
+                return layers
+        layers = [parse_file(path) for path in paths]
+        if compiled is not None:
+            self._write_compiled(compiled, stamps, layers)
+        return layers
+
+    @staticmethod
+    def _read_compiled(path: Path, stamps: Tuple) -> Optional[List[Layer]]:
+        try:
+            data = marshal.loads(path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if (not isinstance(data, dict) or data.get("format") != _COMPILED_FORMAT
+                or data.get("stamps") != stamps):
+            return None
+        return data["layers"]
+
+    @staticmethod
+    def _write_compiled(path: Path, stamps: Tuple, layers: List[Layer]) -> None:
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = {"format": _COMPILED_FORMAT, "stamps": stamps, "layers": layers}
+            temp.write_bytes(marshal.dumps(data))
+            os.replace(temp, path)
+        except OSError as e:
+            logger.debug(f"Could not cache compiled config at {path}: {e}")
+
+    def merged(self) -> Layer:
+        """Every layer merged; computed once per instance."""
+        if self._merged is None:
+            environment = environment_layer(self.environ, self.env_prefix)
+            self._merged = merge([*self.file_layers(), environment])
+        return self._merged
+
+    def apply(self, args: CliArgs) -> CliArgs:
+        """``args`` with the config's options and flags filled in where the
+        command line has none.
+        """
+        merged = self.merged()
+        given = {*args.global_options, *args.local_options,
+                 *args.global_flags, *args.local_flags}
+        changes = {}
+        scopes = [("global", merged["global"])]
+        command = merged["commands"].get(args.command)
+        if command is not None:
+            scopes.append(("local", command))
+        for kind, scope in scopes:
+            options = getattr(args, f"{kind}_options")
+            flags = getattr(args, f"{kind}_flags")
+            defaults = {name: tuple(values) for name, values in scope["options"].items()
+                        if name not in given}
+            extra = [flag for flag in scope["flags"] if flag not in given]
+            if defaults:
+                changes[f"{kind}_options"] = MappingProxyType({**defaults, **options})
+            if extra:
+                changes[f"{kind}_flags"] = flags | frozenset(extra)
+        return replace(args, **changes) if changes else args
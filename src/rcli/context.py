@@ -0,0 +1,169 @@
+"""Pluggable, cached resolution of context args (``/``, ``?#``, ``?@``, ``??``).
+
+``parse_args`` collects context tokens into ``CliArgs.context_args``. A
+resolver is registered per prefix and turns the text after the prefix into
+a context object::
+
+    @context_resolver("/", ttl=30)
+    def workspace(path):
+        return load_workspace("/" + path)
+
+    @context_resolver("?#")
+    def by_id(value):
+        return metadata_store.get(value)
+
+When no ``ctx`` is passed, the dispatcher hands handlers whose
+``depends_context`` is true a :class:`Context` over the invocation's context
+args. Nothing is resolved until the handler reads it, and handlers with
+``depends_context = False`` (the default for plain functions) never cause a
+lookup. Results are memoised per token for ``ttl`` seconds, so repeated
+invocations in a shell, batch or daemon process skip the lookup.
+"""
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PREFIXES = ("??", "?#", "?@", "/")
+
+class ContextError(LookupError):
+    """Raised for a context arg no resolver is registered for."""
+
+def split_token(token: str) -> Tuple[str, str]:
+    """``(prefix, value)`` for a context arg, e.g. ``("?#", "42")`` for ``?#42``."""
+    for prefix in PREFIXES:
+        if token.startswith(prefix):
+            return prefix, token[len(prefix):]
+    raise ContextError(f"'{token}' is not a context arg")
+
+class ContextResolvers:
+    """Resolvers by prefix, with a shared TTL and LRU-bounded memo of their results."""
+    def __init__(self, ttl: Optional[float] = 60.0, maxsize: int = 1024,
+                 clock: Callable[[], float] = monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._resolvers: Dict[str, Tuple[Callable[[str], Any], Optional[float]]] = {}
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, prefix: str, resolver: Callable[[str], Any],
+                 ttl: Optional[float] = None) -> None:
+        """Resolve ``prefix`` args with ``resolver(value)``; ``ttl`` overrides the
+        default.
+
+        A ``ttl`` of ``0`` disables memoisation for the prefix.
+        """
+        if prefix not in PREFIXES:
+            raise ValueError(f"context prefix must be one of {', '.join(PREFIXES)}, "
+                             f"not '{prefix}'")
+        self._resolvers[prefix] = (resolver, ttl)
+        self.invalidate(prefix=prefix)
+
+    def __contains__(self, prefix: str) -> bool:
+        return prefix in self._resolvers
+
+    def resolve(self, token: str) -> Any:
+        """The context object for one context arg, from the memo while it is fresh."""
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(token)
+                self.hits += 1
+                return entry[1]
+        prefix, value = split_token(token)
+        if prefix not in self._resolvers:
+            raise ContextError(
+                f"No context resolver registered for '{prefix}' (in '{token}')")
+        resolver, ttl = self._resolvers[prefix]
+        result = resolver(value)
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self.misses += 1
+            if ttl:
+                self._cache[token] = (now + ttl, result)
+                self._cache.move_to_end(token)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return result
+
+    def invalidate(self, token: Optional[str] = None,
+                   prefix: Optional[str] = None) -> None:
+        """Forget one memoised token, every token of ``prefix``, or everything."""
+        with self._lock:
+            if token is not None:
+                self._cache.pop(token, None)
+            elif prefix is not None:
+                for key in [k for k in self._cache if k.startswith(prefix)]:
+                    del self._cache[key]
+            else:
+                self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+class Context:
+    """The context args of one invocation, each resolved on first access."""
+    __slots__ = ("tokens", "resolvers", "_resolved")
+
+    def __init__(self, tokens: Sequence[str], resolvers: ContextResolvers):
+        self.tokens = tuple(tokens)
+        self.resolvers = resolvers
+        self._resolved: Dict[int, Any] = {}
+
+    def _at(self, index: int) -> Any:
+        if index not in self._resolved:
+            self._resolved[index] = self.resolvers.resolve(self.tokens[index])
+        return self._resolved[index]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._at(range(len(self.tokens))[index])
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self.tokens)):
+            yield self._at(index)
+
+    def all(self, prefix: str) -> List[Any]:
+        """Resolved objects of every context arg with ``prefix``, in order."""
+        return [self._at(i) for i, token in enumerate(self.tokens)
+                if split_token(token)[0] == prefix]
+
+    def get(self, prefix: str, default: Any = None) -> Any:
+        """The first context arg with ``prefix``, resolved, or ``default``."""
+        for i, token in enumerate(self.tokens):
+            if split_token(token)[0] == prefix:
+                return self._at(i)
+        return default
+
+    def __repr__(self):
+        return f"Context({list(self.tokens)!r})"
+
+# Resolvers used by every Dispatcher that is not given its own.
+resolvers = ContextResolvers()
+
+def context_resolver(prefix: str, ttl: Optional[float] = None,
+                     registry: Optional[ContextResolvers] = None):
+    """Decorator registering a resolver function for ``prefix``."""
+    def decorator(func):
+        (registry or resolvers).register(prefix, func, ttl)
+        return func
+    return decorator
+
+def depends_context(handler: Callable) -> bool:
+    """Whether a dispatch target wants a resolved context.
+
+    Bound methods ask their function, then their class (``CommandHandler``
+    defaults to ``True``); plain functions opt in with a ``depends_context``
+    attribute.
+    """
+    func = getattr(handler, "__func__", None)
+    if func is not None:
+        default = getattr(handler.__self__, "depends_context", False)
+        return getattr(func, "depends_context", default)
+    return getattr(handler, "depends_context", False)
@@ -0,0 +1,242 @@
+"""Warm server mode: keep the registry loaded and serve argv over a Unix socket.
+
+The server imports the commands and compiles the dispatch table once. Every
+connection is then served by a forked child, which inherits the warm state
+copy-on-write and takes over the client's argv, environment, working
+directory and stdio descriptors, so connections are fully isolated from one
+another and from the server. Pair it with :mod:`rcli.client`::
+
+    python -m rcli.daemon --commands commands &
+    python -m rcli.client mycommand --flag value
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+from logging import getLogger
+from types import GeneratorType
+from typing import Iterable, Optional, Set
+
+from . import rCli
+from .client import (_LENGTH, check_private_dir, default_socket_dir,
+                     default_socket_path, peer_uid, recv_exact)
+from .commands import auto_import_subcommands
+from .dispatch import CommandNotFoundError, Dispatcher
+from .registry import CommandRegistry
+from .schema import OptionError
+
+logger = getLogger("rCli.daemon")
+
+def exit_code(result) -> int:
+    """Exit code for a handler's return value: ints pass through, anything else
+    is success.
+    """
+    return result if isinstance(result, int) and not isinstance(result, bool) else 0
+
+class CliServer:
+    """Serves dispatches from a warm registry to :mod:`rcli.client` connections.
+
+    ``max_workers`` bounds the number of commands running at once; further
+    connections wait in the listen backlog. The server shuts down after
+    ``idle_timeout`` seconds without a connection (``None`` to run forever).
+    Each :class:`~rcli.reload.Reloader` in ``reloaders`` is refreshed before
+    a connection is forked, so edited commands are served without a restart.
+
+    Every argv goes through the same :class:`~rcli.rCli` front end as a cold
+    run: help, ``|`` pipelines, ``--rcli-profile`` and, when enabled,
+    ``@argfiles`` and the config layers of the client's working directory.
+    """
+    def __init__(self, socket_path: Optional[str] = None,
+                 registry: Optional[CommandRegistry] = None, max_workers: int = 8,
+                 idle_timeout: Optional[float] = 600.0, reloaders: Iterable = (),
+                 argfiles: bool = False, config: bool = False):
+        self.socket_path = socket_path or default_socket_path()
+        self.dispatcher = Dispatcher(registry)
+        self.argfiles = argfiles
+        self.config = config
+        self.reloaders = list(reloaders)
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self._children: Set[int] = set()
+        self._sock: Optional[socket.socket] = None
+
+    def bind(self) -> None:
+        if self.socket_path == os.path.join(default_socket_dir(), "server.sock"):
+            try:
+                os.mkdir(default_socket_dir(), 0o700)
+            except FileExistsError:
+                pass
+            check_private_dir(default_socket_dir())
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # stale socket from a dead server
+            else:
+                raise OSError(
+                    f"An rCli server is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Created 0600 from the start; a chmod after bind() leaves a window.
+        umask = os.umask(0o177)
+        try:
+            self._sock.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        self._sock.listen(max(self.max_workers * 4, 16))
+
+    def serve_forever(self) -> None:
+        # Warm everything the children will need before the first fork.
+        self.dispatcher.compile()
+        self.bind()
+        logger.info(f"rCli server listening on {self.socket_path}")
+        last_active = time.monotonic()
+        try:
+            while True:
+                self._reap(block=len(self._children) >= self.max_workers)
+                if self._children:
+                    last_active = time.monotonic()
+                elif (self.idle_timeout is not None
+                        and time.monotonic() - last_active >= self.idle_timeout):
+                    logger.info("rCli server idle, shutting down")
+                    break
+                self._sock.settimeout(1.0)
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                last_active = time.monotonic()
+                uid = peer_uid(conn)
+                if uid is not None and uid != os.getuid():
+                    logger.warning(f"Rejected a connection from uid {uid}")
+                    conn.close()
+                    continue
+                self._refresh()
+                self._fork(conn)
+        finally:
+            self.close()
+
+    def _refresh(self) -> None:
+        for reloader in self.reloaders:
+            try:
+                reloader.refresh()
+            except Exception:
+                logger.exception(f"Reloading {reloader.commands_path} failed; "
+                                 "serving the previous version")
+        # Recompile in the parent so children do not each rebuild the table.
+        self.dispatcher.table
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+    def _reap(self, block: bool = False) -> None:
+        # Same approach as socketserver.ForkingMixIn: wait for any child when
+        # at the limit, otherwise poll only our own children.
+        if block:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+                self._children.discard(pid)
+            except ChildProcessError:
+                self._children.clear()
+        for pid in list(self._children):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self._children.discard(pid)
+
+    def _fork(self, conn: socket.socket) -> None:
+        pid = os.fork()
+        if pid:
+            conn.close()
+            self._children.add(pid)
+            return
+        code = 1
+        try:
+            self._sock.close()
+            code = self._serve_connection(conn)
+        finally:
+            os._exit(code)
+
+    def _serve_connection(self, conn: socket.socket) -> int:
+        """Runs in the forked child: adopt the client's process state and dispatch."""
+        msg, fds, _, _ = socket.recv_fds(conn, _LENGTH.size, 3)
+        (size,) = _LENGTH.unpack(msg)
+        request = json.loads(recv_exact(conn, size))
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = request["argv"]
+        conn.sendall(_LENGTH.pack(os.getpid()))
+
+        try:
+            # Config is layered per connection, from the adopted cwd and env.
+            cli = rCli(argfiles=self.argfiles, config=self.config or None,
+                       argv=sys.argv, dispatcher=self.dispatcher)
+            result = cli.dispatch()
+            if isinstance(result, GeneratorType):
+                # Streamed records (pipelines, rcli.fanout) run as they are pulled.
+                for record in result:
+                    print(record)
+                result = None
+            code = exit_code(result)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except (CommandNotFoundError, OptionError) as e:
+            print(f"[rCli] {e}", file=sys.stderr)
+            code = 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        conn.sendall(_LENGTH.pack(code))
+        conn.close()
+        return code
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rcli.daemon",
+                                 description="Serve rCli commands from a warm process.")
+    ap.add_argument("--socket", default=None,
+                    help="socket path (default: $RCLI_SOCKET or a per-user path)")
+    ap.add_argument("--commands", action="append", default=[],
+                    help="commands directory to import; repeatable")
+    ap.add_argument("--max-workers", type=int, default=8)
+    ap.add_argument("--idle-timeout", type=float, default=600.0,
+                    help="seconds; 0 disables idle shutdown")
+    ap.add_argument("--reload", action="store_true",
+                    help="reload changed command modules before each connection")
+    ap.add_argument("--argfiles", action="store_true",
+                    help="expand @file arguments, as rCli(argfiles=True)")
+    ap.add_argument("--config", action="store_true",
+                    help="apply the config layers, as rCli(config=True)")
+    opts = ap.parse_args(argv)
+
+    for commands_dir in opts.commands:
+        auto_import_subcommands(commands_dir)
+    reloaders = ()
+    if opts.reload:
+        from .reload import reloader_for
+        reloaders = [reloader_for(commands_dir) for commands_dir in opts.commands]
+    server = CliServer(opts.socket, max_workers=opts.max_workers,
+                       idle_timeout=opts.idle_timeout or None, reloaders=reloaders,
+                       argfiles=opts.argfiles, config=opts.config)
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import threading
+from dataclasses import replace
+from inspect import isawaitable
+from logging import getLogger
+from time import perf_counter_ns
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from . import profiling
+from .commands import CommandHandler
+from .parser import CliArgs
+from .registry import CommandRegistry
+from .resolver import QUERY_PREFIXES, CommandResolver
+from .schema import OptionPlan
+
+logger = getLogger("rCli.dispatch")
+
+Path = Tuple[str, ...]
+
+class Route(NamedTuple):
+    """A dispatch table entry: the bound handler, its compiled option plan and
+    path length.
+    """
+    handler: Callable
+    plan: Optional[OptionPlan] = None
+    depth: int = 1
+
+class CommandNotFoundError(LookupError):
+    """Raised when ``CliArgs.command`` does not name a registered command."""
+
+class Dispatcher:
+    """Routes a parsed :class:`CliArgs` to its handler method.
+
+    The registry and every handler's ``@subcommand`` map are flattened into
+    one read-only table keyed on the command path, e.g. ``("git",)`` for
+    ``Git.run`` and ``("git", "remote", "add")`` for a subcommand registered
+    as ``@subcommand("remote add")`` or on a nested ``CommandHandler`` class.
+    The table is built on the first dispatch and rebuilt only when the
+    registry changes; handler classes are instantiated once and reused, so
+    a dispatch costs a few dict lookups.
+    """
+    def __init__(self, registry: Optional[CommandRegistry] = None, contexts=None):
+        self.registry = registry or CommandRegistry()
+        self._contexts = contexts
+        self._table: Optional[Mapping[Path, Route]] = None
+        self._version = -1
+        self._depth = 1
+        self._instances: Dict[type, object] = {}
+        # Serialises rebuilds; dispatching reads the published table without it.
+        self._compile_lock = threading.RLock()
+        self._resolver: Optional[CommandResolver] = None
+        self._runner = None
+        self.dispatches = 0
+        self.overhead_ns = 0
+        self.last_overhead_ns = 0
+
+    @property
+    def resolver(self) -> CommandResolver:
+        """Index for ``@alias``, ``:name`` and ``#id`` queries, built on first use."""
+        if self._resolver is None:
+            self._resolver = CommandResolver(self.registry)
+        return self._resolver
+
+    @property
+    def runner(self):
+        """The :class:`~rcli.aio.LoopRunner` that ``async def`` handlers run on."""
+        if self._runner is None:
+            from .aio import LoopRunner
+            self._runner = LoopRunner()
+        return self._runner
+
+    @property
+    def resources(self):
+        """Pooled async resources shared by handlers; see :mod:`rcli.aio`."""
+        return self.runner.resources
+
+    @property
+    def contexts(self):
+        """The :class:`~rcli.context.ContextResolvers` context args are resolved
+        with.
+        """
+        if self._contexts is None:
+            from . import context
+            self._contexts = context.resolvers
+        return self._contexts
+
+    def context_for(self, target: Callable, args: CliArgs,
+                    ctx: Optional[object] = None) -> Optional[object]:
+        """``ctx`` if given, else a lazy :class:`~rcli.context.Context` when
+        ``target`` depends on it.
+        """
+        if ctx is not None or not args.context_args:
+            return ctx
+        from .context import Context, depends_context
+        if not depends_context(target):
+            return None
+        return Context(args.context_args, self.contexts)
+
+    @property
+    def table(self) -> Mapping[Path, Route]:
+        if self._table is None or self._version != self.registry.version:
+            with self._compile_lock:
+                if self._table is None or self._version != self.registry.version:
+                    self.compile()
+        return self._table
+
+    def compile(self) -> Mapping[Path, Route]:
+        """Flatten every imported handler into a new lookup table."""
+        with self._compile_lock:
+            table: Dict[Path, Route] = {}
+            # Keep only the instances of classes still registered, so reloaded
+            # handler classes do not pin their old instances.
+            previous, self._instances = self._instances, {}
+            snapshot = self.registry.snapshot()
+            for name, handler in snapshot.commands.items():
+                self._add(table, (name,), handler, previous)
+            self._publish(table, snapshot.version)
+            return self._table
+
+    def _publish(self, table: Dict[Path, Route], version: int) -> None:
+        self._depth = max(map(len, table), default=1)
+        self._table = MappingProxyType(table)
+        self._version = version
+        logger.debug(f"Compiled dispatch table with {len(table)} entries")
+
+    def _instance(self, handler_cls: type, previous: Dict[type, object]) -> object:
+        instance = self._instances.get(handler_cls)
+        if instance is None:
+            instance = previous.get(handler_cls)
+            if instance is None:
+                instance = handler_cls()
+            self._instances[handler_cls] = instance
+        return instance
+
+    def _add(self, table: Dict[Path, Route], path: Path, handler: object,
+             previous: Dict[type, object]) -> None:
+        if not isinstance(handler, type):
+            # Plain callables are registered as-is.
+            table[path] = Route(handler, getattr(handler, "_option_plan", None) or None,
+                                len(path))
+            return
+        instance = self._instance(handler, previous)
+        plan = getattr(handler, "_option_plan", None) or None
+        table[path] = Route(instance.run, plan, len(path))
+        plans = getattr(handler, "_subcommand_plans", {})
+        for sub_name, func in handler.commands.items():
+            sub_path = path + tuple(sub_name.split())
+            if isinstance(func, type) and issubclass(func, CommandHandler):
+                self._add(table, sub_path, func, previous)
+            else:
+                table[sub_path] = Route(func.__get__(instance, handler),
+                                        plans.get(sub_name) or None, len(sub_path))
+
+    def resolve(self, args: CliArgs) -> Tuple[Route, int]:
+        """Find the handler for ``args``.
+
+        Returns its :class:`Route` and how many leading positionals were
+        consumed as nested subcommand names. The longest registered path
+        wins; unknown subcommands fall back to the command's ``run``.
+        """
+        table = self.table
+        head = (args.command, *args.subcommands)
+        extra = self._depth - len(head)
+        path = head + tuple(args.positionals[:extra]) if extra > 0 else head
+        while path:
+            route = table.get(path)
+            if route is not None:
+                return route, max(len(path) - len(head), 0)
+            path = path[:-1]
+
+        # Not compiled yet: the command may still be lazily registered.
+        handler = self.registry.get(args.command)
+        if handler is None:
+            raise CommandNotFoundError(f"Unknown command '{args.command}'")
+        return self.resolve(args)
+
+    def prepare(self, args: CliArgs) -> Tuple[Callable, CliArgs]:
+        """Resolve ``args`` to its handler and the arguments it will be called with.
+
+        The handler's option schema is applied here, so invalid options raise
+        :class:`~rcli.schema.OptionError` before any handler code runs.
+        """
+        start = perf_counter_ns()
+        if args.command[:1] in QUERY_PREFIXES:
+            name = self.resolver.resolve(args.command)
+            if name is None:
+                raise CommandNotFoundError(f"No command matches '{args.command}'")
+            args = replace(args, command=name)
+        route, consumed = self.resolve(args)
+        if consumed:
+            args = replace(
+                args,
+                subcommands=args.subcommands + args.positionals[:consumed],
+                positionals=args.positionals[consumed:],
+            )
+        elif (route.depth <= len(args.subcommands)
+                and getattr(route.handler, "_fan_out", False)):
+            # Fan-out handlers take every word past their path as a target.
+            keep = route.depth - 1
+            args = replace(
+                args,
+                subcommands=args.subcommands[:keep],
+                positionals=args.subcommands[keep:] + args.positionals,
+            )
+        if route.plan is not None:
+            args = route.plan.bind(args)
+        self.last_overhead_ns = elapsed = perf_counter_ns() - start
+        self.overhead_ns += elapsed
+        self.dispatches += 1
+        return route.handler, args
+
+    def dispatch(self, args: CliArgs, ctx: Optional[object] = None):
+        """Run the handler for ``args`` and return its result.
+
+        Coroutines returned by ``async def`` handlers are run to completion
+        on the managed event loop. Context args are resolved lazily, and
+        only for handlers whose ``depends_context`` is true; see
+        :mod:`rcli.context`.
+        """
+        profiler = profiling.active
+        if profiler is None:
+            target, args = self.prepare(args)
+            return self._run(target, args, self.context_for(target, args, ctx))
+        with profiler.phase("dispatch"):
+            target, args = self.prepare(args)
+            ctx = self.context_for(target, args, ctx)
+        return profiler.run_handler(self._run, target, args, ctx)
+
+    def _run(self, target: Callable, args: CliArgs, ctx: Optional[object]):
+        result = target(args, ctx)
+        if isawaitable(result):
+            result = self.runner.run(result)
+        return result
+
+    async def dispatch_async(self, args: CliArgs, ctx: Optional[object] = None):
+        """Like :meth:`dispatch`, for callers already running on an event loop."""
+        from .aio import _current_resources
+        target, args = self.prepare(args)
+        # What LoopRunner.run() sets up for handlers awaiting resource().
+        token = _current_resources.set(self.runner.resources)
+        try:
+            result = target(args, self.context_for(target, args, ctx))
+            if isawaitable(result):
+                result = await result
+        finally:
+            _current_resources.reset(token)
+        return result
+
+    def dispatch_many(self, invocations: Iterable[CliArgs],
+                      ctx: Optional[object] = None) -> List[object]:
+        """Run several invocations concurrently on the managed loop.
+
+        Results are returned in the order given. Synchronous handlers run on
+        the loop's default thread pool so they do not block the coroutines.
+        """
+        prepared = [self.prepare(args) for args in invocations]
+        return self.runner.gather([(target, (args, self.context_for(target, args, ctx)))
+                                   for target, args in prepared])
+
+    def stats(self) -> Dict[str, float]:
+        """Dispatch count and lookup overhead (excluding the handler) in nanoseconds."""
+        return {
+            "dispatches": self.dispatches,
+            "last_overhead_ns": self.last_overhead_ns,
+            "mean_overhead_ns": (self.overhead_ns / self.dispatches
+                                 if self.dispatches else 0.0),
+            "table_size": len(self._table) if self._table is not None else 0,
+        }
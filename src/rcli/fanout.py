@@ -0,0 +1,180 @@
+"""Opt-in parallel fan-out of one command over its positional targets.
+
+Write the work for a single target and let :func:`fan_out` run it across
+``args.positionals`` on a thread or process pool::
+
+    @cog("ping")
+    class Ping(CommandHandler):
+        @fan_out(workers=32, timeout=5.0)
+        def run(self, target, args, ctx=None):
+            return probe(target)
+
+    for res in dispatcher.dispatch(parse_args(["mycli", "ping", "a", "b", "c"])):
+        print(res.target, res.error or res.result)
+
+The decorated handler returns an iterator of :class:`TargetResult`, in input
+order by default or as targets complete with ``ordered=False``; use
+``list()`` to aggregate (:mod:`rcli.batch`, :mod:`rcli.daemon` and the
+shell drain it for you). A failing or timed-out target is reported in its
+result and the others carry on. At most ``workers`` targets are in flight
+at once. ``timeout`` counts from when a target is scheduled; a target that
+overruns it is reported and abandoned, but its worker is not interrupted.
+
+Targets are read from ``args.positionals`` only as workers free up, so the
+lazy positionals of :func:`rcli.parser.parse_stream` (e.g. from an
+``@argfile``) are streamed rather than loaded.
+
+In ``process`` mode the per-target function must be a module-level function
+or a method of a module-level class (instantiated once per worker), and it
+is called with ``ctx=None`` and ``args`` without its positionals.
+"""
+import importlib
+import os
+from concurrent.futures import (FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from dataclasses import replace
+from functools import partial, wraps
+from inspect import signature
+from time import monotonic
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional,
+                    Sized, Tuple)
+
+MODES = ("thread", "process")
+
+class TargetResult(NamedTuple):
+    index: int
+    target: str
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def run_targets(call: Callable[[str], Any], targets: Iterable[str],
+                mode: str = "thread", workers: Optional[int] = None,
+                timeout: Optional[float] = None,
+                ordered: bool = True) -> Iterator[TargetResult]:
+    """Run ``call(target)`` for every target on a pool and yield a
+    :class:`TargetResult` each.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}, not '{mode}'")
+    if workers is None:
+        workers = (os.cpu_count() or 1) + 4
+        if isinstance(targets, Sized):
+            workers = min(workers, len(targets))
+    workers = max(1, workers)
+    executor: Executor
+    if mode == "thread":
+        executor = ThreadPoolExecutor(workers)
+    else:
+        executor = ProcessPoolExecutor(workers)
+    # Targets are pulled as slots free up, so a lazy stream is never materialised.
+    pending: Dict[Future, Tuple[int, str, Optional[float]]] = {}
+    ready: Dict[int, TargetResult] = {}
+    upcoming = enumerate(targets)
+    next_index = 0
+    try:
+        while True:
+            while len(pending) < workers:
+                item = next(upcoming, None)
+                if item is None:
+                    break
+                index, target = item
+                deadline = monotonic() + timeout if timeout is not None else None
+                pending[executor.submit(call, target)] = (index, target, deadline)
+            if not pending:
+                return
+
+            deadlines = [deadline for _, _, deadline in pending.values()
+                         if deadline is not None]
+            wait_for = max(min(deadlines) - monotonic(), 0.0) if deadlines else None
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            finished: List[TargetResult] = []
+            for future in done:
+                index, target, _ = pending.pop(future)
+                try:
+                    finished.append(TargetResult(index, target, future.result()))
+                except Exception as e:
+                    finished.append(TargetResult(index, target, error=e))
+            now = monotonic()
+            for future, (index, target, deadline) in list(pending.items()):
+                if deadline is not None and deadline <= now:
+                    del pending[future]
+                    future.cancel()
+                    error = TimeoutError(
+                        f"Target '{target}' did not finish within {timeout}s")
+                    finished.append(TargetResult(index, target, error=error))
+
+            if not ordered:
+                yield from finished
+                continue
+            for res in finished:
+                ready[res.index] = res
+            while next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+    finally:
+        # Abandon anything still running (timed out, or the caller stopped early).
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Handler instances created in process pool workers, per class.
+_worker_instances: Dict[type, object] = {}
+
+def _call_in_worker(module_name: str, qualname: str, bound: bool, args, target: str):
+    owner, obj = None, importlib.import_module(module_name)
+    for part in qualname.split("."):
+        owner, obj = obj, getattr(obj, part)
+    func = getattr(obj, "__wrapped__", obj)
+    if not bound:
+        return func(target, args, None)
+    instance = _worker_instances.get(owner)
+    if instance is None:
+        instance = _worker_instances[owner] = owner()
+    return func(instance, target, args, None)
+
+def fan_out(mode: str = "thread", workers: Optional[int] = None,
+            timeout: Optional[float] = None, ordered: bool = True):
+    """Turn a per-target function into a handler fanning out over ``args.positionals``.
+
+    When dispatched, every word after the command path counts as a target,
+    including the first one that ``parse_args`` files as a subcommand.
+
+    Decorates ``func(target, args, ctx)`` or a method ``func(self, target,
+    args, ctx)``; the result is a regular ``(args, ctx)`` handler, usable as
+    ``run``, a ``@subcommand`` or a plain registered function.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}, not '{mode}'")
+
+    def decorator(func):
+        bound = next(iter(signature(func).parameters), None) == "self"
+        if mode == "process" and "<locals>" in func.__qualname__:
+            raise ValueError(f"{func.__qualname__} must be defined at module level "
+                             "to fan out to processes")
+
+        def targets_call(instance, args, ctx) -> Callable[[str], Any]:
+            if mode == "process":
+                # Each task pickles args; the targets themselves go one per task.
+                args = replace(args, positionals=(), input=None)
+                return partial(_call_in_worker, func.__module__, func.__qualname__,
+                               bound, args)
+            if bound:
+                return lambda target: func(instance, target, args, ctx)
+            return lambda target: func(target, args, ctx)
+
+        if bound:
+            @wraps(func)
+            def handler(self, args, ctx=None):
+                return run_targets(targets_call(self, args, ctx), args.positionals,
+                                   mode, workers, timeout, ordered)
+        else:
+            @wraps(func)
+            def handler(args, ctx=None):
+                return run_targets(targets_call(None, args, ctx), args.positionals,
+                                   mode, workers, timeout, ordered)
+        # The dispatcher passes every word after the command path as a positional.
+        handler._fan_out = True
+        return handler
+    return decorator
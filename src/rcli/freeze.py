@@ -0,0 +1,103 @@
+"""Build-time support for frozen (PyInstaller) applications.
+
+Command modules are imported dynamically, so PyInstaller neither bundles them
+nor can a frozen app discover them by scanning the filesystem. Run this step
+before building to refresh the command manifest (see :mod:`rcli.manifest`)
+and hand PyInstaller the modules and the manifest to bundle::
+
+    python -m rcli.freeze commands --hook-dir build/hooks
+    pyinstaller --additional-hooks-dir build/hooks app.py
+
+PyInstaller only runs a hook for a module already in its import graph, which
+the commands package never is; the hook is therefore written for ``rcli``
+itself, which ``app.py`` imports. It covers one commands directory.
+
+or print the equivalent command-line arguments instead of writing a hook::
+
+    pyinstaller $(python -m rcli.freeze commands --args) app.py
+
+At runtime ``auto_import_subcommands("commands")`` imports exactly the modules
+listed in the bundled manifest, and with ``use_manifest=True`` only the one
+that is dispatched.
+"""
+import argparse
+import os
+import shlex
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .manifest import CommandManifest, load_command_manifest
+from .registry import CommandRegistry
+
+def build_manifest(commands_dir: str,
+                   registry: Optional[CommandRegistry] = None) -> CommandManifest:
+    """Refresh the manifest of ``commands_dir`` for bundling; run from the
+    project root.
+    """
+    manifest = load_command_manifest(commands_dir, registry)
+    package_name = ".".join(Path(commands_dir).parts)
+    for module_name in manifest.modules:
+        if not module_name.startswith(package_name + "."):
+            raise ValueError(f"Command module {module_name} is not inside package "
+                             f"{package_name}; run the build step from the directory "
+                             f"that contains {commands_dir}")
+    return manifest
+
+def hidden_imports(manifest: CommandManifest) -> List[str]:
+    """The command modules, plus their parent packages, that PyInstaller must bundle."""
+    names = set()
+    for module_name in manifest.modules:
+        parts = module_name.split(".")
+        names.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+    return sorted(names)
+
+def datas(manifest: CommandManifest, commands_dir: str) -> List[Tuple[str, str]]:
+    """``(source, destination)`` pairs placing the manifest where the frozen app
+    looks for it.
+    """
+    return [(str(manifest.path.resolve()), Path(commands_dir).as_posix())]
+
+def write_hook(manifest: CommandManifest, commands_dir: str, hook_dir: str) -> str:
+    """Write a ``hook-rcli.py`` for ``--additional-hooks-dir`` and return its
+    path.
+    """
+    os.makedirs(hook_dir, exist_ok=True)
+    # Hooked on rcli, which the application imports statically.
+    path = os.path.join(hook_dir, f"hook-{__package__}.py")
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("# Generated by python -m rcli.freeze; do not edit.\n")
+        fh.write(f"hiddenimports = {hidden_imports(manifest)!r}\n")
+        fh.write(f"datas = {datas(manifest, commands_dir)!r}\n")
+    return path
+
+def pyinstaller_args(manifest: CommandManifest, commands_dir: str) -> List[str]:
+    args = []
+    for module_name in hidden_imports(manifest):
+        args += ["--hidden-import", module_name]
+    for source, dest in datas(manifest, commands_dir):
+        args += ["--add-data", f"{source}{os.pathsep}{dest}"]
+    return args
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(
+        prog="python -m rcli.freeze",
+        description="Prepare rCli command modules for a PyInstaller build.")
+    ap.add_argument("commands_dir",
+                    help="commands package, relative to the project root")
+    out = ap.add_mutually_exclusive_group()
+    out.add_argument("--hook-dir",
+                     help="write hook-rcli.py, bundling the commands, here")
+    out.add_argument("--args", action="store_true",
+                     help="print PyInstaller command-line arguments")
+    opts = ap.parse_args(argv)
+
+    manifest = build_manifest(opts.commands_dir)
+    if opts.hook_dir:
+        print(write_hook(manifest, opts.commands_dir, opts.hook_dir))
+    elif opts.args:
+        print(shlex.join(pyinstaller_args(manifest, opts.commands_dir)))
+    else:
+        print(manifest.path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Help and usage text rendered from a precomputed model of the commands.
+
+The model is the per-command outline :func:`rcli.manifest.describe_command`
+produces: docstrings, declared options and nested subcommands. The command
+manifest stores it for every module, so ``--help`` for any command is
+answered from the manifest without importing a single handler module::
+
+    mycli --help                 # every command with its summary
+    mycli deploy --help          # usage, description, subcommands, options
+    mycli deploy rollback -h
+    mycli help deploy            # unless a command is registered as "help"
+
+With ``rCli(auto_import=True)`` this works out of the box; commands
+registered directly are described from their loaded handlers. Text is
+wrapped to the terminal width and paged through ``$PAGER`` (``less -FRX``
+by default) when it does not fit on the screen.
+"""
+import os
+import sys
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, TextIO, Tuple
+
+from .parser import CliArgs
+
+# help_path() runs on every dispatch, so anything heavier (shutil and
+# textwrap included) is imported only once help is actually shown.
+if TYPE_CHECKING:
+    from .manifest import CommandManifest
+
+HELP_FLAGS = ("help", "h")
+
+def help_path(args: CliArgs, registry=None) -> Optional[List[str]]:
+    """The command path help was asked for in ``args``, or ``None`` when it was not.
+
+    ``--help`` may come anywhere; as the parser takes the word after it as
+    its value, ``mycli --help deploy`` asks about ``deploy``. ``-h`` counts
+    only as a bare flag, and not after a command that declares an ``h``
+    option of its own (``du -h``).
+    """
+    words = [args.command, *args.subcommands] if args.command else []
+    if "help" in args.global_options:
+        return [*args.global_options["help"], *words]
+    if "help" in args.local_options:
+        return [*words, *args.local_options["help"]]
+    if "help" in args.local_flags or not args.global_flags.isdisjoint(HELP_FLAGS):
+        return words
+    if "h" in args.local_flags and not _declares(registry, words, "h"):
+        return words
+    if args.command == "help" and (registry is None or "help" not in registry.names()):
+        return [*args.subcommands, *args.positionals]
+    return None
+
+def _declares(registry, words: List[str], option: str) -> bool:
+    """Whether the command at ``words`` declares ``option``; nothing is imported."""
+    if registry is None or not words:
+        return False
+    handler = registry.loaded().get(words[0])
+    if handler is not None:
+        from .manifest import describe_command
+        node = describe_command(handler)
+    else:
+        node = registry.details(words[0]) or {}
+    for word in words[1:]:
+        child = node.get("subcommands", {}).get(word)
+        if child is None:
+            break
+        node = child
+    return option in node.get("options", ())
+
+def summary(node: dict) -> str:
+    """First line of a command's description."""
+    doc = node.get("doc", "")
+    return doc.split("\n", 1)[0].strip()
+
+class HelpModel:
+    """Outlines of the registered commands by name, for rendering help."""
+    def __init__(self, commands: Dict[str, dict]):
+        self.commands = commands
+
+    @classmethod
+    def from_manifest(cls, manifest: "CommandManifest") -> "HelpModel":
+        return cls({name: node for entry in manifest.modules.values()
+                    for name, node in entry.get("details", {}).items()})
+
+    @classmethod
+    def from_registry(cls, registry,
+                      manifest: Optional["CommandManifest"] = None) -> "HelpModel":
+        """Loaded handlers are described directly, lazy ones from ``manifest``;
+        nothing is imported.
+        """
+        from .manifest import describe_command
+        stored = cls.from_manifest(manifest).commands if manifest is not None else {}
+        loaded = registry.loaded()
+        commands = {}
+        for name in registry.names():
+            handler = loaded.get(name)
+            if handler is not None:
+                commands[name] = describe_command(handler)
+            else:
+                commands[name] = stored.get(name, {})
+        return cls(commands)
+
+    def lookup(self, path: Sequence[str]) -> Tuple[List[str], Optional[dict]]:
+        """The longest known prefix of ``path`` and its outline (``None`` for an
+        unknown command).
+        """
+        if not path:
+            return [], None
+        node = self.commands.get(path[0])
+        if node is None:
+            return [], None
+        found = [path[0]]
+        for word in path[1:]:
+            child = node.get("subcommands", {}).get(word)
+            if child is None:
+                break
+            found.append(word)
+            node = child
+        return found, node
+
+    def render(self, path: Sequence[str] = (), program: str = "rcli",
+               width: Optional[int] = None) -> str:
+        """Help for the command at ``path``, or the overview of every command."""
+        import shutil
+        width = width or shutil.get_terminal_size((80, 24)).columns
+        found, node = self.lookup(path)
+        if node is None:
+            lines = [f"Unknown command '{path[0]}'.", ""] if path else []
+            return "\n".join(lines + self._overview(program, width)) + "\n"
+        return "\n".join(self._command(program, found, node, width)) + "\n"
+
+    def _overview(self, program: str, width: int) -> List[str]:
+        lines = [f"Usage: {program} COMMAND [ARGS...]", "", "Commands:"]
+        rows = [(name, summary(self.commands[name])) for name in sorted(self.commands)]
+        lines += _table(rows, width)
+        lines += ["", f"Run '{program} COMMAND --help' for help on a command."]
+        return lines
+
+    def _command(self, program: str, path: List[str], node: dict,
+                 width: int) -> List[str]:
+        subcommands = node.get("subcommands", {})
+        usage = [program, *path]
+        if subcommands:
+            usage.append("[SUBCOMMAND]")
+        if node.get("option_help"):
+            usage.append("[OPTIONS]")
+        usage.append("[ARGS...]")
+        import textwrap
+        lines = textwrap.wrap(" ".join(usage), width, initial_indent="Usage: ",
+                              subsequent_indent=" " * 7, break_long_words=False,
+                              break_on_hyphens=False)
+        if node.get("doc"):
+            lines += [""] + _wrap_doc(node["doc"], width)
+        extras = []
+        if node.get("aliases"):
+            aliases = ", ".join(f"@{alias}" for alias in node["aliases"])
+            extras.append(f"Aliases: {aliases}")
+        if node.get("id") is not None:
+            extras.append(f"Id: #{node['id']}")
+        if extras:
+            lines += [""] + extras
+        if subcommands:
+            lines += ["", "Subcommands:"]
+            rows = [(name, summary(child))
+                    for name, child in sorted(subcommands.items())]
+            lines += _table(rows, width)
+        if node.get("option_help"):
+            lines += ["", "Options:"]
+            lines += _table([_option_row(opt) for opt in node["option_help"]], width)
+        return lines
+
+def _flag(name: str) -> str:
+    return f"-{name}" if len(name) == 1 else f"--{name}"
+
+def _option_row(opt: dict) -> Tuple[str, str]:
+    term = ", ".join(_flag(name) for name in (opt["name"], *opt.get("aliases", ())))
+    if opt.get("type") != "bool":
+        term += f" {opt['name'].upper().replace('-', '_')}"
+    notes = []
+    if opt.get("choices"):
+        notes.append("one of " + ", ".join(opt["choices"]))
+    if opt.get("default") is not None and opt.get("type") != "bool":
+        notes.append(f"default {opt['default']}")
+    if opt.get("multiple"):
+        notes.append("repeatable")
+    if opt.get("required"):
+        notes.append("required")
+    text = opt.get("help", "")
+    if notes:
+        text = f"{text} ({'; '.join(notes)})" if text else f"({'; '.join(notes)})"
+    return term, text
+
+def _table(rows: List[Tuple[str, str]], width: int) -> List[str]:
+    """Two indented columns; long terms put their description on the next line."""
+    if not rows:
+        return []
+    import textwrap
+    column = min(max(len(term) for term, _ in rows), max(width // 3, 12)) + 4
+    body = max(width - column, 20)
+    lines = []
+    for term, text in rows:
+        wrapped = textwrap.wrap(text, body) or [""]
+        if len(term) + 4 > column:
+            lines.append(f"  {term}")
+            lines += [" " * column + part for part in wrapped if part]
+        else:
+            lines.append(f"  {term:<{column - 2}}{wrapped[0]}".rstrip())
+            lines += [" " * column + part for part in wrapped[1:]]
+    return lines
+
+def _wrap_doc(doc: str, width: int) -> List[str]:
+    """Refill plain paragraphs to ``width``; indented blocks (examples) are kept
+    as written.
+    """
+    import textwrap
+    lines = []
+    for paragraph in doc.split("\n\n"):
+        if lines:
+            lines.append("")
+        if any(line[:1].isspace() for line in paragraph.splitlines()):
+            lines += paragraph.splitlines()
+        else:
+            lines += textwrap.wrap(" ".join(paragraph.split()), width) or [""]
+    return lines
+
+def page(text: str, stream: Optional[TextIO] = None) -> None:
+    """Write ``text`` to ``stream``, through ``$PAGER`` when it is a terminal the
+    text overflows.
+    """
+    import shutil
+    stream = stream or sys.stdout
+    rows = shutil.get_terminal_size((80, 24)).lines
+    pager = os.environ.get("PAGER", "less -FRX")
+    if pager and stream.isatty() and text.count("\n") >= rows - 1:
+        import shlex
+        import subprocess
+        try:
+            subprocess.run(shlex.split(pager), input=text, text=True, check=False)
+            return
+        except OSError:
+            pass
+    stream.write(text)
+    stream.flush()
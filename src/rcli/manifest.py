@@ -0,0 +1,220 @@
+import importlib
+import json
+import os
+import sys
+from inspect import cleandoc, isclass
+from logging import getLogger
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .profiling import startup_phase
+from .registry import CommandRegistry
+
+logger = getLogger("rCli.manifest")
+
+MANIFEST_NAME = ".rcli_manifest.json"
+MANIFEST_VERSION = 3
+
+def iter_command_files(commands_path: Path) -> Iterator[Path]:
+    """Yield every command module file below ``commands_path``, skipping
+    ``__init__.py``.
+    """
+    for file in sorted(commands_path.rglob("*.py")):
+        if file.name != "__init__.py":
+            yield file
+
+def bundled_manifest_path(package_name: str) -> Path:
+    """Where the manifest for ``package_name`` is unpacked in a frozen application."""
+    base = getattr(sys, "_MEIPASS", None) or os.path.dirname(sys.executable)
+    return Path(base, *package_name.split("."), MANIFEST_NAME)
+
+def manifest_path(commands_dir: str) -> Path:
+    """Where the manifest of ``commands_dir`` is read from, frozen or not."""
+    if getattr(sys, "frozen", False):
+        return bundled_manifest_path(commands_dir.replace("/", ".").replace("\\", "."))
+    return Path(commands_dir) / MANIFEST_NAME
+
+def module_name_for(file: Path) -> str:
+    """Dotted module path for ``file``, relative to the working directory."""
+    rel_path = file.resolve().relative_to(Path.cwd().resolve())
+    return ".".join(rel_path.with_suffix('').parts)
+
+def import_recording(module_name: str, registry: CommandRegistry) -> List[str]:
+    """Import (or reload) ``module_name`` and return the command names it registered."""
+    with registry.recording() as names, registry.active(), \
+            startup_phase(f"import {module_name}", "import"):
+        if module_name in sys.modules:
+            importlib.reload(sys.modules[module_name])
+        else:
+            importlib.import_module(module_name)
+    return names
+
+def _option_names(plan) -> List[str]:
+    if not plan:
+        return []
+    return [name for opt in plan.options for name in (opt.name, *opt.aliases)]
+
+def _option_help(plan) -> List[dict]:
+    if not plan:
+        return []
+    return [{
+        "name": opt.name,
+        "aliases": list(opt.aliases),
+        "type": getattr(opt.type, "__name__", str(opt.type)),
+        "default": None if opt.default is None else str(opt.default),
+        "choices": (None if opt.choices is None
+                    else [str(choice) for choice in opt.choices]),
+        "multiple": opt.multiple,
+        "required": opt.required,
+        "help": opt.help,
+    } for opt in plan.options]
+
+def _doc(obj: object) -> str:
+    # The object's own docstring only; inspect.getdoc would fall back to
+    # CommandHandler's for undocumented handler classes.
+    doc = obj.__dict__.get("__doc__") if isclass(obj) else getattr(obj, "__doc__", None)
+    return cleandoc(doc) if doc else ""
+
+def _node(plan=None, doc: str = "") -> dict:
+    return {"options": _option_names(plan), "option_help": _option_help(plan),
+            "doc": doc, "subcommands": {}}
+
+def describe_command(handler: object) -> dict:
+    """A JSON-ready outline of a handler: its docstring, options and nested subcommands.
+
+    Handler classes also contribute their ``aliases`` and ``command_id``.
+    This is what shell completion and ``--help`` read instead of importing
+    the handler.
+    """
+    if not isclass(handler):
+        return _node(getattr(handler, "_option_plan", None), _doc(handler))
+    run = handler.__dict__.get("run")
+    doc = _doc(handler) or (_doc(run) if run else "")
+    node = _node(getattr(handler, "_option_plan", None), doc)
+    node["aliases"] = list(getattr(handler, "aliases", ()) or ())
+    command_id = getattr(handler, "command_id", None)
+    node["id"] = str(command_id) if command_id is not None else None
+    plans = getattr(handler, "_subcommand_plans", {})
+    for sub_name, func in getattr(handler, "commands", {}).items():
+        *parents, leaf = sub_name.split()
+        parent = node
+        for part in parents:
+            parent = parent["subcommands"].setdefault(part, _node())
+        if isclass(func):
+            child = describe_command(func)
+        else:
+            child = _node(plans.get(sub_name), _doc(func))
+        existing = parent["subcommands"].get(leaf)
+        if existing is not None:
+            child["subcommands"].update(existing["subcommands"])
+        parent["subcommands"][leaf] = child
+    return node
+
+class CommandManifest:
+    """Maps command modules to the names they register, with the mtime they were
+    read at.
+
+    The manifest is stored as JSON::
+
+        {"version": 3,
+         "modules": {"commands.foo": {"file": "commands/foo.py",
+                                      "mtime": 1700000000000000000,
+                                      "commands": ["foo", "f"],
+                                      "details": {"foo": {...}, "f": {...}}}}}
+
+    ``details`` holds :func:`describe_command` for each name.
+    """
+    def __init__(self, path: Path, modules: Optional[Dict[str, dict]] = None):
+        self.path = Path(path)
+        self.modules: Dict[str, dict] = modules or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "CommandManifest":
+        """Read the manifest at ``path``; a missing or unreadable file gives an
+        empty one.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("modules", {}))
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": MANIFEST_VERSION, "modules": self.modules}, fh,
+                      indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def commands(self) -> Dict[str, str]:
+        """Command name to owning module."""
+        return {name: module for module, entry in self.modules.items()
+                for name in entry["commands"]}
+
+    def register_lazy(self, registry: CommandRegistry) -> None:
+        """Register every listed command without importing it, with its outline
+        as details.
+        """
+        for module_name, entry in self.modules.items():
+            details = entry.get("details", {})
+            for name in entry["commands"]:
+                registry.register_lazy(name, module_name, details.get(name))
+
+    def refresh(self, commands_path: Path, registry: CommandRegistry) -> bool:
+        """Bring the manifest in line with the files under ``commands_path``.
+
+        Only modules that are new or whose mtime changed are imported. Returns
+        ``True`` when an entry was added, updated or dropped.
+        """
+        seen = set()
+        changed = False
+        for file in iter_command_files(commands_path):
+            module_name = module_name_for(file)
+            seen.add(module_name)
+            mtime = file.stat().st_mtime_ns
+            entry = self.modules.get(module_name)
+            if entry is not None and entry["mtime"] == mtime:
+                continue
+            logger.debug(f"Manifest entry for {module_name} is stale, importing")
+            names = import_recording(module_name, registry)
+            loaded = registry.loaded()
+            self.modules[module_name] = {
+                "file": file.as_posix(),
+                "mtime": mtime,
+                "commands": names,
+                "details": {name: describe_command(loaded[name])
+                            for name in names if name in loaded},
+            }
+            changed = True
+        for module_name in set(self.modules) - seen:
+            del self.modules[module_name]
+            changed = True
+        return changed
+
+def load_command_manifest(commands_dir: str, registry: Optional[CommandRegistry] = None,
+                          path: Optional[str] = None) -> CommandManifest:
+    """Register every command under ``commands_dir`` lazily, via the manifest.
+
+    The manifest (``<commands_dir>/.rcli_manifest.json`` unless ``path`` is
+    given) is rewritten only when a module changed; the modules themselves
+    are imported by :meth:`CommandRegistry.get` when their command is used.
+    """
+    registry = registry or CommandRegistry()
+    commands_path = Path(commands_dir)
+    manifest = CommandManifest.load(
+        Path(path) if path else commands_path / MANIFEST_NAME)
+    if manifest.refresh(commands_path, registry):
+        logger.debug(f"Writing command manifest {manifest.path}")
+        try:
+            manifest.save()
+            from .completion import write_completion_index
+            write_completion_index(manifest)
+        except OSError as e:
+            # E.g. an installed, read-only commands package: the in-memory
+            # manifest still serves this process.
+            logger.debug(f"Could not write command manifest {manifest.path}: {e}")
+    manifest.register_lazy(registry)
+    return manifest
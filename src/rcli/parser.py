@@ -1,94 +1,386 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Set, Any
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from typing import (List, Tuple, FrozenSet, Iterable, Iterator, Mapping, Any, Optional,
+                    Sequence, Union)
 import re
+import sys
 
-@dataclass
+# slots=True needs Python 3.10; older versions still get a frozen dataclass.
+_SLOTS = {"slots": True} if sys.version_info[:2] >= (3, 10) else {}
+
+# Shared empty containers, so the common invocation with no options, flags
+# or positionals allocates nothing for them.
+_NO_OPTIONS: Mapping[str, Tuple[str, ...]] = MappingProxyType({})
+_NO_FLAGS: FrozenSet[str] = frozenset()
+
+@dataclass(frozen=True, **_SLOTS)
 class CliArgs:
+    """An immutable, parsed invocation.
+
+    Options are read-only mappings from the option name to every value it
+    was given, in order (``--include a --include b`` gives
+    ``{"include": ("a", "b")}``). Flags are frozensets and the other
+    sequences tuples, so instances can be cached and shared freely. Use
+    :func:`dataclasses.replace` to derive a modified copy. The hash leaves out
+    the mappings (which cannot be hashed) and ``input``.
+    """
     program: str = ""
-    global_options: Dict[str, str] = field(default_factory=dict)
-    global_flags: Set[str] = field(default_factory=set)
+    global_options: Mapping[str, Tuple[str, ...]] = field(
+        default_factory=lambda: _NO_OPTIONS, hash=False)
+    global_flags: FrozenSet[str] = _NO_FLAGS
     command: str = ""
-    subcommands: List[str] = field(default_factory=list)
-    local_options: Dict[str, str] = field(default_factory=dict)
-    local_flags: Set[str] = field(default_factory=set)
-    positionals: List[str] = field(default_factory=list)
-    context_args: List[str] = field(default_factory=list) 
-    
-def parse_args(args: list[str]) -> CliArgs:
-    parsed_args = pa = CliArgs()
-    pa.program = args.pop(0)
-
-    passed_global_scope = False
-
-    def current_scope():
-        return ("global_options", "global_flags") if not passed_global_scope else ("local_options", "local_flags")
-
-    def set_option(name: str, value: str):
-        opt_dict, _ = current_scope()
-        target = getattr(pa, opt_dict)
-        if name in target:
-            # Append to existing list-style values
-            target[name] += f",{value}"
+    subcommands: Tuple[str, ...] = ()
+    local_options: Mapping[str, Tuple[str, ...]] = field(
+        default_factory=lambda: _NO_OPTIONS, hash=False)
+    local_flags: FrozenSet[str] = _NO_FLAGS
+    # A LazyPositionals stream instead of a tuple when parsed by parse_stream().
+    positionals: Union[Tuple[str, ...], "LazyPositionals"] = ()
+    context_args: Tuple[str, ...] = ()
+    # Typed option values from the command's option schema (see rcli.schema),
+    # filled in by the dispatcher.
+    values: Mapping[str, Any] = field(default_factory=lambda: _NO_OPTIONS,
+                                      hash=False)
+    # Records streamed from the previous stage of a pipeline (see
+    # rcli.pipeline); None outside a pipeline or for its first stage.
+    input: Optional[Iterable[Any]] = field(default=None, hash=False)
+
+    def option(self, name: str, default: Any = None) -> Any:
+        """Last value given for ``name``; the local scope wins over the global one."""
+        values = self.local_options.get(name) or self.global_options.get(name)
+        return values[-1] if values else default
+
+    def option_values(self, name: str) -> Tuple[str, ...]:
+        """Every value given for ``name``, global scope first."""
+        return self.global_options.get(name, ()) + self.local_options.get(name, ())
+
+    def count(self, name: str) -> int:
+        """How often option ``name`` was given, in either scope."""
+        return (len(self.global_options.get(name, ()))
+                + len(self.local_options.get(name, ())))
+
+    def __reduce__(self):
+        # Read-only mappings do not pickle; process pools need CliArgs to.
+        # A pipeline's ``input`` stream is not sent along.
+        return (_unpickle_cli_args, (
+            self.program, dict(self.global_options), self.global_flags,
+            self.command, self.subcommands, dict(self.local_options),
+            self.local_flags, self.positionals, self.context_args, dict(self.values),
+        ))
+
+if _SLOTS:
+    class _CliArgsBuilder:
+        """Writable twin of CliArgs with the same slot layout.
+
+        The frozen dataclass ``__init__`` sets every field through
+        ``object.__setattr__``, which makes it cost more than the rest of a
+        short parse. The parser fills one of these in with plain attribute
+        stores instead and then turns it into a CliArgs by assigning
+        ``__class__``, which the identical layout allows.
+        """
+        __slots__ = CliArgs.__slots__
+
+        def __init__(self, program, global_options, global_flags, command, subcommands,
+                     local_options, local_flags, positionals, context_args,
+                     values=_NO_OPTIONS, input=None):
+            self.program = program
+            self.global_options = global_options
+            self.global_flags = global_flags
+            self.command = command
+            self.subcommands = subcommands
+            self.local_options = local_options
+            self.local_flags = local_flags
+            self.positionals = positionals
+            self.context_args = context_args
+            self.values = values
+            self.input = input
+
+    def _new_cli_args(*fields) -> CliArgs:
+        args = _CliArgsBuilder(*fields)
+        args.__class__ = CliArgs
+        return args
+else:
+    _new_cli_args = CliArgs
+
+def _unpickle_cli_args(program, global_options, global_flags, command, subcommands,
+                       local_options, local_flags, positionals, context_args,
+                       values) -> CliArgs:
+    return _new_cli_args(program, MappingProxyType(global_options), global_flags,
+                         command, subcommands, MappingProxyType(local_options),
+                         local_flags, positionals, context_args,
+                         MappingProxyType(values))
+
+class LazyPositionals:
+    """Positionals read from a token stream on demand, for argv too large to hold.
+
+    Iterate it once to consume the positionals. Only what the dispatcher
+    needs from a tuple is supported besides that: ``p[i]`` and ``p[:n]`` read
+    ahead and buffer just those tokens, ``p[n:]`` drops a prefix, and
+    ``words + p`` prepends. Derived streams share the underlying iterator.
+    """
+    __slots__ = ("_head", "_rest")
+
+    def __init__(self, rest: Iterable[str], head: Iterable[str] = ()):
+        self._head = list(head)
+        self._rest = iter(rest)
+
+    def _fill(self, n: int) -> None:
+        head, rest = self._head, self._rest
+        while len(head) < n:
+            token = next(rest, None)
+            if token is None:
+                return
+            head.append(token)
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            self._fill(index + 1)
+            return self._head[index]
+        if isinstance(index, slice) and index.step is None:
+            start, stop = index.start or 0, index.stop
+            if stop is None and start >= 0:
+                self._fill(start)
+                return LazyPositionals(self._rest, self._head[start:])
+            if start == 0 and stop >= 0:
+                self._fill(stop)
+                return tuple(self._head[:stop])
+        raise TypeError(f"LazyPositionals does not support index {index!r}")
+
+    def __radd__(self, words: Tuple[str, ...]) -> "LazyPositionals":
+        return LazyPositionals(self._rest, (*words, *self._head))
+
+    def __iter__(self) -> Iterator[str]:
+        head, self._head = self._head, []
+        yield from head
+        yield from self._rest
+
+    def __bool__(self) -> bool:
+        self._fill(1)
+        return bool(self._head)
+
+    def __repr__(self) -> str:
+        return f"LazyPositionals(head={self._head!r}, ...)"
+
+# Context-symbol prefixes, keyed by first character. "/" alone is a context
+# arg, "?" only when followed by one of the listed characters.
+_CONTEXT_SECOND = {"/": None, "?": frozenset("#@?")}
+
+# Every "-"-prefixed token is classified by a single precompiled match. The
+# alternatives are tried in the same order as the old if/elif chain, and the
+# group that matched (``lastindex``) picks the branch.
+_DASH_TOKEN = re.compile(
+    r"--([\w-]+)=.+$"        # 1: --key=value
+    r"|--([\w-]+)$"          # 2: --flag or --key value
+    r"|-([a-zA-Z]{2,})$"     # 3: -abc (combined short flags)
+    r"|-([a-zA-Z])$"         # 4: -x or -x value
+)
+_KEY_VALUE, _LONG, _SHORT_GROUP, _SHORT = 1, 2, 3, 4
+
+# Reserved options that never take the next token as their value, so
+# ``mycli --rcli-profile mycommand`` profiles mycommand; a value must be
+# given as ``--name=value``. See rcli.profiling.PROFILE_OPTION.
+_BARE_OPTIONS = frozenset({"rcli-profile"})
+
+# Token classes for the first-character dispatch table.
+_PLAIN, _CONTEXT, _DASH, _QUERY = 0, 1, 2, 3
+_FIRST_CHAR = {"/": _CONTEXT, "?": _CONTEXT, "-": _DASH,
+               "@": _QUERY, ":": _QUERY, "#": _QUERY}
+
+# Set by enable_parse_cache(): an lru_cache-wrapped _parse keyed on the argv tuple.
+_parse_cache = None
+
+def enable_parse_cache(maxsize: Optional[int] = 1024) -> None:
+    """Memoise :func:`parse_args` on the argv tuple, keeping ``maxsize`` entries.
+
+    Worth it for REPL and batch use where the same argv is parsed
+    repeatedly. Calling it again starts a new, empty cache.
+    """
+    global _parse_cache
+    _parse_cache = lru_cache(maxsize=maxsize)(_parse)
+
+def disable_parse_cache() -> None:
+    global _parse_cache
+    _parse_cache = None
+
+def parse_cache_info():
+    """``hits``, ``misses``, ``maxsize`` and ``currsize`` of the parse cache, or
+    ``None`` when off.
+    """
+    return _parse_cache.cache_info() if _parse_cache is not None else None
+
+def parse_args(args: Sequence[str]) -> CliArgs:
+    """Parse ``argv`` (program name first) into a :class:`CliArgs`.
+
+    Tokens are classified in a single pass by their first character, so plain
+    words never touch a regex and ``-`` tokens need exactly one precompiled
+    match. ``args`` is walked by index and left untouched.
+    """
+    if _parse_cache is not None:
+        return _parse_cache(tuple(args))
+    return _parse(args)
+
+def parse_stream(tokens: Iterable[str], lazy_positionals: bool = False) -> CliArgs:
+    """Parse argv (program name first) from any iterable, such as a generator.
+
+    By default this is ``parse_args`` over the materialised tokens. With
+    ``lazy_positionals`` only the tokens up to the first positional are read;
+    the rest stay in the stream and become a :class:`LazyPositionals`, read
+    as the handler iterates ``args.positionals``. Everything from the first
+    positional on is then a positional, so options must come before the
+    targets, as with ``xargs``.
+    """
+    tokens = iter(tokens)
+    if not lazy_positionals:
+        return parse_args(tuple(tokens))
+
+    # Mirror _parse's classification just far enough to find the first positional.
+    head = list(islice(tokens, 1))
+    first_char = _FIRST_CHAR.get
+    dash_match = _DASH_TOKEN.match
+    has_command = has_subcommand = takes_value = False
+    for arg in tokens:
+        if takes_value and not arg.startswith("-"):
+            takes_value = False
+            head.append(arg)
+            continue
+        takes_value = False
+        kind = first_char(arg[:1], _PLAIN)
+        if kind == _CONTEXT:
+            allowed = _CONTEXT_SECOND[arg[0]]
+            if allowed is None or arg[1:2] in allowed:
+                head.append(arg)
+                continue
+        elif kind == _DASH:
+            m = dash_match(arg)
+            if m is not None:
+                takes_value = (m.lastindex in (_LONG, _SHORT)
+                               and arg.lstrip("-") not in _BARE_OPTIONS)
+                head.append(arg)
+                continue
+        elif kind == _QUERY and len(arg) > 1 and arg[1] != "\n":
+            has_command = True
+            head.append(arg)
+            continue
+
+        if not has_command:
+            has_command = True
+            head.append(arg)
+        elif not has_subcommand:
+            has_subcommand = True
+            head.append(arg)
         else:
-            target[name] = value
-
-    def set_flag(name: str):
-        _, flag_set = current_scope()
-        getattr(pa, flag_set).add(name)
-
-    def parse():
-        nonlocal passed_global_scope
-        while args:
-            arg = args.pop(0)
-            
-            # Handle context-symbol-prefixed args
-            context_prefixes = ["/", "?#", "?@", "??"]
-            if any(arg.startswith(prefix) for prefix in context_prefixes):
-                pa.context_args.append(arg)
-                passed_global_scope = True
-            # --key=value
-            elif re.match(r"^--[\w-]+=.+$", arg):
-                name, val = arg[2:].split("=", 1)
-                set_option(name, val)
-            # --flag or --key (space-separated value)
-            elif re.match(r"^--[\w-]+$", arg):
-                name = arg[2:]
-                if args and not args[0].startswith("-"):
-                    val = args.pop(0)
-                    set_option(name, val)
+            return replace(_parse(head), positionals=LazyPositionals(tokens, (arg,)))
+    return replace(_parse(head), positionals=LazyPositionals(()))
+
+def _freeze_options(options: dict) -> Mapping[str, Tuple[str, ...]]:
+    if not options:
+        return _NO_OPTIONS
+    for name, values in options.items():
+        # Only repeated options hold a list; see _parse.
+        if values.__class__ is list:
+            options[name] = tuple(values)
+    return MappingProxyType(options)
+
+def _parse(args: Sequence[str]) -> CliArgs:
+    program = args[0]
+    global_options, global_flags = {}, set()
+    local_options, local_flags = {}, set()
+    options, flags = global_options, global_flags
+    command = ""
+    subcommands = []
+    positionals = []
+    context_args = []
+    first_char = _FIRST_CHAR.get
+    dash_match = _DASH_TOKEN.match
+    context_second = _CONTEXT_SECOND
+    n = len(args)
+    i = 1
+
+    while i < n:
+        arg = args[i]
+        i += 1
+        kind = first_char(arg[:1], _PLAIN)
+
+        if kind == _CONTEXT:
+            allowed = context_second[arg[0]]
+            if allowed is None or arg[1:2] in allowed:
+                context_args.append(arg)
+                # Context args end the global scope
+                options, flags = local_options, local_flags
+                continue
+            kind = _PLAIN
+        elif kind == _DASH:
+            m = dash_match(arg)
+            if m is None:
+                kind = _PLAIN
+            else:
+                group = m.lastindex
+                if group == _KEY_VALUE:
+                    name, val = arg[2:].split("=", 1)
+                elif group == _SHORT_GROUP:
+                    for ch in arg[1:]:
+                        flags.add(ch)
+                    continue
                 else:
-                    set_flag(name)
-            # -abc (combined short flags)
-            elif re.match(r"^-[a-zA-Z]{2,}$", arg):
-                for ch in arg[1:]:
-                    set_flag(ch)
-            # -x value
-            elif re.match(r"^-[a-zA-Z]$", arg):
-                name = arg[1:]
-                if args and not args[0].startswith("-"):
-                    val = args.pop(0)
-                    set_option(name, val)
+                    name = arg[2:] if group == _LONG else arg[1:]
+                    if (i < n and not args[i].startswith("-")
+                            and name not in _BARE_OPTIONS):
+                        val = args[i]
+                        i += 1
+                    else:
+                        flags.add(name)
+                        continue
+                values = options.get(name)
+                if values is None:
+                    # Already in its final form for the common single value
+                    options[name] = (val,)
+                elif values.__class__ is tuple:
+                    options[name] = [*values, val]
                 else:
-                    set_flag(name)
-            # "Search queries as command"
-            elif re.match(r"^[@:#].+", arg):
-                pa.command = arg  # e.g., @alias, :name, #id
-            # Command
-            elif not pa.command:
-                pa.command = arg
-                passed_global_scope = True
-            # First subcommand
-            elif not pa.subcommands:
-                pa.subcommands.append(arg)
-            # Positionals
-            else:
-                pa.positionals.append(arg)
+                    # Repeated options accumulate, one O(1) append each
+                    values.append(val)
+                continue
+        elif kind == _QUERY:
+            # "Search queries as command", e.g. @alias, :name, #id
+            if len(arg) > 1 and arg[1] != "\n":
+                command = arg
+                continue
+            kind = _PLAIN
 
-    parse()
-    return pa
+        # Command
+        if not command:
+            command = arg
+            options, flags = local_options, local_flags
+        # First subcommand
+        elif not subcommands:
+            subcommands.append(arg)
+        # Positionals
+        else:
+            positionals.append(arg)
+
+    return _new_cli_args(
+        program,
+        _freeze_options(global_options),
+        frozenset(global_flags) if global_flags else _NO_FLAGS,
+        command,
+        tuple(subcommands),
+        _freeze_options(local_options),
+        frozenset(local_flags) if local_flags else _NO_FLAGS,
+        tuple(positionals),
+        tuple(context_args),
+    )
+
+def reconstruct_args(parsed: CliArgs, ignore_global=False, ignore_program=True,
+                     canonical=False) -> List[str]:
+    """Tokens that parse back to ``parsed``.
 
-def reconstruct_args(parsed: CliArgs, ignore_global=False, ignore_program=True) -> List[str]:
+    With ``canonical``, options are emitted sorted by name and flags sorted,
+    so invocations that differ only in their order give the same tokens.
+    """
     args = []
+    # Dicts keep the order options were given in, frozensets have none.
+    order = sorted if canonical else list
 
     if not ignore_program:
         args.append(parsed.program)
@@ -101,26 +393,20 @@ def reconstruct_args(parsed: CliArgs, ignore_global=False, ignore_program=True)
 
     # Add global options
     if not ignore_global:
-        for name, value in parsed.global_options.items():
-            if ',' in value:
-                for val in value.split(','):
-                    args.append(f"--{name}={val}")
-            else:
+        for name in order(parsed.global_options):
+            for value in parsed.global_options[name]:
                 args.append(f"--{name}={value}")
 
-        for flag in parsed.global_flags:
+        for flag in order(parsed.global_flags):
             args.append(f"--{flag}")
 
     args.extend(parsed.subcommands)
 
-    for name, value in parsed.local_options.items():
-        if ',' in value:
-            for val in value.split(','):
-                args.append(f"--{name}={val}")
-        else:
+    for name in order(parsed.local_options):
+        for value in parsed.local_options[name]:
             args.append(f"--{name}={value}")
 
-    for flag in parsed.local_flags:
+    for flag in order(parsed.local_flags):
         args.append(f"--{flag}")
 
     args.extend(parsed.positionals)
@@ -0,0 +1,113 @@
+"""In-process pipelines: ``a | b | c`` with Python objects streamed between stages.
+
+Each stage is an ordinary command. It reads the previous stage's records
+from ``args.input`` and returns (or yields) its own::
+
+    @cog("grep")
+    class Grep(CommandHandler):
+        def run(self, args, ctx=None):
+            pattern = args.subcommands[0]
+            for record in args.input:
+                if pattern in record["name"]:
+                    yield record
+
+    mycli users '|' grep adm '|' head 5
+
+Stages are chained as generators and pulled one record at a time from the
+last stage, so a stage only does work when the next one asks for a record
+and nothing is buffered between them. When the consumer stops early,
+e.g. after :func:`head`, every upstream generator is closed, which raises
+``GeneratorExit`` at its ``yield`` so it can release what it holds.
+
+A handler that returns a non-iterable value (or a string, bytes or mapping)
+produces one record; ``None`` produces none.
+"""
+from collections.abc import Iterable, Mapping
+from dataclasses import replace
+from typing import Any, Iterator, List, Optional, Sequence
+
+from .dispatch import Dispatcher
+from .parser import CliArgs, parse_args
+
+PIPE = "|"
+
+class PipelineError(ValueError):
+    """Raised for a malformed pipeline, e.g. an empty stage."""
+
+def split_pipeline(tokens: Sequence[str]) -> List[List[str]]:
+    """Split argv tokens (without the program name) on ``|`` tokens."""
+    stages: List[List[str]] = [[]]
+    for token in tokens:
+        if token == PIPE:
+            stages.append([])
+        else:
+            stages[-1].append(token)
+    if any(not stage for stage in stages):
+        raise PipelineError("Empty stage in pipeline")
+    return stages
+
+def records(result: Any) -> Iterator[Any]:
+    """Iterator over the records a stage produced."""
+    if result is None:
+        return iter(())
+    if (isinstance(result, (str, bytes, bytearray, Mapping))
+            or not isinstance(result, Iterable)):
+        return iter((result,))
+    return iter(result)
+
+class Pipeline:
+    """Parsed stages of a pipeline, run against a :class:`~rcli.dispatch.Dispatcher`."""
+    def __init__(self, stages: Sequence[CliArgs],
+                 dispatcher: Optional[Dispatcher] = None):
+        if not stages:
+            raise PipelineError("A pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.dispatcher = dispatcher or Dispatcher()
+
+    @classmethod
+    def from_argv(cls, argv: Sequence[str],
+                  dispatcher: Optional[Dispatcher] = None) -> "Pipeline":
+        """Build from an argv (program name first) with ``|`` between stages."""
+        program = argv[0]
+        stages = [parse_args([program, *stage]) for stage in split_pipeline(argv[1:])]
+        return cls(stages, dispatcher)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.run()
+
+    def run(self, source: Optional[Iterable] = None,
+            ctx: Optional[object] = None) -> Iterator[Any]:
+        """Yield the records of the last stage; ``source`` feeds the first stage's
+        ``input``.
+        """
+        dispatcher = self.dispatcher
+        upstream = iter(source) if source is not None else None
+        opened = []
+        try:
+            for args in self.stages:
+                target, args = dispatcher.prepare(replace(args, input=upstream))
+                context = dispatcher.context_for(target, args, ctx)
+                upstream = records(dispatcher._run(target, args, context))
+                opened.append(upstream)
+            yield from upstream
+        finally:
+            # Last stage first, so each generator is closed before its source.
+            for stage in reversed(opened):
+                close = getattr(stage, "close", None)
+                if close is not None:
+                    close()
+
+def head(args: CliArgs, ctx: Optional[object] = None) -> Iterator[Any]:
+    """A ready-made stage passing on the first N records (``head 5`` or
+    ``head --n=5``; default 10).
+
+    Opt in with ``registry.register(head, "head")``.
+    """
+    words = args.subcommands + args.positionals
+    count = int(args.option("n") or (words[0] if words else 10))
+    if count <= 0 or args.input is None:
+        return
+    for i, record in enumerate(args.input, 1):
+        yield record
+        if i >= count:
+            return
@@ -0,0 +1,227 @@
+"""Per-phase wall and CPU timing for rCli invocations.
+
+Phases recorded: importing the ``rcli`` package, each module imported by
+``auto_import_subcommands``, ``parse_args``, dispatch and the handler run.
+Profiling is switched on by the reserved global option::
+
+    mycli --rcli-profile mycommand ...             # phases as JSON on stderr
+    mycli --rcli-profile=json mycommand ...        # the same
+    mycli --rcli-profile=chrome --rcli-profile-out=trace.json mycommand ...
+    mycli --rcli-profile=cprofile mycommand ...    # also cProfile the handler
+
+or, to include everything from interpreter start, by the environment::
+
+    RCLI_PROFILE=chrome RCLI_PROFILE_OUT=trace.json RCLI_PROFILE_SAMPLE=0.01 mycli ...
+
+``RCLI_PROFILE_SAMPLE`` profiles only that fraction of invocations, for
+sampling in production. When no profiler is active the hooks cost one global
+lookup, except for the startup phases, which are always kept in a small
+bounded buffer so a profiler switched on by the flag can still report them.
+
+Programmatic use::
+
+    profiler = profiling.start("chrome", output="trace.json")
+    with profiling.phase("load-config", "app"):
+        ...
+    profiling.stop().report()
+"""
+import atexit
+import os
+import sys
+from _thread import get_ident
+from collections import deque
+from time import perf_counter_ns, process_time_ns
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+PROFILE_OPTION = "rcli-profile"
+PROFILE_OUT_OPTION = "rcli-profile-out"
+FORMATS = ("json", "chrome", "cprofile")
+
+class Phase(NamedTuple):
+    name: str
+    category: str
+    start_ns: int
+    wall_ns: int
+    cpu_ns: int
+    thread_id: int
+
+class _Timer:
+    """Context manager timing one phase into ``sink``."""
+    __slots__ = ("sink", "name", "category", "start", "cpu")
+
+    def __init__(self, sink, name: str, category: str):
+        self.sink = sink
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.cpu = process_time_ns()
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        wall = perf_counter_ns() - self.start
+        cpu = process_time_ns() - self.cpu
+        self.sink(Phase(self.name, self.category, self.start, wall, cpu, get_ident()))
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullTimer()
+
+# Startup phases seen before any profiler was active.
+_startup: deque = deque(maxlen=4096)
+
+active: Optional["Profiler"] = None
+
+def phase(name: str, category: str = "rcli"):
+    """Time a ``with`` block into the active profiler; a no-op when there is none."""
+    profiler = active
+    if profiler is None:
+        return _NULL
+    return profiler.phase(name, category)
+
+def startup_phase(name: str, category: str = "startup"):
+    """Like :func:`phase`, but kept for a later profiler when none is active yet."""
+    profiler = active
+    record = profiler.phases.append if profiler is not None else _startup.append
+    return _Timer(record, name, category)
+
+class Profiler:
+    """Collects :class:`Phase` records and renders them as JSON or a Chrome trace."""
+    def __init__(self, fmt: str = "json", output: Optional[str] = None):
+        if fmt not in FORMATS:
+            raise ValueError(
+                f"profile format must be one of {', '.join(FORMATS)}, not '{fmt}'")
+        self.format = fmt
+        self.output = output
+        self.phases: List[Phase] = []
+        self.cprofile = None
+
+    def phase(self, name: str, category: str = "rcli") -> _Timer:
+        return _Timer(self.phases.append, name, category)
+
+    def run_handler(self, func, *args):
+        """Call the handler inside a ``run`` phase, under cProfile in ``cprofile``
+        format.
+        """
+        with _Timer(self.phases.append, "run", "handler"):
+            if self.format != "cprofile":
+                return func(*args)
+            import cProfile
+            self.cprofile = self.cprofile or cProfile.Profile()
+            return self.cprofile.runcall(func, *args)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"phases": [
+            {"name": p.name, "category": p.category, "start_ns": p.start_ns,
+             "wall_ns": p.wall_ns, "cpu_ns": p.cpu_ns, "thread": p.thread_id}
+            for p in sorted(self.phases, key=lambda p: p.start_ns)
+        ]}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Trace-event format, loadable in ``chrome://tracing`` or Perfetto."""
+        origin = min((p.start_ns for p in self.phases), default=0)
+        pid = os.getpid()
+        return {"displayTimeUnit": "ms", "traceEvents": [
+            {"name": p.name, "cat": p.category, "ph": "X", "pid": pid,
+             "tid": p.thread_id,
+             "ts": (p.start_ns - origin) / 1000, "dur": p.wall_ns / 1000,
+             "args": {"cpu_us": p.cpu_ns / 1000}}
+            for p in self.phases
+        ]}
+
+    def report(self) -> None:
+        """Write the profile to ``output`` (stderr when unset)."""
+        import json
+        data = self.to_chrome_trace() if self.format == "chrome" else self.to_json()
+        text = json.dumps(data, indent=1)
+        if self.output:
+            with open(self.output, "w", encoding="utf-8") as fh:
+                fh.write(text)
+        else:
+            print(text, file=sys.stderr)
+        if self.cprofile is not None:
+            if self.output:
+                self.cprofile.dump_stats(self.output + ".pstats")
+            else:
+                import pstats
+                stats = pstats.Stats(self.cprofile, stream=sys.stderr)
+                stats.sort_stats("cumulative").print_stats(25)
+
+def _package_import_phase() -> Optional[Phase]:
+    stamps = getattr(sys.modules.get("rcli"), "_import_stamps", None)
+    if stamps is None:
+        return None
+    start, end, cpu_start, cpu_end = stamps
+    return Phase("import rcli", "startup", start, end - start, cpu_end - cpu_start,
+                 get_ident())
+
+def start(fmt: str = "json", output: Optional[str] = None) -> Profiler:
+    """Make a new :class:`Profiler` active, seeded with the startup phases seen so
+    far.
+    """
+    global active
+    profiler = Profiler(fmt, output)
+    package_phase = _package_import_phase()
+    if package_phase is not None:
+        profiler.phases.append(package_phase)
+    profiler.phases.extend(_startup)
+    _startup.clear()
+    active = profiler
+    return profiler
+
+def stop() -> Optional[Profiler]:
+    """Deactivate and return the current profiler."""
+    global active
+    profiler, active = active, None
+    return profiler
+
+def start_from_environment() -> Optional[Profiler]:
+    """Start profiling if ``RCLI_PROFILE`` is set, honouring ``RCLI_PROFILE_SAMPLE``."""
+    fmt = os.environ.get("RCLI_PROFILE")
+    if not fmt or active is not None:
+        return None
+    sample = float(os.environ.get("RCLI_PROFILE_SAMPLE", "1"))
+    if sample < 1:
+        import random
+        if random.random() >= sample:
+            return None
+    profiler = start(fmt, os.environ.get("RCLI_PROFILE_OUT") or None)
+    atexit.register(_report_at_exit, profiler)
+    return profiler
+
+def _report_at_exit(profiler: Profiler) -> None:
+    if active is profiler:
+        stop()
+    profiler.report()
+
+def start_from_args(args) -> Tuple[Optional[Profiler], Any]:
+    """Start profiling as requested by ``--rcli-profile`` and strip the reserved
+    options.
+
+    Returns the profiler (``None`` if one was already running) and ``args``
+    without the reserved options, so handlers never see them.
+    """
+    from dataclasses import replace
+    from types import MappingProxyType
+
+    values = args.global_options.get(PROFILE_OPTION)
+    fmt = values[-1] if values else "json"
+    if fmt not in FORMATS:
+        raise ValueError(
+            f"--{PROFILE_OPTION} must be one of {', '.join(FORMATS)}, got '{fmt}'")
+    output = args.global_options.get(PROFILE_OUT_OPTION, (None,))[-1]
+    options = {k: v for k, v in args.global_options.items()
+               if k not in (PROFILE_OPTION, PROFILE_OUT_OPTION)}
+    args = replace(args, global_options=MappingProxyType(options),
+                   global_flags=args.global_flags - {PROFILE_OPTION})
+    profiler = start(fmt, output) if active is None else None
+    return profiler, args
@@ -1,26 +1,265 @@
-from typing import Dict, Type
+import importlib
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Type
+
+from .profiling import startup_phase
 
 class SingletonMeta(type):
     _instances: Dict[Type, object] = {}
+    _lock = threading.Lock()
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        instance = cls._instances.get(cls)
+        if instance is None:
+            with cls._lock:
+                instance = cls._instances.get(cls)
+                if instance is None:
+                    instance = cls._instances[cls] = super().__call__(*args, **kwargs)
+        return instance
+
+
+class RegistrySnapshot(NamedTuple):
+    """The loaded handlers at one registry version, read-only."""
+    version: int
+    commands: Mapping[str, object]
 
+# Registries returned by CommandRegistry.scoped(), by class and scope name.
+_scopes: Dict[tuple, "CommandRegistry"] = {}
+_scopes_lock = threading.Lock()
+# Where @cog registers when not given a registry; see CommandRegistry.active().
+_active: ContextVar[Optional["CommandRegistry"]] = ContextVar("rcli_active_registry",
+                                                              default=None)
 
 class CommandRegistry(metaclass=SingletonMeta):
-    """A singleton registry for CLI subcommands."""
+    """A registry for CLI subcommands.
+
+    ``CommandRegistry()`` is the process-wide registry that ``@cog`` fills.
+    :meth:`create` and :meth:`scoped` give independent ones, e.g. one per
+    application or tenant, to hand to ``rCli``, a ``Dispatcher`` or ``cog``.
+
+    Registries are safe to share between threads. Writes are serialised by
+    a lock; reads take no lock. :meth:`loaded` and :meth:`all_commands`
+    return an immutable snapshot that is rebuilt at most once per change
+    and swapped in with a single assignment, so readers never see a
+    half-applied update and never pay for a copy of their own.
+    """
     def __init__(self):
+        self._lock = threading.RLock()
         self._commands: Dict[str, object] = {}
+        # Names known from a command manifest but whose module is not imported
+        # yet; the module is imported by get() on first use.
+        self._lazy: Dict[str, str] = {}
+        # Manifest outlines of lazy names (aliases, id, ...), for indexing
+        # them before their module is imported.
+        self._details: Dict[str, dict] = {}
+        # Active recording() lists by thread id, so concurrent imports do not
+        # record each other's commands.
+        self._recordings: Dict[int, List[str]] = {}
+        # Read-only view of _commands; None after a change until next asked for.
+        self._snapshot: Optional[RegistrySnapshot] = None
+        # Bumped on every registration so derived tables know to rebuild.
+        self.version = 0
+        self._listeners: List[Callable[[str, Optional[object]], None]] = []
+        self._removal_listeners: List[Callable[[str], None]] = []
+
+    @classmethod
+    def create(cls) -> "CommandRegistry":
+        """A new, empty registry independent of the process-wide one."""
+        registry = cls.__new__(cls)
+        registry.__init__()
+        return registry
+
+    @classmethod
+    def scoped(cls, scope: str) -> "CommandRegistry":
+        """The registry named ``scope``, created on first use."""
+        with _scopes_lock:
+            registry = _scopes.get((cls, scope))
+            if registry is None:
+                registry = _scopes[(cls, scope)] = cls.create()
+        return registry
+
+    def scope(self) -> Optional[str]:
+        """The name this registry was created under by :meth:`scoped`, if any."""
+        with _scopes_lock:
+            for (_, scope), registry in _scopes.items():
+                if registry is self:
+                    return scope
+        return None
+
+    @classmethod
+    def current(cls) -> "CommandRegistry":
+        """The registry made active by :meth:`active`, else the process-wide one."""
+        return _active.get() or cls()
+
+    @contextmanager
+    def active(self):
+        """Make ``@cog`` without an explicit registry register here inside the block."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
 
     def register(self, handler: object, name: str = None):
         if name == None:
             name = handler.__name__
-        self._commands[name] = handler
+        with self._lock:
+            self._commands[name] = handler
+            if self._lazy:
+                self._lazy.pop(name, None)
+            # Registering is O(1); the snapshot is rebuilt on the next read.
+            self.version += 1
+            self._snapshot = None
+            if self._recordings:
+                recording = self._recordings.get(threading.get_ident())
+                if recording is not None:
+                    recording.append(name)
+            if self._listeners:
+                for listener in tuple(self._listeners):
+                    listener(name, handler)
+
+    def register_lazy(self, name: str, module_name: str,
+                      details: Optional[dict] = None):
+        """Register ``name`` as provided by ``module_name`` without importing it.
+
+        ``details`` is the name's manifest outline; see :meth:`details`.
+        """
+        with self._lock:
+            if name not in self._commands:
+                self._lazy[name] = module_name
+                if details is not None:
+                    self._details[name] = details
+                for listener in tuple(self._listeners):
+                    listener(name, None)
+
+    def details(self, name: str) -> Optional[dict]:
+        """The manifest outline ``name`` was registered lazily with, if any."""
+        return self._details.get(name)
+
+    def unregister(self, name: str) -> bool:
+        """Remove ``name``, loaded or lazy; returns whether it was registered."""
+        with self._lock:
+            found = name in self._commands or name in self._lazy
+            if not found:
+                return False
+            self._commands.pop(name, None)
+            self._lazy.pop(name, None)
+            self._details.pop(name, None)
+            self.version += 1
+            self._snapshot = None
+            for listener in tuple(self._removal_listeners):
+                listener(name)
+            return True
+
+    def subscribe(self, listener: Callable[[str, Optional[object]], None],
+                  removed: Optional[Callable[[str], None]] = None, weak: bool = False):
+        """Call ``listener(name, handler)`` on every registration and
+        ``removed(name)`` on every :meth:`unregister`.
+
+        ``handler`` is ``None`` for names registered lazily from a manifest.
+        With ``weak``, both must be bound methods and the registry does not
+        keep their object alive; they are unsubscribed once it is collected.
+        Returns what to pass to :meth:`unsubscribe`.
+        """
+        if weak:
+            listener, removed = self._weak(listener, removed)
+        with self._lock:
+            self._listeners.append(listener)
+            if removed is not None:
+                self._removal_listeners.append(removed)
+        return listener, removed
+
+    def unsubscribe(self, listener: Callable[[str, Optional[object]], None],
+                    removed: Optional[Callable[[str], None]] = None) -> None:
+        """Stop calling listeners added by :meth:`subscribe`; unknown ones are
+        ignored.
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            if removed is not None and removed in self._removal_listeners:
+                self._removal_listeners.remove(removed)
+
+    def _weak(self, listener, removed):
+        def forward(ref):
+            def call(*args):
+                method = ref()
+                if method is not None:
+                    method(*args)
+            return call
+
+        def collected(_):
+            self.unsubscribe(weak_listener, weak_removed)
+
+        weak_listener = forward(weakref.WeakMethod(listener, collected))
+        weak_removed = None
+        if removed is not None:
+            weak_removed = forward(weakref.WeakMethod(removed))
+        return weak_listener, weak_removed
 
     def get(self, name: str):
-        return self._commands.get(name)
+        handler = self._commands.get(name)
+        if handler is None:
+            module_name = self._lazy.get(name)
+            if module_name is not None:
+                # The import lock makes concurrent callers wait for one import.
+                with self.active(), startup_phase(f"import {module_name}", "import"):
+                    importlib.import_module(module_name)
+                with self._lock:
+                    self._lazy.pop(name, None)
+                handler = self._commands.get(name)
+        return handler
+
+    def snapshot(self) -> RegistrySnapshot:
+        """The loaded handlers and the version they belong to, consistently."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    commands = MappingProxyType(dict(self._commands))
+                    snapshot = self._snapshot = RegistrySnapshot(self.version, commands)
+        return snapshot
+
+    def loaded(self) -> Mapping[str, object]:
+        """Handlers whose module is already imported; never triggers an import."""
+        return self.snapshot().commands
+
+    def names(self) -> List[str]:
+        """All registered command names, including ones not imported yet."""
+        with self._lock:
+            return list(self._commands) + [n for n in self._lazy
+                                           if n not in self._commands]
+
+    def all_commands(self) -> Mapping[str, object]:
+        """Every handler, read-only; imports the modules of lazily registered ones."""
+        if self._lazy:
+            with self._lock:
+                modules = set(self._lazy.values())
+            with self.active():
+                for module_name in modules:
+                    with startup_phase(f"import {module_name}", "import"):
+                        importlib.import_module(module_name)
+            with self._lock:
+                for name in [n for n, m in self._lazy.items() if m in modules]:
+                    del self._lazy[name]
+        return self.snapshot().commands
 
-    def all_commands(self):
-        return dict(self._commands)
+    @contextmanager
+    def recording(self):
+        """Collect the names registered by this thread inside the ``with`` block."""
+        names: List[str] = []
+        thread = threading.get_ident()
+        previous = self._recordings.get(thread)
+        self._recordings[thread] = names
+        try:
+            yield names
+        finally:
+            if previous is None:
+                del self._recordings[thread]
+            else:
+                self._recordings[thread] = previous
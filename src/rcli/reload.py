@@ -0,0 +1,238 @@
+"""Incremental reload of command modules for long-running processes.
+
+A :class:`Reloader` remembers the mtime, size and content hash of every module
+under a commands directory and the commands each module registered. On
+:meth:`~Reloader.refresh` it imports new modules and reloads only those whose
+content changed, plus the modules that import from them. Commands a module no
+longer registers after a reload, or whose file was deleted, are removed from
+the registry::
+
+    reloader = Reloader("commands")
+    reloader.refresh()                    # first call imports everything
+    ...
+    report = reloader.refresh()           # later calls touch only what changed
+    stop = reloader.watch_in_thread(1.0)  # or poll in the background
+
+Watching polls ``os.stat``; a file is only read and hashed when its mtime or
+size moved, so an unchanged tree of 1,000 modules costs 1,000 ``stat`` calls.
+"""
+import ast
+import hashlib
+import importlib
+import sys
+import threading
+from logging import getLogger
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .manifest import iter_command_files, module_name_for
+from .profiling import startup_phase
+from .registry import CommandRegistry
+
+logger = getLogger("rCli.reload")
+
+class FileState(NamedTuple):
+    mtime_ns: int
+    size: int
+    digest: str
+    imports: FrozenSet[str]
+
+class ReloadReport(NamedTuple):
+    imported: List[str]
+    reloaded: List[str]
+    unloaded: List[str]
+    removed: List[str]
+
+    def __bool__(self):
+        return any((self.imported, self.reloaded, self.unloaded, self.removed))
+
+def imported_names(source: bytes, module_name: str) -> FrozenSet[str]:
+    """Every module ``source`` may import from, as absolute dotted names.
+
+    ``from pkg import name`` yields both ``pkg`` and ``pkg.name`` since
+    ``name`` may be a submodule.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return frozenset()
+    package = module_name.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package
+                if node.level > 1:
+                    parent = package.rsplit(".", node.level - 1)[0]
+                base = f"{parent}.{base}" if base else parent
+            names.add(base)
+            names.update(f"{base}.{alias.name}" for alias in node.names)
+    return frozenset(names)
+
+class Reloader:
+    """Tracks the modules below ``commands_dir`` and reloads them incrementally."""
+    def __init__(self, commands_dir: str, registry: Optional[CommandRegistry] = None):
+        self.commands_path = Path(commands_dir)
+        self.registry = registry or CommandRegistry()
+        self.files: Dict[str, FileState] = {}
+        # Command name to handler, per module, as of its last (re)load.
+        self.owned: Dict[str, Dict[str, object]] = {}
+        # Content that failed to import; not retried until the file changes.
+        self.failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, file: Path, module_name: str,
+               previous: Optional[FileState]) -> FileState:
+        stat = file.stat()
+        if previous is not None and (previous.mtime_ns, previous.size) == (
+                stat.st_mtime_ns, stat.st_size):
+            return previous
+        source = file.read_bytes()
+        digest = hashlib.blake2b(source, digest_size=16).hexdigest()
+        if previous is not None and previous.digest == digest:
+            return previous._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        return FileState(stat.st_mtime_ns, stat.st_size, digest,
+                         imported_names(source, module_name))
+
+    def _current(self, module_name: str) -> bool:
+        """Imported, and every command it registered is still registered from it."""
+        if module_name not in sys.modules:
+            return False
+        loaded = self.registry.loaded()
+        owned = self.owned.get(module_name, {})
+        return all(loaded.get(name) is handler for name, handler in owned.items())
+
+    def scan(self) -> Tuple[List[str], List[str], Dict[str, FileState]]:
+        """Modules to (re)load, modules whose file is gone, and the new file states."""
+        states: Dict[str, FileState] = {}
+        stale = []
+        for file in iter_command_files(self.commands_path):
+            module_name = module_name_for(file)
+            previous = self.files.get(module_name)
+            state = states[module_name] = self._state(file, module_name, previous)
+            if self.failed.get(module_name) == state.digest:
+                continue
+            if (previous is None or previous.digest != state.digest
+                    or not self._current(module_name)):
+                stale.append(module_name)
+        deleted = [module_name for module_name in self.files
+                   if module_name not in states]
+        return stale, deleted, states
+
+    def dependents(self, modules: List[str]) -> List[str]:
+        """``modules`` followed by the tracked modules importing from them,
+        transitively.
+        """
+        order = list(modules)
+        targets = set(order)
+        grew = True
+        while grew:
+            grew = False
+            for name, state in self.files.items():
+                if (name not in targets and name in sys.modules
+                        and not state.imports.isdisjoint(targets)):
+                    targets.add(name)
+                    order.append(name)
+                    grew = True
+        return order
+
+    def _remove(self, module_name: str, keep: Dict[str, object],
+                report: ReloadReport) -> None:
+        loaded = self.registry.loaded()
+        for name, handler in self.owned.get(module_name, {}).items():
+            if name not in keep and loaded.get(name) is handler:
+                self.registry.unregister(name)
+                report.removed.append(name)
+
+    def _load(self, module_name: str, report: ReloadReport,
+              announce: Optional[Callable[[str], None]]) -> None:
+        reloading = module_name in sys.modules
+        if announce is not None:
+            announce(module_name)
+        registry = self.registry
+        with startup_phase(f"import {module_name}", "import"), registry.active(), \
+                registry.recording() as names:
+            if reloading:
+                importlib.reload(sys.modules[module_name])
+            else:
+                importlib.import_module(module_name)
+        loaded = self.registry.loaded()
+        now = {name: loaded[name] for name in names if name in loaded}
+        self._remove(module_name, now, report)
+        self.owned[module_name] = now
+        (report.reloaded if reloading else report.imported).append(module_name)
+
+    def refresh(self, announce: Optional[Callable[[str], None]] = None) -> ReloadReport:
+        """Bring the loaded commands in line with the files on disk.
+
+        ``announce(module_name)`` is called before each import or reload. An
+        import error propagates; the failing content is not retried until
+        the file changes again.
+        """
+        report = ReloadReport([], [], [], [])
+        with self._lock:
+            stale, deleted, states = self.scan()
+            for module_name in deleted:
+                self._remove(module_name, {}, report)
+                self.owned.pop(module_name, None)
+                self.failed.pop(module_name, None)
+                sys.modules.pop(module_name, None)
+                report.unloaded.append(module_name)
+            self.files = states
+            order = self.dependents(stale)
+            for i, module_name in enumerate(order):
+                try:
+                    self._load(module_name, report, announce)
+                except BaseException:
+                    self.failed[module_name] = states[module_name].digest
+                    # Forget the rest so the next refresh still loads them.
+                    for pending in order[i + 1:]:
+                        self.files.pop(pending, None)
+                    raise
+                self.failed.pop(module_name, None)
+        if report:
+            logger.debug(f"Reloaded {self.commands_path}: {report}")
+        return report
+
+    def watch(self, interval: float = 1.0, stop: Optional[threading.Event] = None,
+              on_change: Optional[Callable[[ReloadReport], None]] = None) -> None:
+        """Refresh every ``interval`` seconds until ``stop`` is set.
+
+        Import errors are logged and the loop carries on with the previous
+        version of the module.
+        """
+        stop = stop or threading.Event()
+        while True:
+            try:
+                report = self.refresh()
+            except Exception:
+                logger.exception(f"Reloading {self.commands_path} failed")
+            else:
+                if report and on_change is not None:
+                    on_change(report)
+            if stop.wait(interval):
+                return
+
+    def watch_in_thread(self, interval: float = 1.0,
+                        on_change: Optional[Callable[[ReloadReport], None]] = None
+                        ) -> threading.Event:
+        """Run :meth:`watch` in a daemon thread; set the returned event to stop it."""
+        stop = threading.Event()
+        thread = threading.Thread(target=self.watch, args=(interval, stop, on_change),
+                                  name="rcli-reload", daemon=True)
+        thread.start()
+        return stop
+
+_reloaders: Dict[Path, Reloader] = {}
+
+def reloader_for(commands_dir: str,
+                 registry: Optional[CommandRegistry] = None) -> Reloader:
+    """The shared :class:`Reloader` for ``commands_dir``."""
+    key = Path(commands_dir).resolve()
+    reloader = _reloaders.get(key)
+    if reloader is None or (registry is not None and reloader.registry is not registry):
+        reloader = _reloaders[key] = Reloader(commands_dir, registry)
+    return reloader
@@ -0,0 +1,175 @@
+from logging import getLogger
+from typing import Dict, Iterable, Optional, Tuple
+
+from .registry import CommandRegistry
+
+logger = getLogger("rCli.resolver")
+
+# Prefixes parse_args treats as "search queries as command".
+ALIAS_PREFIX, NAME_PREFIX, ID_PREFIX = "@", ":", "#"
+QUERY_PREFIXES = frozenset((ALIAS_PREFIX, NAME_PREFIX, ID_PREFIX))
+
+class AmbiguousCommandError(LookupError):
+    """Raised when a ``:name`` prefix matches more than one command."""
+    def __init__(self, query: str, candidates: Iterable[str]):
+        self.query = query
+        self.candidates = sorted(candidates)
+        super().__init__(f"'{query}' is ambiguous: {', '.join(self.candidates)}")
+
+class _TrieNode:
+    __slots__ = ("children", "name", "count")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.name: Optional[str] = None
+        # Number of names stored at or below this node.
+        self.count = 0
+
+class PrefixTrie:
+    """Character trie over command names answering unique-prefix queries."""
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def __contains__(self, name: str) -> bool:
+        node = self._find(name)
+        return node is not None and node.name == name
+
+    def _find(self, prefix: str) -> Optional[_TrieNode]:
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def insert(self, name: str) -> None:
+        if name in self:
+            return
+        node = self.root
+        node.count += 1
+        for ch in name:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.count += 1
+        node.name = name
+
+    def remove(self, name: str) -> None:
+        if name not in self:
+            return
+        node = self.root
+        node.count -= 1
+        for ch in name:
+            child = node.children[ch]
+            child.count -= 1
+            if child.count == 0:
+                del node.children[ch]
+                return
+            node = child
+        node.name = None
+
+    def names(self, prefix: str = "") -> Iterable[str]:
+        """Every stored name starting with ``prefix``."""
+        node = self._find(prefix)
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            if node.name is not None:
+                yield node.name
+            stack.extend(node.children.values())
+
+    def unique(self, prefix: str) -> Optional[str]:
+        """The name ``prefix`` identifies: an exact match or the only name below it.
+
+        Raises :class:`AmbiguousCommandError` when several names share the prefix.
+        """
+        node = self._find(prefix)
+        if node is None or node.count == 0:
+            return None
+        if node.name == prefix:
+            return prefix
+        if node.count > 1:
+            raise AmbiguousCommandError(prefix, self.names(prefix))
+        # A single name below: follow the only branch down to it.
+        while node.name is None:
+            node = next(iter(node.children.values()))
+        return node.name
+
+class CommandResolver:
+    """Resolves ``@alias``, ``:name`` and ``#id`` command queries to registered names.
+
+    Handlers opt in through class attributes::
+
+        @cog("status")
+        class Status(CommandHandler):
+            aliases = ("st", "stat")
+            command_id = "42"
+
+    ``@st`` then resolves to ``status``, ``#42`` to ``status`` and ``:sta``
+    to ``status`` as long as no other name starts with ``sta``. The indexes
+    are kept up to date as commands are registered, so a lookup costs a hash
+    lookup or a walk proportional to the length of the query. Aliases and ids
+    of lazily registered commands come from their manifest outline until
+    their module is imported. The registry holds the resolver only weakly,
+    so a dropped resolver stops listening.
+    """
+    def __init__(self, registry: Optional[CommandRegistry] = None):
+        self.registry = registry or CommandRegistry()
+        self.aliases: Dict[str, str] = {}
+        self.ids: Dict[str, str] = {}
+        self.names = PrefixTrie()
+        # What each name contributed to the alias and id maps, so a
+        # re-registration can retract it.
+        self._keys: Dict[str, Tuple[Tuple[str, ...], Optional[str]]] = {}
+        loaded = self.registry.loaded()
+        for name in self.registry.names():
+            self.index(name, loaded.get(name))
+        self.registry.subscribe(self.index, self.forget, weak=True)
+
+    def index(self, name: str, handler: Optional[object]) -> None:
+        """Add or refresh the entries for ``name``; ``handler`` is ``None`` for
+        lazy commands.
+        """
+        self.names.insert(name)
+        if handler is None:
+            details = self.registry.details(name)
+            if not details:
+                return
+            aliases = tuple(details.get("aliases") or ())
+            command_id = details.get("id")
+        else:
+            aliases = tuple(getattr(handler, "aliases", ()) or ())
+            command_id = getattr(handler, "command_id", None)
+        self._retract(name)
+
+        for alias in aliases:
+            if self.aliases.get(alias, name) != name:
+                logger.warning(
+                    f"Alias '{alias}' of '{name}' shadows '{self.aliases[alias]}'")
+            self.aliases[alias] = name
+        if command_id is not None:
+            command_id = str(command_id)
+            self.ids[command_id] = name
+        self._keys[name] = (aliases, command_id)
+
+    def forget(self, name: str) -> None:
+        """Drop every entry for ``name`` after it was unregistered."""
+        self.names.remove(name)
+        self._retract(name)
+
+    def _retract(self, name: str) -> None:
+        old_aliases, old_id = self._keys.pop(name, ((), None))
+        for alias in old_aliases:
+            if self.aliases.get(alias) == name:
+                del self.aliases[alias]
+        if old_id is not None and self.ids.get(old_id) == name:
+            del self.ids[old_id]
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Registered name for a query token, or ``None`` when nothing matches."""
+        prefix, key = query[:1], query[1:]
+        if prefix == ALIAS_PREFIX:
+            return self.aliases.get(key)
+        if prefix == ID_PREFIX:
+            return self.ids.get(key)
+        if prefix == NAME_PREFIX:
+            return self.names.unique(key)
+        return None
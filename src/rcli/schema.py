@@ -0,0 +1,197 @@
+"""Declarative, typed option schemas for handlers and subcommands.
+
+Options are declared once, either as a class attribute or with the
+:func:`option` decorator, and compiled into an :class:`OptionPlan` when the
+handler class is created::
+
+    @cog("fetch")
+    class Fetch(CommandHandler):
+        options = (Option("retries", int, default=3),)
+
+        @subcommand("url")
+        @option("format", choices=("json", "csv"), default="json")
+        @option("header", multiple=True)
+        def url(self, args, ctx=None):
+            fetch(args.positionals, args.values["retries"], args.values["header"])
+
+The dispatcher applies the plan straight after parsing and passes the typed
+results as ``CliArgs.values``; bad input raises :class:`OptionError` before
+the handler runs.
+"""
+from dataclasses import replace
+from inspect import isclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+_TRUE = frozenset(("1", "true", "yes", "on"))
+_FALSE = frozenset(("0", "false", "no", "off"))
+
+class OptionError(ValueError):
+    """Raised when an option value does not satisfy its schema."""
+
+class Option:
+    """Schema for one option.
+
+    ``type`` converts each raw string (``bool`` options are also set by a
+    bare ``--name`` flag, and a word after one that is not a boolean stays a
+    positional: ``show -v file.txt``). ``multiple`` keeps every value as a
+    tuple instead of the last one. ``aliases`` are extra names read into the
+    same value, e.g. ``Option("verbose", bool, aliases=("v",))``.
+    """
+    __slots__ = ("name", "type", "default", "choices", "multiple", "required",
+                 "aliases", "help")
+
+    def __init__(self, name: str, type: Callable[[str], Any] = str, default: Any = None,
+                 choices: Optional[Iterable[Any]] = None, multiple: bool = False,
+                 required: bool = False, aliases: Sequence[str] = (), help: str = ""):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.choices = tuple(choices) if choices is not None else None
+        self.multiple = multiple
+        self.required = required
+        self.aliases = tuple(aliases)
+        self.help = help
+
+    def __repr__(self):
+        return f"Option({self.name!r}, {getattr(self.type, '__name__', self.type)})"
+
+def _to_bool(raw: str) -> bool:
+    lowered = raw.lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(raw)
+
+class OptionPlan:
+    """A compiled list of conversion and validation steps over ``CliArgs``."""
+    __slots__ = ("options", "_steps", "_flag_names")
+
+    def __init__(self, options: Sequence[Option]):
+        self.options: Tuple[Option, ...] = tuple(options)
+        self._flag_names = tuple(name for opt in self.options if opt.type is bool
+                                 for name in (opt.name, *opt.aliases))
+        steps = {}
+        for opt in self.options:
+            convert = _to_bool if opt.type is bool else opt.type
+            choices = frozenset(opt.choices) if opt.choices is not None else None
+            default = opt.default
+            if opt.multiple:
+                default = tuple(default) if default is not None else ()
+            elif opt.type is bool and default is None:
+                default = False
+            # Later declarations of the same name override earlier ones.
+            steps[opt.name] = (opt.name, (opt.name, *opt.aliases), convert,
+                               opt.type is bool, choices, opt.multiple, opt.required,
+                               default, getattr(opt.type, "__name__", "value"))
+        self._steps = tuple(steps.values())
+
+    def __bool__(self):
+        return bool(self._steps)
+
+    def bind(self, args):
+        """``args`` with ``values`` filled in by :meth:`apply`.
+
+        The parser cannot tell a flag from an option that takes a value, so
+        ``show -v file.txt`` reads ``file.txt`` as the value of ``-v``. For a
+        ``bool`` option such a word sets the flag instead and is put back in
+        front of the positionals.
+        """
+        changes: Dict[str, Any] = {}
+        stray: Tuple[str, ...] = ()
+        for scope, flags_scope in (("global_options", "global_flags"),
+                                   ("local_options", "local_flags")):
+            options = getattr(args, scope)
+            moved = [key for key in self._flag_names
+                     if any(raw.lower() not in _TRUE and raw.lower() not in _FALSE
+                            for raw in options.get(key, ()))]
+            if not moved:
+                continue
+            options, flags = dict(options), set(getattr(args, flags_scope))
+            for key in moved:
+                kept = ()
+                for raw in options.pop(key):
+                    if raw.lower() in _TRUE or raw.lower() in _FALSE:
+                        kept += (raw,)
+                    else:
+                        stray += (raw,)
+                if kept:
+                    options[key] = kept
+                flags.add(key)
+            changes[scope] = MappingProxyType(options)
+            changes[flags_scope] = frozenset(flags)
+        if changes:
+            args = replace(args, positionals=stray + args.positionals, **changes)
+        return replace(args, values=MappingProxyType(self.apply(args)))
+
+    def apply(self, args) -> Dict[str, Any]:
+        """Convert and validate the options in ``args``; returns name to typed value."""
+        values: Dict[str, Any] = {}
+        global_options, local_options = args.global_options, args.local_options
+        for (name, names, convert, is_flag, choices, multiple, required, default,
+             type_name) in self._steps:
+            raw: Tuple[str, ...] = ()
+            for key in names:
+                raw += global_options.get(key, ()) + local_options.get(key, ())
+            if not raw:
+                if is_flag and any(key in args.local_flags or key in args.global_flags
+                                   for key in names):
+                    values[name] = True
+                    continue
+                if required:
+                    raise OptionError(f"Missing required option --{name}")
+                values[name] = default
+                continue
+            if not multiple:
+                raw = raw[-1:]
+            converted = []
+            for item in raw:
+                try:
+                    value = convert(item)
+                except (TypeError, ValueError):
+                    raise OptionError(
+                        f"Invalid {type_name} value for --{name}: '{item}'") from None
+                if choices is not None and value not in choices:
+                    allowed = ", ".join(map(str, sorted(choices, key=str)))
+                    raise OptionError(f"Invalid choice for --{name}: '{item}' "
+                                      f"(choose from {allowed})")
+                converted.append(value)
+            values[name] = tuple(converted) if multiple else converted[0]
+        return values
+
+def option(name: str, type: Callable[[str], Any] = str, **kwargs):
+    """Declare an :class:`Option` on a ``@subcommand`` method, plain handler
+    function or handler class.
+    """
+    def decorator(obj):
+        # Decorators apply bottom-up; prepend to keep the written order.
+        declared = ((Option(name, type, **kwargs),)
+                    + tuple(obj.__dict__.get("_options", ())))
+        obj._options = declared
+        if isclass(obj):
+            attach_plans(obj)
+        else:
+            obj._option_plan = OptionPlan(declared)
+        return obj
+    return decorator
+
+def class_options(cls) -> Tuple[Option, ...]:
+    """Options declared on ``cls`` and its bases, through ``options`` or ``@option``."""
+    declared = tuple(getattr(cls, "options", ()))
+    for klass in reversed(cls.__mro__):
+        declared += tuple(klass.__dict__.get("_options", ()))
+    return declared
+
+def attach_plans(cls) -> None:
+    """Compile the plans of a handler class: ``_option_plan`` for ``run`` and
+    ``_subcommand_plans`` for each ``@subcommand``, which also honour the
+    class-wide options.
+    """
+    shared = class_options(cls)
+    cls._option_plan = OptionPlan(shared)
+    cls._subcommand_plans = {
+        sub_name: OptionPlan(shared + tuple(getattr(func, "_options", ())))
+        for sub_name, func in cls.commands.items()
+        if not isclass(func)
+    }
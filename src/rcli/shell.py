@@ -0,0 +1,292 @@
+"""Interactive shell: dispatch line after line against the warm registry.
+
+Each line is tokenised with :mod:`shlex`, parsed like an argv and dispatched
+in-process, so a command costs a parse and a table lookup instead of a new
+interpreter. Global options and flags are sticky: given once, they are
+carried into the ``CliArgs.global_options`` / ``global_flags`` of every
+following command until cleared::
+
+    $ python -m rcli.shell --commands commands --prog mycli
+    mycli> --region=eu -v
+    mycli> deploy api          # runs with --region=eu -v
+    mycli> .unset region
+    mycli> .exit
+
+Lines starting with ``.`` are shell commands; ``.help`` lists them. A line
+with ``|`` runs as a pipeline (see :mod:`rcli.pipeline`). History
+is kept in ``$RCLI_HISTORY`` (default ``~/.rcli_history``) and Tab completes
+command names, subcommands and options from the live registry when
+:mod:`readline` is available.
+"""
+import argparse
+import os
+import shlex
+import sys
+import traceback
+from dataclasses import replace
+from logging import getLogger
+from types import GeneratorType, MappingProxyType
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .completion import _walk, complete
+from .dispatch import CommandNotFoundError, Dispatcher
+from .manifest import describe_command
+from .parser import parse_args
+from .pipeline import PIPE, Pipeline, PipelineError, split_pipeline
+from .resolver import AmbiguousCommandError
+from .schema import OptionError
+
+logger = getLogger("rCli.shell")
+
+HISTORY_ENV = "RCLI_HISTORY"
+HISTORY_LENGTH = 1000
+
+_SHELL_COMMANDS = {
+    ".set": "set sticky global options and flags, e.g. .set --region=eu -v",
+    ".unset": "drop sticky global options or flags by name",
+    ".clear": "drop every sticky global option and flag",
+    ".show": "print the sticky global options and flags",
+    ".reload": "reload changed command modules",
+    ".help": "show this help",
+    ".exit": "leave the shell (also Ctrl-D)",
+}
+
+class ShellSyntaxError(ValueError):
+    """Raised for a line that cannot be tokenised, e.g. with an unclosed quote."""
+
+def default_history_path() -> str:
+    return (os.environ.get(HISTORY_ENV)
+            or os.path.join(os.path.expanduser("~"), ".rcli_history"))
+
+class Shell:
+    """A read-dispatch-print loop over a :class:`~rcli.dispatch.Dispatcher`.
+
+    ``history_path`` of ``""`` disables history. ``commands_dirs`` are what
+    ``.reload`` refreshes (see :mod:`rcli.reload`).
+    """
+    def __init__(self, dispatcher: Optional[Dispatcher] = None, program: str = "rcli",
+                 history_path: Optional[str] = None, commands_dirs: Sequence[str] = ()):
+        self.dispatcher = dispatcher or Dispatcher()
+        self.registry = self.dispatcher.registry
+        self.program = program
+        self.prompt = f"{program}> "
+        if history_path is None:
+            history_path = default_history_path()
+        self.history_path = history_path
+        self.commands_dirs = list(commands_dirs)
+        self.global_options: Dict[str, Tuple[str, ...]] = {}
+        self.global_flags: Set[str] = set()
+        self._outlines: Dict[str, Tuple[int, Dict[str, List[str]]]] = {}
+
+    # Session state
+
+    def remember(self, args) -> None:
+        """Make the global options and flags of ``args`` sticky."""
+        self.global_options.update(args.global_options)
+        self.global_flags |= args.global_flags
+
+    def with_session(self, args):
+        """``args`` with the sticky globals added; options given on the line win."""
+        if not self.global_options and not self.global_flags:
+            return args
+        options = {**self.global_options, **args.global_options}
+        return replace(args, global_options=MappingProxyType(options),
+                       global_flags=frozenset(self.global_flags | args.global_flags))
+
+    def session_args(self) -> List[str]:
+        args = [f"--{name}={value}"
+                for name, values in self.global_options.items() for value in values]
+        return args + [f"--{flag}" if len(flag) > 1 else f"-{flag}"
+                       for flag in sorted(self.global_flags)]
+
+    # Execution
+
+    def execute(self, line: str):
+        """Run one line and return the handler's result (``None`` for shell
+        commands).
+        """
+        try:
+            tokens = shlex.split(line)
+        except ValueError as e:
+            raise ShellSyntaxError(f"{e}: {line}") from None
+        if not tokens:
+            return None
+        if tokens[0] in _SHELL_COMMANDS:
+            return self._shell_command(tokens[0], tokens[1:])
+        if tokens[0].startswith(".") and len(tokens[0]) > 1:
+            raise CommandNotFoundError(
+                f"Unknown shell command '{tokens[0]}' (see .help)")
+        if PIPE in tokens:
+            stages = [self.with_session(parse_args([self.program, *stage]))
+                      for stage in split_pipeline(tokens)]
+            return Pipeline(stages, self.dispatcher).run()
+        args = parse_args([self.program, *tokens])
+        self.remember(args)
+        if not args.command:
+            return None
+        return self.dispatcher.dispatch(self.with_session(args))
+
+    def _shell_command(self, name: str, rest: List[str]) -> None:
+        if name == ".set":
+            self.remember(parse_args([self.program, *rest]))
+        elif name == ".unset":
+            for key in rest:
+                key = key.lstrip("-")
+                self.global_options.pop(key, None)
+                self.global_flags.discard(key)
+        elif name == ".clear":
+            self.global_options.clear()
+            self.global_flags.clear()
+        elif name == ".show":
+            print(" ".join(shlex.quote(arg) for arg in self.session_args()))
+        elif name == ".reload":
+            from .reload import reloader_for
+            for commands_dir in self.commands_dirs:
+                report = reloader_for(commands_dir, self.registry).refresh()
+                print(f"[rCli] {commands_dir}: {len(report.imported)} imported, "
+                      f"{len(report.reloaded)} reloaded, {len(report.removed)} removed")
+        elif name == ".help":
+            for command, text in _SHELL_COMMANDS.items():
+                print(f"  {command:<8} {text}")
+            print("  Any other line runs a command; global options and flags stay set.")
+        elif name == ".exit":
+            raise EOFError
+        return None
+
+    def run_line(self, line: str) -> None:
+        """:meth:`execute` with results printed and errors reported, as the loop
+        does.
+        """
+        try:
+            result = self.execute(line)
+        except (CommandNotFoundError, AmbiguousCommandError, OptionError,
+                PipelineError, ShellSyntaxError) as e:
+            print(f"[rCli] {e}", file=sys.stderr)
+        except KeyboardInterrupt:
+            print("^C", file=sys.stderr)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f"[rCli] exit status {e.code}", file=sys.stderr)
+        except EOFError:
+            raise
+        except Exception:
+            traceback.print_exc()
+        else:
+            if isinstance(result, GeneratorType):
+                self._print_records(result)
+            elif result is not None:
+                print(result)
+
+    def _print_records(self, records) -> None:
+        """Print streamed records one per line, as they are produced."""
+        try:
+            for record in records:
+                print(record)
+        except KeyboardInterrupt:
+            print("^C", file=sys.stderr)
+        except (CommandNotFoundError, AmbiguousCommandError, OptionError) as e:
+            print(f"[rCli] {e}", file=sys.stderr)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            records.close()
+
+    def run(self) -> None:
+        """Read and run lines until ``.exit`` or end of input."""
+        readline = self._setup_readline()
+        prompt = self.prompt if sys.stdin.isatty() else ""
+        try:
+            while True:
+                try:
+                    line = input(prompt)
+                except KeyboardInterrupt:
+                    print()
+                    continue
+                self.run_line(line)
+        except EOFError:
+            if prompt:
+                print()
+        finally:
+            if readline is not None and self.history_path:
+                try:
+                    readline.write_history_file(self.history_path)
+                except OSError as e:
+                    logger.debug(f"Could not write history {self.history_path}: {e}")
+
+    # Completion
+
+    def _outline(self, name: str) -> Dict[str, List[str]]:
+        """Subcommand and option candidates under ``name``, cached per registry
+        version.
+        """
+        cached = self._outlines.get(name)
+        if cached is not None and cached[0] == self.registry.version:
+            return cached[1]
+        children: Dict[str, List[str]] = {}
+        handler = self.registry.get(name)
+        if handler is not None:
+            for path, candidate in _walk(name, describe_command(handler)):
+                children.setdefault(path, []).append(candidate)
+        self._outlines[name] = (self.registry.version, children)
+        return children
+
+    def candidates(self, before: str, cur: str) -> List[str]:
+        """Completions for the word ``cur`` after the text ``before`` on the line."""
+        words = before.split()
+        children: Dict[str, List[str]] = {"": sorted(self.registry.names())}
+        if not words:
+            children[""] += list(_SHELL_COMMANDS)
+        command = next((w for w in words if not w.startswith("-")), None)
+        if command is not None and command in children[""]:
+            children.update(self._outline(command))
+        return complete(children, words, cur)
+
+    def _complete(self, text: str, state: int) -> Optional[str]:
+        import readline
+        if state == 0:
+            line = readline.get_line_buffer()
+            before = line[:readline.get_begidx()]
+            try:
+                self._matches = self.candidates(before, text)
+            except Exception:
+                logger.debug("Completion failed", exc_info=True)
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+
+    def _setup_readline(self):
+        try:
+            import readline
+        except ImportError:
+            return None
+        readline.set_completer(self._complete)
+        readline.set_completer_delims(" \t\n")
+        readline.parse_and_bind("tab: complete")
+        readline.set_history_length(HISTORY_LENGTH)
+        if self.history_path:
+            try:
+                readline.read_history_file(self.history_path)
+            except OSError:
+                pass
+        return readline
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m rcli.shell",
+                                 description="Interactive rCli shell.")
+    ap.add_argument("--commands", action="append", default=[],
+                    help="commands directory to import; repeatable")
+    ap.add_argument("--prog", default="rcli",
+                    help="program name shown in the prompt and CliArgs.program")
+    ap.add_argument("--history", default=None,
+                    help=f"history file (default: ${HISTORY_ENV} or ~/.rcli_history)")
+    opts = ap.parse_args(argv)
+
+    from .commands import auto_import_subcommands
+    from .parser import enable_parse_cache
+    enable_parse_cache()
+    for commands_dir in opts.commands:
+        auto_import_subcommands(commands_dir)
+    Shell(program=opts.prog, history_path=opts.history,
+          commands_dirs=opts.commands).run()
+
+if __name__ == "__main__":
+    main()
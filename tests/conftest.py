@@ -7,4 +7,38 @@
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import sys
+
+import pytest
+
+from rcli.registry import CommandRegistry
+
+
+@pytest.fixture
+def registry():
+    """The global command registry, emptied before and after the test."""
+    reg = CommandRegistry()
+    reg.__init__()
+    yield reg
+    reg.__init__()
+
+
+@pytest.fixture
+def commands_tree(tmp_path, monkeypatch):
+    """Factory writing command modules under ``<tmp>/cmds`` and making them
+    importable.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    pkg = tmp_path / "cmds"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+
+    def write(name, source):
+        path = pkg / f"{name}.py"
+        path.write_text(source)
+        return path
+
+    yield write
+    for name in [m for m in sys.modules if m == "cmds" or m.startswith("cmds.")]:
+        del sys.modules[name]
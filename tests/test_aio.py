@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from rcli.aio import resource
+from rcli.commands import CommandHandler, subcommand
+from rcli.dispatch import Dispatcher
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Pool:
+    created = 0
+
+    def __init__(self):
+        Pool.created += 1
+        self.closed = False
+
+
+async def make_pool():
+    await asyncio.sleep(0)
+    return Pool()
+
+
+class Api(CommandHandler):
+    async def run(self, args, ctx=None):
+        pool = await resource("pool")
+        return id(pool)
+
+    @subcommand("slow")
+    async def slow(self, args, ctx=None):
+        await asyncio.sleep(0.2)
+        return args.positionals[0]
+
+    @subcommand("sync")
+    def sync(self, args, ctx=None):
+        return "sync"
+
+
+@pytest.fixture
+def dispatcher(registry):
+    registry.register(Api, "api")
+    dispatcher = Dispatcher(registry)
+    dispatcher.resources.register("pool", make_pool,
+                                  close=lambda pool: setattr(pool, "closed", True))
+    yield dispatcher
+    dispatcher.runner.close()
+
+
+def test_async_handlers_share_resources(dispatcher):
+    Pool.created = 0
+    first = dispatcher.dispatch(parse_args(["prog", "api"]))
+    second = dispatcher.dispatch(parse_args(["prog", "api"]))
+    assert first == second
+    assert Pool.created == 1
+
+
+def test_dispatch_many_runs_concurrently(dispatcher):
+    invocations = [parse_args(["prog", "api", "slow", str(i)]) for i in range(5)]
+    invocations += [parse_args(["prog", "api", "sync"])] * 2
+    start = time.perf_counter()
+    results = dispatcher.dispatch_many(invocations)
+    assert results == ["0", "1", "2", "3", "4", "sync", "sync"]
+    assert time.perf_counter() - start < 0.2 * 3
+
+
+def test_dispatch_async(dispatcher):
+    args = parse_args(["prog", "api", "sync"])
+    assert asyncio.run(dispatcher.dispatch_async(args)) == "sync"
+
+    async def twice():
+        first = await dispatcher.dispatch_async(parse_args(["prog", "api"]))
+        return first, await dispatcher.dispatch_async(parse_args(["prog", "api"]))
+
+    Pool.created = 0
+    first, second = asyncio.run(twice())
+    assert first == second
+    assert Pool.created == 1
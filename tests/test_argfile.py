@@ -0,0 +1,69 @@
+import io
+import sys
+
+from rcli.argfile import expand_argfiles, has_argfiles, read_argfile
+from rcli.commands import CommandHandler
+from rcli.dispatch import Dispatcher
+from rcli.fanout import fan_out
+from rcli.parser import LazyPositionals, parse_args, parse_stream
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+def test_read_argfile_separators(tmp_path, monkeypatch):
+    lines = tmp_path / "lines"
+    lines.write_bytes(b"a b\r\n\nc\nd")
+    nul = tmp_path / "nul"
+    nul.write_bytes(b"x\ny\0z\0")
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert list(read_argfile(str(lines))) == ["a b", "c", "d"]
+    assert list(read_argfile(str(nul))) == ["x\ny", "z"]
+    assert list(read_argfile(str(empty))) == []
+
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"one\ntwo\n")))
+    assert list(read_argfile("-")) == ["one", "two"]
+
+
+def test_expand_only_existing_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "targets").write_text("t1\nt2\n")
+    argv = ["prog", "@alias", "run", "@targets", "last"]
+    assert has_argfiles(argv) and not has_argfiles(["@targets", "run"])
+    assert list(expand_argfiles(argv)) == ["prog", "@alias", "run", "t1", "t2", "last"]
+
+
+def test_parse_stream_matches_parse_args_before_positionals():
+    argv = ["prog", "/ws", "--out", "x", "-vq", "build", "docs", "a", "b"]
+    lazy = parse_stream(iter(argv), lazy_positionals=True)
+    assert isinstance(lazy.positionals, LazyPositionals)
+    assert list(lazy.positionals) == ["a", "b"]
+    eager = parse_args(argv)
+    assert (lazy.command, lazy.subcommands, lazy.local_options) == (
+        eager.command, eager.subcommands, eager.local_options)
+    assert parse_stream(iter(argv)) == eager
+
+
+class Touch(CommandHandler):
+    @fan_out(workers=2)
+    def run(self, target, args, ctx=None):
+        return target
+
+
+def test_lazy_positionals_stream_into_fan_out(registry):
+    registry.register(Touch, "touch")
+    pulled = []
+
+    def argv():
+        yield from ("prog", "touch")
+        for i in range(1000):
+            pulled.append(i)
+            yield f"f{i}"
+
+    results = Dispatcher(registry).dispatch(parse_stream(argv(), lazy_positionals=True))
+    assert len(pulled) <= 2
+    first = [next(results).result for _ in range(3)]
+    assert first == ["f0", "f1", "f2"] and len(pulled) < 10
+    assert sum(1 for _ in results) == 997
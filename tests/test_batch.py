@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from rcli.batch import main, run_batch
+from rcli.dispatch import Dispatcher
+from rcli.fanout import fan_out
+from rcli.registry import CommandRegistry
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+def square(args, ctx=None):
+    return int(args.subcommands[0]) ** 2
+
+
+def fail(args, ctx=None):
+    raise ValueError("boom")
+
+
+@fan_out(workers=2)
+def double(target, args, ctx=None):
+    return int(target) * 2
+
+
+@pytest.fixture
+def registered(registry):
+    registry.register(square, "square")
+    registry.register(fail, "fail")
+    return registry
+
+
+LINES = ["square 2", "", "fail", "square 'x'", "square 4"]
+
+
+@pytest.mark.parametrize("mode", ["sequential", "thread", "process"])
+def test_run_batch(registered, mode):
+    results = list(run_batch(LINES, mode=mode, workers=2, chunksize=1))
+    assert [r.lineno for r in results] == [1, 3, 4, 5]
+    assert [r.result for r in results] == [4, None, None, 16]
+    assert results[1].error == "ValueError: boom"
+    assert results[2].error.startswith("ValueError")
+
+
+def test_run_batch_unordered_is_bounded(registered):
+    in_flight = []
+    consumed = 0
+
+    def source():
+        for i in range(100):
+            in_flight.append(i - consumed)
+            yield f"square {i}"
+
+    results = []
+    for res in run_batch(source(), mode="thread", workers=2, ordered=False,
+                         max_pending=4):
+        results.append(res.result)
+        consumed += 1
+    assert sorted(results) == [i * i for i in range(100)]
+    assert max(in_flight) <= 4 + 1
+
+
+def test_process_mode_uses_the_dispatchers_registry():
+    scoped = CommandRegistry.scoped("test-batch")
+    scoped.register(square, "square")
+    results = list(run_batch(["square 3"], Dispatcher(scoped), mode="process",
+                             workers=1))
+    assert [r.result for r in results] == [9]
+
+    with pytest.raises(ValueError, match="process mode"):
+        dispatcher = Dispatcher(CommandRegistry.create())
+        list(run_batch(["square 3"], dispatcher, mode="process"))
+
+
+@pytest.mark.parametrize("mode", ["sequential", "process"])
+def test_streamed_results_are_drained(registry, mode):
+    registry.register(double, "double")
+    [res] = run_batch(["double 1 2 3"], mode=mode, workers=1)
+    assert res.error is None and res.result is None
+    assert [r.result for r in res.records] == [2, 4, 6]
+
+
+@pytest.mark.parametrize("mode", ["sequential", "process"])
+def test_main_prints_only_results(registry, commands_tree, tmp_path, capfd, mode):
+    commands_tree("cube", "from rcli.commands import CommandHandler, cog\n"
+                          "@cog('cube')\nclass Cube(CommandHandler):\n"
+                          "    def run(self, args, ctx=None):\n"
+                          "        return int(args.subcommands[0]) ** 3\n")
+    source = tmp_path / "lines.txt"
+    source.write_text("cube 2\ncube 3\n")
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(source), "--commands", "cmds", "--mode", mode, "--workers", "1"])
+    assert exit_info.value.code == 0
+    # Loading the commands, here and in the workers, prints nothing.
+    assert capfd.readouterr().out == "8\n27\n"
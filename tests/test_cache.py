@@ -0,0 +1,125 @@
+import pytest
+
+from rcli.cache import ResultCache, cached, invalidates
+from rcli.commands import CommandHandler, subcommand
+from rcli.dispatch import Dispatcher
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Clock:
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "results", ttl=60, maxsize=2, disk_maxsize=10,
+                       clock=Clock())
+
+
+@pytest.fixture
+def dispatcher(registry, cache):
+    calls = []
+
+    class Report(CommandHandler):
+        @cached(cache=cache)
+        def run(self, args, ctx=None):
+            calls.append(args.positionals)
+            return {"rows": len(calls)}
+
+        @subcommand("rebuild")
+        @invalidates("report", cache=cache)
+        def rebuild(self, args, ctx=None):
+            return "rebuilt"
+
+        @subcommand("stream")
+        @cached(cache=cache)
+        def stream(self, args, ctx=None):
+            calls.append("stream")
+            return iter([1, 2])
+
+    registry.register(Report, "report")
+    dispatcher = Dispatcher(registry)
+    dispatcher.calls = calls
+    return dispatcher
+
+
+def run(dispatcher, *argv):
+    return dispatcher.dispatch(parse_args(["prog", *argv]))
+
+
+def test_hits_ignore_option_order(dispatcher, cache):
+    first = run(dispatcher, "report", "--a=1", "-x", "--b=2", "-y")
+    assert run(dispatcher, "report", "-y", "--b=2", "-x", "--a=1") == first
+    assert run(dispatcher, "report", "--a=2") != first
+    assert len(dispatcher.calls) == 2
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 2, "hit_rate": 1 / 3,
+                             "size": 2}
+
+    list(run(dispatcher, "report", "stream"))
+    list(run(dispatcher, "report", "stream"))
+    assert dispatcher.calls.count("stream") == 2
+
+
+def test_disk_tier_ttl_and_invalidation(dispatcher, cache, tmp_path):
+    run(dispatcher, "report", "sales")
+    later = ResultCache(tmp_path / "results", clock=cache.clock)
+    key = next(iter(cache._memory))
+    assert later.get(*key) == {"rows": 1}
+    assert later.stats()["disk_hits"] == 1
+
+    cache.clock.now += 61
+    run(dispatcher, "report", "sales")
+    assert len(dispatcher.calls) == 2
+
+    assert run(dispatcher, "report", "rebuild") == "rebuilt"
+    assert not (tmp_path / "results" / "report").exists()
+    run(dispatcher, "report", "sales")
+    assert len(dispatcher.calls) == 3
+
+
+def test_disk_lru_bound(cache, tmp_path):
+    for i in range(25):
+        cache.put("cmd", f"key{i}", i)
+    entries = list((tmp_path / "results" / "cmd").glob("*.pickle"))
+    assert len(entries) <= 10
+    assert cache.get("cmd", "key24") == 24
+
+
+def test_invalidate_all_keeps_unrelated_files(cache, tmp_path):
+    cache.put("cmd", "k", 1)
+    (tmp_path / "results" / "notes.txt").write_text("mine")
+    (tmp_path / "results" / "cmd" / "notes.txt").write_text("mine too")
+    cache.invalidate()
+    assert cache.get("cmd", "k") is None
+    assert (tmp_path / "results" / "notes.txt").read_text() == "mine"
+    assert (tmp_path / "results" / "cmd" / "notes.txt").read_text() == "mine too"
+
+
+def test_watch_drops_results_of_replaced_commands(registry, cache):
+    registry.register(len, "report")
+    cache.watch(registry)
+    cache.put("report", "k", 1)
+    registry.register(len, "report")
+    assert cache.get("report", "k") == 1
+    registry.register(max, "report")
+    assert cache.get("report", "k") is None
+
+    cache.put("report", "k", 1)
+    registry.unregister("report")
+    assert cache.get("report", "k") is None
+
+
+def test_watch_keeps_results_on_first_registration(registry, cache, tmp_path):
+    cache.put("report", "k", 1)
+    later = ResultCache(tmp_path / "results", clock=cache.clock)
+    later.watch(registry)
+    registry.register_lazy("report", "cmds.report")
+    registry.register(len, "report")
+    assert later.get("report", "k") == 1
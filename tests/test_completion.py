@@ -0,0 +1,71 @@
+import shutil
+import subprocess
+
+import pytest
+
+from rcli.completion import (_AWK, complete, completion_script, read_index,
+                             write_completion_index)
+from rcli.manifest import load_command_manifest
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+GIT = """
+from rcli.commands import CommandHandler, cog, subcommand
+from rcli.schema import Option, option
+
+@cog("git")
+class Git(CommandHandler):
+    aliases = ("g",)
+    options = (Option("verbose", bool, aliases=("v",)),)
+
+    @subcommand("status")
+    def status(self, args, ctx=None):
+        pass
+
+    @subcommand("remote add")
+    @option("fetch", bool)
+    def remote_add(self, args, ctx=None):
+        pass
+"""
+
+QUERIES = [
+    ([], "", ["get", "git"]),
+    ([], "gi", ["git"]),
+    ([], "@", ["@g"]),
+    ([], ":ge", [":get"]),
+    (["git"], "", ["remote", "status"]),
+    (["git", "--verbose"], "st", ["status"]),
+    (["git", "remote"], "", ["add"]),
+    (["git", "remote", "add"], "--", ["--fetch", "--verbose"]),
+]
+
+
+@pytest.fixture
+def index_path(registry, commands_tree):
+    commands_tree("git", GIT)
+    commands_tree("get", "from rcli.commands import CommandHandler, cog\n"
+                         "cog('get')(type('Get', (CommandHandler,), {}))\n")
+    return write_completion_index(load_command_manifest("cmds", registry))
+
+
+@pytest.mark.parametrize("words, cur, expected", QUERIES)
+def test_complete(index_path, words, cur, expected):
+    assert sorted(complete(read_index(index_path), words, cur)) == expected
+
+
+@pytest.mark.skipif(shutil.which("awk") is None, reason="needs awk")
+@pytest.mark.parametrize("words, cur, expected", QUERIES)
+def test_awk_program_matches(index_path, words, cur, expected):
+    out = subprocess.run(
+        ["awk", "-v", f"words={' '.join(words)}", "-v", f"cur={cur}", _AWK, index_path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    assert sorted(out.split()) == expected
+
+
+@pytest.mark.parametrize("shell", ["bash", "zsh", "fish"])
+def test_completion_script(shell, index_path):
+    script = completion_script(shell, "my-cli", index_path)
+    assert "my-cli" in script and "_my_cli" in script and index_path in script
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pytest
+
+from rcli import rCli
+
+from rcli import config as config_module
+from rcli.config import ConfigError, LayeredConfig, parse_ini
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+@pytest.fixture
+def tree(tmp_path):
+    home = tmp_path / "home"
+    (home / "rcli").mkdir(parents=True)
+    project = tmp_path / "project"
+    (project / "src").mkdir(parents=True)
+    (home / "rcli" / "config.toml").write_text(
+        '[global]\nprofile = "user"\ncolor = true\nretries = 3\n'
+        '[command.deploy]\nregion = "us"\nforce = false\n'
+    )
+    (project / ".rcli.ini").write_text(
+        "[global]\nprofile = project\ninclude =\n    a\n    b\n"
+        "[command deploy]\nregion = eu\ndry-run = yes\n"
+    )
+    return tmp_path
+
+
+def make_config(tree, **environ):
+    environ.setdefault("XDG_CONFIG_HOME", str(tree / "home"))
+    return LayeredConfig(cwd=str(tree / "project" / "src"), environ=environ,
+                         cache_dir=tree / "cache")
+
+
+def test_precedence(tree):
+    cfg = make_config(tree, RCLI_OPT_RETRIES="5", RCLI_OPT_DEPLOY__REGION="ap")
+    args = cfg.apply(parse_args(["prog", "--profile=cli", "deploy", "--color"]))
+
+    assert args.global_options == {"profile": ("cli",), "retries": ("5",),
+                                   "include": ("a", "b")}
+    # Given as a local flag on the command line, so not added globally.
+    assert args.global_flags == frozenset()
+    assert args.local_flags == {"color", "dry-run"}
+    assert args.option("region") == "ap"
+
+    other = cfg.apply(parse_args(["prog", "status"]))
+    assert other.global_flags == {"color"} and other.local_options == {}
+
+
+def test_compiled_cache_follows_mtime(tree, monkeypatch):
+    assert make_config(tree).merged()["global"]["options"]["profile"] == ["project"]
+    assert list((tree / "cache").glob("config-rcli-*.bin"))
+
+    def fail(path):
+        raise AssertionError(f"{path} parsed again")
+    monkeypatch.setattr(config_module, "parse_file", fail)
+    assert make_config(tree).merged()["global"]["options"]["profile"] == ["project"]
+
+    monkeypatch.undo()
+    ini = tree / "project" / ".rcli.ini"
+    ini.write_text("[global]\nprofile = changed\n")
+    os.utime(ini, ns=(1, 1))
+    assert make_config(tree).merged()["global"]["options"]["profile"] == ["changed"]
+
+
+def test_invalid_files():
+    with pytest.raises(ConfigError):
+        parse_ini("not a section", "bad.ini")
+
+
+def test_false_turns_off_a_lower_layers_flag(tree):
+    (tree / "project" / "src" / ".rcli.toml").write_text(
+        "[global]\ncolor = false\nretries = false\n")
+    assert make_config(tree).merged()["global"]["flags"] == []
+    args = make_config(tree).apply(parse_args(["prog", "status"]))
+    assert "color" not in args.global_flags and "retries" not in args.global_options
+
+    args = make_config(tree, RCLI_OPT_COLOR="on").apply(parse_args(["prog", "status"]))
+    assert args.global_flags == {"color"}
+
+
+def test_missing_configured_file(tree):
+    with pytest.raises(ConfigError, match="RCLI_CONFIG"):
+        make_config(tree, RCLI_CONFIG=str(tree / "missing.toml")).files()
+
+
+def test_pipeline_stages_get_defaults(tree, registry, monkeypatch):
+    registry.register(lambda args, ctx=None: [args.option("region")], "deploy")
+    registry.register(
+        lambda args, ctx=None: [(r, args.option("profile")) for r in args.input], "tag")
+    monkeypatch.setattr(sys, "argv", ["prog", "deploy", "|", "tag"])
+    assert list(rCli(config=make_config(tree)).dispatch()) == [("eu", "project")]
@@ -0,0 +1,93 @@
+import pytest
+
+from rcli.commands import CommandHandler, subcommand
+from rcli.context import Context, ContextError, ContextResolvers
+from rcli.dispatch import Dispatcher
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def lookups():
+    return []
+
+
+@pytest.fixture
+def resolvers(lookups):
+    res = ContextResolvers(ttl=10, clock=Clock())
+    res.register("/", lambda value: lookups.append(("/", value)) or f"path:{value}")
+    res.register("?#", lambda value: lookups.append(("?#", value)) or int(value))
+    return res
+
+
+class Show(CommandHandler):
+    def run(self, args, ctx=None):
+        return ctx.get("/"), ctx.all("?#")
+
+    @subcommand("lazy")
+    def lazy(self, args, ctx=None):
+        return type(ctx).__name__
+
+
+class Plain(CommandHandler):
+    depends_context = False
+
+    def run(self, args, ctx=None):
+        return ctx
+
+
+def test_only_dependent_handlers_resolve(registry, resolvers, lookups):
+    registry.register(Show, "show")
+    registry.register(Plain, "plain")
+    dispatcher = Dispatcher(registry, contexts=resolvers)
+
+    assert dispatcher.dispatch(parse_args(["prog", "/ws", "?#7", "plain"])) is None
+    args = parse_args(["prog", "/ws", "?#7", "show", "lazy"])
+    assert dispatcher.dispatch(args) == "Context"
+    assert lookups == []
+
+    args = parse_args(["prog", "/ws", "?#7", "?#8", "show"])
+    assert dispatcher.dispatch(args) == ("path:ws", [7, 8])
+    assert lookups == [("/", "ws"), ("?#", "7"), ("?#", "8")]
+
+    # An explicit ctx is passed through untouched.
+    args = parse_args(["prog", "/ws", "show", "lazy"])
+    assert dispatcher.dispatch(args, ctx="given") == "str"
+
+
+def test_results_are_memoised_with_ttl(resolvers, lookups):
+    ctx = Context(["/ws", "?#7"], resolvers)
+    assert list(ctx) == ["path:ws", 7]
+    assert list(Context(["/ws"], resolvers)) == ["path:ws"]
+    assert len(lookups) == 2
+    assert resolvers.stats() == {"hits": 1, "misses": 2, "size": 2}
+
+    resolvers.clock.now = 11
+    Context(["/ws"], resolvers)[0]
+    assert len(lookups) == 3
+
+    resolvers.invalidate(prefix="/")
+    Context(["/ws"], resolvers)[0]
+    assert len(lookups) == 4
+
+
+def test_lru_bound_and_unknown_prefix(lookups):
+    res = ContextResolvers(maxsize=2)
+    res.register("/", lambda value: lookups.append(value) or value)
+    for token in ("/a", "/b", "/c", "/a"):
+        res.resolve(token)
+    assert lookups == ["a", "b", "c", "a"]
+    assert res.stats()["size"] == 2
+
+    with pytest.raises(ContextError, match=r"'\?\?'"):
+        res.resolve("??anything")
@@ -0,0 +1,125 @@
+import os
+import socket
+import stat
+import sys
+import threading
+
+import pytest
+
+from rcli import client
+from rcli.daemon import CliServer
+from rcli.fanout import fan_out
+from rcli.pipeline import head
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"),
+                                reason="needs fork and Unix sockets")
+
+
+def echo(args, ctx=None):
+    print("cwd", os.getcwd(), "env", os.environ.get("RCLI_TEST"),
+          "args", args.positionals)
+    return 7
+
+
+@fan_out(workers=2)
+def shout(target, args, ctx=None):
+    return target.upper()
+
+
+def region(args, ctx=None):
+    print("region", args.option("region"))
+
+
+def test_daemon_round_trip(registry, tmp_path, monkeypatch, capfd):
+    registry.register(echo, "echo")
+    registry.register(shout, "shout")
+    socket_path = str(tmp_path / "rcli.sock")
+    server = CliServer(socket_path, registry, max_workers=2, idle_timeout=1.0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(socket_path):
+        pass
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RCLI_TEST", "yes")
+    code = client.run(["prog", "echo", "sub", "a"], socket_path)
+    assert code == 7
+    assert f"cwd {tmp_path} env yes args ('a',)" in capfd.readouterr().out
+
+    # Streamed results run and print in the server, one record per line.
+    assert client.run(["prog", "shout", "a", "b"], socket_path) == 0
+    assert capfd.readouterr().out.splitlines() == [
+        "TargetResult(index=0, target='a', result='A', error=None)",
+        "TargetResult(index=1, target='b', result='B', error=None)",
+    ]
+
+    assert client.run(["prog", "missing"], socket_path) == 1
+    assert "Unknown command 'missing'" in capfd.readouterr().err
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not os.path.exists(socket_path)
+    assert client.run(["prog", "echo"], socket_path) == client.EXIT_NO_SERVER
+
+
+def test_default_socket_needs_a_private_directory(tmp_path, monkeypatch, capfd):
+    monkeypatch.delenv(client.SOCKET_ENV, raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    os.mkdir(client.default_socket_dir(), 0o755)
+    os.chmod(client.default_socket_dir(), 0o755)
+
+    assert client.run(["prog", "echo"]) == client.EXIT_NO_SERVER
+    assert "Refusing to use" in capfd.readouterr().err
+    with pytest.raises(PermissionError):
+        CliServer().bind()
+
+
+def test_nothing_is_sent_to_another_users_server(tmp_path, monkeypatch, capfd):
+    socket_path = str(tmp_path / "other.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(socket_path)
+        listener.listen(1)
+        monkeypatch.setattr(client, "peer_uid", lambda sock: os.getuid() + 1)
+        assert client.run(["prog", "echo"], socket_path) == client.EXIT_NO_SERVER
+        conn, _ = listener.accept()
+        with conn:
+            assert conn.recv(1) == b""
+    assert "the server runs as uid" in capfd.readouterr().err
+
+
+def test_daemon_runs_argv_like_rcli(registry, tmp_path, monkeypatch, capfd):
+    for handler, name in ((shout, "shout"), (head, "head"), (region, "region")):
+        registry.register(handler, name)
+    socket_path = str(tmp_path / "rcli.sock")
+    server = CliServer(socket_path, registry, max_workers=2, idle_timeout=1.0,
+                       config=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(socket_path):
+        pass
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    assert client.run(["prog", "--help"], socket_path) == 0
+    out, err = capfd.readouterr()
+    assert "shout" in out and "region" in out and not err
+
+    assert client.run(["prog", "shout", "a", "b", "c", "|", "head", "1"],
+                      socket_path) == 0
+    assert capfd.readouterr().out.splitlines() == [
+        "TargetResult(index=0, target='a', result='A', error=None)",
+    ]
+
+    # Config layers come from the client's environment and working directory.
+    monkeypatch.setenv("RCLI_OPT_REGION__REGION", "eu")
+    assert client.run(["prog", "region"], socket_path) == 0
+    assert capfd.readouterr().out == "region eu\n"
+
+    thread.join(timeout=5)
@@ -0,0 +1,79 @@
+import pytest
+
+from rcli.commands import CommandHandler, subcommand
+from rcli.dispatch import CommandNotFoundError, Dispatcher
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Git(CommandHandler):
+    instances = 0
+
+    def __init__(self):
+        Git.instances += 1
+
+    def run(self, args, ctx=None):
+        return "run", args.subcommands, args.positionals
+
+    @subcommand("status")
+    def status(self, args, ctx=None):
+        return "status", args.positionals
+
+    @subcommand("remote add")
+    def remote_add(self, args, ctx=None):
+        return "remote add", args.subcommands, args.positionals
+
+    @subcommand("stash")
+    class Stash(CommandHandler):
+        def run(self, args, ctx=None):
+            return "stash"
+
+        @subcommand("pop")
+        def pop(self, args, ctx=None):
+            return "stash pop"
+
+
+@pytest.fixture
+def dispatcher(registry):
+    Git.instances = 0
+    registry.register(Git, "git")
+    return Dispatcher(registry)
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["git"], ("run", (), ())),
+        (["git", "status", "x"], ("status", ("x",))),
+        (["git", "remote", "add", "origin"],
+         ("remote add", ("remote", "add"), ("origin",))),
+        (["git", "remote", "x"], ("run", ("remote",), ("x",))),
+        (["git", "stash"], "stash"),
+        (["git", "stash", "pop"], "stash pop"),
+    ],
+)
+def test_dispatch(dispatcher, argv, expected):
+    assert dispatcher.dispatch(parse_args(["prog", *argv])) == expected
+
+
+def test_handler_instantiated_once(dispatcher):
+    for _ in range(3):
+        dispatcher.dispatch(parse_args(["prog", "git", "status"]))
+    assert Git.instances == 1
+    assert dispatcher.stats()["dispatches"] == 3
+    assert dispatcher.stats()["last_overhead_ns"] > 0
+
+
+def test_table_is_read_only_and_tracks_registry(dispatcher, registry):
+    with pytest.raises(TypeError):
+        dispatcher.table[("x",)] = None
+    registry.register(lambda args, ctx: "late", "late")
+    assert dispatcher.dispatch(parse_args(["prog", "late"])) == "late"
+
+
+def test_unknown_command(dispatcher):
+    with pytest.raises(CommandNotFoundError):
+        dispatcher.dispatch(parse_args(["prog", "nope"]))
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+import pytest
+
+from rcli.commands import CommandHandler, subcommand
+from rcli.dispatch import Dispatcher
+from rcli.fanout import fan_out, run_targets
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Probe(CommandHandler):
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    @fan_out(workers=3)
+    def run(self, target, args, ctx=None):
+        with Probe.lock:
+            Probe.running += 1
+            Probe.peak = max(Probe.peak, Probe.running)
+        time.sleep(0.02)
+        with Probe.lock:
+            Probe.running -= 1
+        if target == "bad":
+            raise ValueError("unreachable")
+        return target.upper()
+
+    @subcommand("pid")
+    @fan_out(mode="process", workers=2)
+    def pid(self, target, args, ctx=None):
+        return os.getpid()
+
+
+@pytest.fixture
+def dispatcher(registry):
+    registry.register(Probe, "probe")
+    return Dispatcher(registry)
+
+
+def test_fan_out_in_order_with_errors(dispatcher):
+    Probe.peak = 0
+    targets = ["a", "b", "bad", "c", "d", "e"]
+    results = list(dispatcher.dispatch(parse_args(["prog", "probe", *targets])))
+    assert [r.target for r in results] == targets
+    assert [r.result for r in results if r.ok] == ["A", "B", "C", "D", "E"]
+    assert isinstance(results[2].error, ValueError)
+    assert Probe.peak <= 3
+
+
+def test_subcommand_in_process_pool(dispatcher):
+    args = parse_args(["prog", "probe", "pid", "x", "y", "z"])
+    results = list(dispatcher.dispatch(args))
+    assert [r.target for r in results] == ["x", "y", "z"]
+    assert all(r.ok and r.result != os.getpid() for r in results)
+
+
+def test_timeout_and_streaming():
+    def work(target):
+        time.sleep(float(target))
+        return target
+
+    streamed = list(run_targets(work, ["0.3", "0.0", "5"], workers=3, timeout=0.15,
+                                ordered=False))
+    assert [r.target for r in streamed][0] == "0.0"
+    errors = {r.target: r.error for r in streamed}
+    assert errors["0.0"] is None
+    assert isinstance(errors["0.3"], TimeoutError)
+    assert isinstance(errors["5"], TimeoutError)
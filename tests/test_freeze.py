@@ -0,0 +1,81 @@
+import shutil
+import sys
+
+import pytest
+
+from rcli import rCli
+from rcli.commands import auto_import_subcommands
+from rcli.freeze import build_manifest, hidden_imports, write_hook
+from rcli.manifest import MANIFEST_NAME
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+COMMAND = """
+from rcli.commands import CommandHandler, cog
+
+@cog("{name}")
+class Handler(CommandHandler):
+    def run(self, args, ctx=None):
+        return "{name}"
+"""
+
+
+@pytest.fixture
+def frozen(tmp_path, monkeypatch):
+    """Pretend to run from a PyInstaller bundle unpacked at ``<tmp>/bundle``."""
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    monkeypatch.setattr(sys, "_MEIPASS", str(bundle), raising=False)
+    return bundle
+
+
+def fresh_process(registry):
+    registry.__init__()
+    for name in [m for m in sys.modules if m.startswith("cmds.")]:
+        del sys.modules[name]
+
+
+def test_build_writes_hook(registry, commands_tree, tmp_path):
+    commands_tree("alpha", COMMAND.format(name="alpha"))
+    manifest = build_manifest("cmds", registry)
+    assert hidden_imports(manifest) == ["cmds", "cmds.alpha"]
+
+    hook = write_hook(manifest, "cmds", str(tmp_path / "hooks"))
+    # PyInstaller never sees the dynamically imported cmds package, so the
+    # hook must be named after a module the application imports: rcli.
+    assert hook == str(tmp_path / "hooks" / f"hook-{rCli.__module__}.py")
+    namespace = {}
+    exec(open(hook).read(), namespace)
+    assert namespace["hiddenimports"] == ["cmds", "cmds.alpha"]
+    assert namespace["datas"] == [(str(tmp_path / "cmds" / MANIFEST_NAME), "cmds")]
+
+
+def test_frozen_imports_bundled_modules(registry, commands_tree, frozen):
+    commands_tree("alpha", COMMAND.format(name="alpha"))
+    commands_tree("beta", COMMAND.format(name="beta"))
+    manifest = build_manifest("cmds", registry)
+    (frozen / "cmds").mkdir()
+    shutil.copy(manifest.path, frozen / "cmds" / MANIFEST_NAME)
+
+    fresh_process(registry)
+    auto_import_subcommands("cmds", use_manifest=True)
+    assert sorted(registry.names()) == ["alpha", "beta"]
+    assert "cmds.alpha" not in sys.modules
+    assert registry.get("beta")().run(None) == "beta"
+    assert "cmds.alpha" not in sys.modules
+
+    fresh_process(registry)
+    auto_import_subcommands("cmds")
+    assert sorted(registry.loaded()) == ["alpha", "beta"]
+
+
+def test_frozen_without_manifest_walks_package(registry, commands_tree, frozen, capsys):
+    # Modules that were never imported must still be found.
+    commands_tree("alpha", COMMAND.format(name="alpha"))
+    fresh_process(registry)
+    auto_import_subcommands("cmds")
+    assert list(registry.loaded()) == ["alpha"]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,112 @@
+import sys
+
+from rcli import rCli
+from rcli.help import HelpModel, help_path
+from rcli.manifest import load_command_manifest
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+DEPLOY = '''
+from rcli.commands import CommandHandler, cog, subcommand
+from rcli.schema import Option, option
+
+@cog("deploy")
+class Deploy(CommandHandler):
+    """Ship the current build to an environment.
+
+    Builds are uploaded first and then activated, one region at a time,
+    so a failing region stops the rollout.
+
+    Example::
+
+        mycli deploy --region eu
+    """
+    aliases = ("d",)
+    options = (Option("region", choices=("eu", "us"), default="eu",
+                      help="Where to deploy"),)
+
+    def run(self, args, ctx=None):
+        return "deployed"
+
+    @subcommand("rollback")
+    @option("force", bool, aliases=("f",))
+    def rollback(self, args, ctx=None):
+        """Return to the previous build."""
+'''
+
+
+def test_help_path():
+    assert help_path(parse_args(["prog", "--help"])) == []
+    args = parse_args(["prog", "deploy", "rollback", "-h"])
+    assert help_path(args) == ["deploy", "rollback"]
+    assert help_path(parse_args(["prog", "--help", "deploy"])) == ["deploy"]
+    args = parse_args(["prog", "help", "deploy", "rollback"])
+    assert help_path(args) == ["deploy", "rollback"]
+    assert help_path(parse_args(["prog", "connect", "-h", "example.com"])) is None
+    assert help_path(parse_args(["prog", "deploy"])) is None
+
+
+def test_help_is_served_from_the_manifest(registry, commands_tree, monkeypatch, capsys):
+    commands_tree("deploy", DEPLOY)
+    load_command_manifest("cmds", registry)
+    # A new process: nothing imported, commands registered lazily from the manifest.
+    del sys.modules["cmds.deploy"]
+    registry.__init__()
+
+    monkeypatch.setattr(sys, "argv", ["/usr/bin/mycli", "deploy", "--help"])
+    assert rCli(auto_import="cmds").dispatch() is None
+    out = capsys.readouterr().out
+    assert out.startswith("Usage: mycli deploy [SUBCOMMAND] [OPTIONS] [ARGS...]\n")
+    assert "  rollback  Return to the previous build.\n" in out
+    assert "--region REGION" in out and "(one of eu, us; default eu)" in out
+    assert "\n    mycli deploy --region eu\n" in out
+    assert "Aliases: @d" in out
+    assert "cmds.deploy" not in sys.modules
+
+    monkeypatch.setattr(sys, "argv", ["mycli", "deploy"])
+    assert rCli(auto_import="cmds").dispatch() == "deployed"
+
+
+def test_rendering_is_width_aware(registry, commands_tree):
+    commands_tree("deploy", DEPLOY)
+    load_command_manifest("cmds", registry)
+    model = HelpModel.from_registry(registry)
+
+    text = model.render(["deploy"], "mycli", width=40)
+    assert max(len(line) for line in text.splitlines()
+               if not line.startswith("    mycli")) <= 40
+    assert "--force, -f" in model.render(["deploy", "rollback"], "mycli", width=40)
+    assert model.render([], "mycli").startswith(
+        "Usage: mycli COMMAND [ARGS...]\n\nCommands:\n  deploy")
+    assert model.render(["nope"], "mycli").startswith("Unknown command 'nope'.")
+
+
+DU = '''
+from rcli.commands import cog
+from rcli.schema import option
+
+@cog("du")
+@option("h", bool, help="Human-readable sizes")
+def du(args, ctx=None):
+    return "human" if args.values["h"] else "bytes"
+'''
+
+
+def test_commands_declaring_h_keep_it(registry, commands_tree, monkeypatch):
+    commands_tree("du", DU)
+    load_command_manifest("cmds", registry)
+    assert help_path(parse_args(["prog", "du", "-h"]), registry) is None
+    assert help_path(parse_args(["prog", "du", "--help"]), registry) == ["du"]
+    assert help_path(parse_args(["prog", "deploy", "-h"]), registry) == ["deploy"]
+
+    del sys.modules["cmds.du"]
+    registry.__init__()
+    load_command_manifest("cmds", registry)
+    assert help_path(parse_args(["prog", "du", "-h"]), registry) is None
+    assert "cmds.du" not in sys.modules
+
+    monkeypatch.setattr(sys, "argv", ["mycli", "du", "-h"])
+    assert rCli(auto_import="cmds").dispatch() == "human"
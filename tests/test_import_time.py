@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import rcli
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+SRC_DIR = str(Path(rcli.__file__).resolve().parents[1])
+
+# Cold-import budget for ``import rcli`` in microseconds, as reported by
+# ``python -X importtime``. It measures about 300-450us on a developer laptop;
+# the budget is tight enough to catch one stray eager import (json alone costs
+# several ms). Override with RCLI_IMPORT_BUDGET_US on slow machines.
+IMPORT_BUDGET_US = int(os.environ.get("RCLI_IMPORT_BUDGET_US", "3000"))
+RUNS = 5
+
+# Modules that `import rcli` must not pull in on its own.
+HEAVY_MODULES = ("dataclasses", "importlib.metadata", "logging", "pathlib", "pkgutil",
+                 "re")
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    result = subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+    return result
+
+
+def cold_import_us():
+    """Cumulative ``import rcli`` time in a fresh interpreter."""
+    stderr = run_python("-X", "importtime", "-c", "import rcli").stderr
+    for line in stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == "rcli":
+            return int(fields[1])
+    raise AssertionError(f"rcli missing from -X importtime output:\n{stderr}")
+
+
+def test_import_does_not_load_heavy_modules():
+    code = "import sys; import rcli; print(' '.join(sys.modules))"
+    loaded = set(run_python("-c", code).stdout.split())
+    baseline = set(run_python("-c", code.replace("import rcli; ", "")).stdout.split())
+    pulled_in = (loaded - baseline) & set(HEAVY_MODULES)
+    assert not pulled_in
+    assert not {m for m in loaded if m.startswith("rcli.")}
+
+
+def test_help_check_imports_only_the_parser():
+    code = ("import sys; import rcli.parser; before = set(sys.modules); "
+            "import rcli.help; print(' '.join(set(sys.modules) - before))")
+    assert run_python("-c", code).stdout.split() == ["rcli.help"]
+
+
+def test_cold_import_within_budget():
+    # Best of several runs keeps scheduler noise out of the measurement.
+    best = min(cold_import_us() for _ in range(RUNS))
+    assert best <= IMPORT_BUDGET_US, (
+        f"import rcli took {best}us (budget {IMPORT_BUDGET_US}us)")
+
+
+def test_lazy_attributes():
+    assert rcli.parse_args is rcli.parser.parse_args
+    assert rcli.CommandRegistry is rcli.registry.CommandRegistry
+    assert isinstance(rcli.__version__, str)
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+from rcli import completion
+from rcli.commands import auto_import_subcommands
+from rcli.manifest import MANIFEST_NAME, CommandManifest, load_command_manifest
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+COMMAND = """
+from rcli.commands import CommandHandler, cog
+
+@cog("{name}")
+class Handler(CommandHandler):
+    pass
+"""
+
+
+def test_manifest_imports_only_dispatched_module(registry, commands_tree):
+    commands_tree("alpha", COMMAND.format(name="alpha"))
+    commands_tree("beta", COMMAND.format(name="beta"))
+    auto_import_subcommands("cmds", use_manifest=True)
+
+    manifest = CommandManifest.load(os.path.join("cmds", MANIFEST_NAME))
+    assert manifest.commands() == {"alpha": "cmds.alpha", "beta": "cmds.beta"}
+
+    # Simulate a fresh process: nothing imported, manifest already on disk.
+    registry.__init__()
+    del sys.modules["cmds.alpha"], sys.modules["cmds.beta"]
+    auto_import_subcommands("cmds", use_manifest=True)
+    assert sorted(registry.names()) == ["alpha", "beta"]
+    assert "cmds.alpha" not in sys.modules
+
+    assert registry.get("beta").__module__ == "cmds.beta"
+    assert "cmds.beta" in sys.modules
+    assert "cmds.alpha" not in sys.modules
+
+
+def test_manifest_refreshes_changed_module(registry, commands_tree):
+    path = commands_tree("alpha", COMMAND.format(name="alpha"))
+    auto_import_subcommands("cmds", use_manifest=True)
+
+    path.write_text(COMMAND.format(name="gamma"))
+    os.utime(path, ns=(0, 0))
+    auto_import_subcommands("cmds", use_manifest=True)
+    manifest = CommandManifest.load(os.path.join("cmds", MANIFEST_NAME))
+    assert manifest.commands() == {"gamma": "cmds.alpha"}
+
+
+@pytest.mark.parametrize("owner, name", [(CommandManifest, "save"),
+                                         (completion, "write_completion_index")])
+def test_unwritable_manifest_is_kept_in_memory(registry, commands_tree, monkeypatch,
+                                               owner, name):
+    def read_only(*args):
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(owner, name, read_only)
+    commands_tree("alpha", COMMAND.format(name="alpha"))
+    manifest = load_command_manifest("cmds", registry)
+    assert manifest.commands() == {"alpha": "cmds.alpha"}
+    assert registry.names() == ["alpha"]
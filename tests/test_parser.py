@@ -0,0 +1,172 @@
+import random
+import re
+
+import dataclasses
+
+import pytest
+
+from rcli import parser
+from rcli.parser import parse_args, reconstruct_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+def legacy_parse_args(args):
+    """The original regex-chain parser, kept as the reference behaviour.
+
+    Returns the CliArgs fields as a tuple of plain containers.
+    """
+    args = list(args)
+    program = args.pop(0)
+    command = ""
+    global_options, global_flags, local_options, local_flags = {}, set(), {}, set()
+    subcommands, positionals, context_args = [], [], []
+    passed_global_scope = False
+
+    def set_option(name, value):
+        target = local_options if passed_global_scope else global_options
+        if name in target:
+            target[name] += f",{value}"
+        else:
+            target[name] = value
+
+    def set_flag(name):
+        (local_flags if passed_global_scope else global_flags).add(name)
+
+    while args:
+        arg = args.pop(0)
+        if any(arg.startswith(prefix) for prefix in ["/", "?#", "?@", "??"]):
+            context_args.append(arg)
+            passed_global_scope = True
+        elif re.match(r"^--[\w-]+=.+$", arg):
+            name, val = arg[2:].split("=", 1)
+            set_option(name, val)
+        elif re.match(r"^--[\w-]+$", arg):
+            name = arg[2:]
+            if args and not args[0].startswith("-"):
+                set_option(name, args.pop(0))
+            else:
+                set_flag(name)
+        elif re.match(r"^-[a-zA-Z]{2,}$", arg):
+            for ch in arg[1:]:
+                set_flag(ch)
+        elif re.match(r"^-[a-zA-Z]$", arg):
+            name = arg[1:]
+            if args and not args[0].startswith("-"):
+                set_option(name, args.pop(0))
+            else:
+                set_flag(name)
+        elif re.match(r"^[@:#].+", arg):
+            command = arg
+        elif not command:
+            command = arg
+            passed_global_scope = True
+        elif not subcommands:
+            subcommands.append(arg)
+        else:
+            positionals.append(arg)
+    return (program, global_options, global_flags, command, subcommands,
+            local_options, local_flags, positionals, context_args)
+
+
+def joined(options):
+    # The legacy parser joined repeated options with commas.
+    return {name: ",".join(values) for name, values in options.items()}
+
+
+def plain(parsed):
+    return (parsed.program, joined(parsed.global_options), set(parsed.global_flags),
+            parsed.command, list(parsed.subcommands), joined(parsed.local_options),
+            set(parsed.local_flags), list(parsed.positionals),
+            list(parsed.context_args))
+
+
+CASES = [
+    ["prog"],
+    ["prog", "cmd"],
+    ["prog", "--verbose", "cmd", "sub", "a", "b"],
+    ["prog", "--out", "file", "cmd", "--out=x", "-v", "sub"],
+    ["prog", "-abc", "cmd", "-x", "1", "-y", "--", "-"],
+    ["prog", "/ctx", "?#1", "?@a", "??q", "?x", "cmd"],
+    ["prog", "@alias", "sub", "#id", ":name", "@", "#\n"],
+    ["prog", "--inc=a", "--inc", "b", "cmd", "--inc=c", "--inc=d"],
+    ["prog", "--k=a=b", "--e=", "--bad!", "-1", "", "cmd", "--flag\n", "-ab\n"],
+]
+
+
+@pytest.mark.parametrize("argv", CASES)
+def test_matches_legacy_parser(argv):
+    assert plain(parse_args(argv)) == legacy_parse_args(argv)
+
+
+def test_does_not_consume_input():
+    argv = ["prog", "--a", "b", "cmd"]
+    parse_args(argv)
+    assert argv == ["prog", "--a", "b", "cmd"]
+
+
+def test_matches_legacy_parser_randomised():
+    rng = random.Random(1234)
+    vocab = [
+        "cmd", "sub", "x", "", "-", "--", "-v", "-vq", "-1", "--name", "--k=v",
+        "--k=", "--a-b", "/p", "?#", "??", "?@x", "?z", "@a", ":n", "#1", "@",
+        "-x\n", "--o\n", "#\n", "ü", "--ü=1",
+    ]
+    for _ in range(2000):
+        argv = ["prog"] + [rng.choice(vocab) for _ in range(rng.randint(0, 12))]
+        assert plain(parse_args(argv)) == legacy_parse_args(argv), argv
+
+
+def test_reconstruct_round_trip():
+    parsed = parse_args(["prog", "cmd", "sub", "--l=2", "-f", "--", "p"])
+    assert parse_args(["prog"] + reconstruct_args(parsed)) == parsed
+
+
+def test_repeated_options_accumulate():
+    parsed = parse_args(["prog", "--inc", "a,b", "cmd", "--inc=c", "--inc", "d",
+                         "-n", "1"])
+    assert parsed.global_options == {"inc": ("a,b",)}
+    assert parsed.local_options == {"inc": ("c", "d"), "n": ("1",)}
+    assert parsed.option("inc") == "d"
+    assert parsed.option("missing", "x") == "x"
+    assert parsed.option_values("inc") == ("a,b", "c", "d")
+    assert parsed.count("inc") == 3
+    rebuilt = reconstruct_args(parsed, ignore_global=True)
+    assert rebuilt == ["cmd", "--inc=c", "--inc=d", "--n=1"]
+
+
+def test_cliargs_is_immutable():
+    parsed = parse_args(["prog", "--a=1", "cmd", "x", "y", "-v"])
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        parsed.command = "other"
+    with pytest.raises(TypeError):
+        parsed.global_options["a"] = ("2",)
+    assert parsed.positionals == ("y",)
+    assert not hasattr(parsed, "__dict__")
+    # Built without the dataclass __init__, but indistinguishable from it.
+    assert type(parsed) is parser.CliArgs
+    assert parsed == dataclasses.replace(parsed)
+
+
+def test_cliargs_is_hashable():
+    parsed = parse_args(["prog", "--a=1", "cmd", "x", "y", "-v"])
+    assert hash(parsed) == hash(parse_args(["prog", "--a=1", "cmd", "x", "y", "-v"]))
+    assert parse_args(["prog", "cmd", "x", "z"]) not in {parsed}
+    # Also once the dispatcher has filled in typed values, or a pipeline input.
+    hash(dataclasses.replace(parsed, values={"v": True}, input=[1]))
+
+
+def test_parse_cache():
+    parser.enable_parse_cache(maxsize=2)
+    try:
+        first = parse_args(["prog", "cmd", "a"])
+        assert parse_args(["prog", "cmd", "a"]) is first
+        parse_args(["prog", "cmd", "b"])
+        parse_args(["prog", "cmd", "c"])
+        info = parser.parse_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 3, 2)
+    finally:
+        parser.disable_parse_cache()
+    assert parser.parse_cache_info() is None
@@ -0,0 +1,101 @@
+import json
+import sys
+
+import pytest
+
+from rcli import profiling, rCli
+from rcli.commands import CommandHandler
+from rcli.dispatch import Dispatcher
+from rcli.pipeline import Pipeline, PipelineError, head
+from rcli.shell import Shell
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Numbers(CommandHandler):
+    produced = []
+    closed = False
+
+    def run(self, args, ctx=None):
+        Numbers.produced, Numbers.closed = [], False
+        try:
+            n = 0
+            while True:
+                Numbers.produced.append(n)
+                yield n
+                n += 1
+        finally:
+            Numbers.closed = True
+
+
+class Double(CommandHandler):
+    def run(self, args, ctx=None):
+        for n in args.input:
+            yield n * 2
+
+
+def total(args, ctx=None):
+    return sum(args.input)
+
+
+@pytest.fixture
+def dispatcher(registry):
+    for handler, name in ((Numbers, "numbers"), (Double, "double"), (total, "total"),
+                          (head, "head")):
+        registry.register(handler, name)
+    return Dispatcher(registry)
+
+
+def test_stages_stream_and_stop_early(dispatcher):
+    argv = ["prog", "numbers", "|", "double", "|", "head", "3"]
+    pipeline = Pipeline.from_argv(argv, dispatcher)
+    assert list(pipeline) == [0, 2, 4]
+    # The infinite source produced only what head asked for, then was closed.
+    assert Numbers.produced == [0, 1, 2]
+    assert Numbers.closed
+
+
+def test_scalar_result_and_source(dispatcher):
+    pipeline = Pipeline.from_argv(["prog", "double", "|", "total"], dispatcher)
+    assert list(pipeline.run(source=[1, 2, 3])) == [12]
+    pipeline = Pipeline.from_argv(["prog", "head", "--n=2"], dispatcher)
+    assert list(pipeline.run(source="abc")) == ["a", "b"]
+
+
+def test_consumer_closing_closes_stages(dispatcher):
+    records = Pipeline.from_argv(["prog", "numbers", "|", "double"], dispatcher).run()
+    assert next(records) == 0 and next(records) == 2
+    records.close()
+    assert Numbers.closed
+
+
+def test_empty_stage_is_rejected(dispatcher):
+    with pytest.raises(PipelineError):
+        Pipeline.from_argv(["prog", "numbers", "|", "|", "double"], dispatcher)
+
+
+def test_shell_prints_pipeline_records(dispatcher, capsys):
+    Shell(dispatcher, history_path="").run_line("numbers | head 2")
+    assert capsys.readouterr().out == "0\n1\n"
+
+
+def test_rcli_pipeline_is_profiled_until_consumed(dispatcher, monkeypatch, capsys):
+    seen = []
+
+    def options(args, ctx=None):
+        seen.append((args.global_options, args.global_flags))
+        yield from args.input
+
+    dispatcher.registry.register(options, "options")
+    monkeypatch.setattr(sys, "argv", ["prog", "numbers", "|", "--rcli-profile",
+                                      "options", "|", "head", "2"])
+    records = rCli().dispatch()
+    assert capsys.readouterr().err == ""
+
+    assert list(records) == [0, 1]
+    assert seen == [({}, frozenset())]
+    assert profiling.active is None
+    phases = json.loads(capsys.readouterr().err)["phases"]
+    assert "parse_args" in {p["name"] for p in phases}
@@ -0,0 +1,103 @@
+import json
+import sys
+
+import pytest
+
+from rcli import profiling, rCli
+from rcli.commands import auto_import_subcommands
+from rcli.dispatch import Dispatcher
+from rcli.manifest import load_command_manifest
+from rcli.parser import parse_args
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+@pytest.fixture(autouse=True)
+def no_profiler():
+    profiling.stop()
+    profiling._startup.clear()
+    yield
+    profiling.stop()
+
+
+def test_hooks_are_noops_without_profiler(registry):
+    registry.register(lambda args, ctx=None: "ok", "ping")
+    assert profiling.phase("anything") is profiling._NULL
+    assert Dispatcher(registry).dispatch(parse_args(["prog", "ping"])) == "ok"
+    assert profiling.active is None
+
+
+def test_flag_profiles_parse_dispatch_and_run(registry, monkeypatch, capsys):
+    registry.register(lambda args, ctx=None: sorted(args.global_options), "ping")
+    monkeypatch.setattr(sys, "argv", ["prog", "--rcli-profile=json", "--x=1", "ping"])
+    cli = rCli()
+    assert cli.dispatch() == ["x"]
+    assert profiling.active is None
+
+    phases = json.loads(capsys.readouterr().err)["phases"]
+    names = [p["name"] for p in phases]
+    assert names[0] == "import rcli"
+    assert {"parse_args", "dispatch", "run"} <= set(names)
+    assert all(p["wall_ns"] >= 0 and p["cpu_ns"] >= 0 for p in phases)
+
+
+def test_chrome_trace_includes_module_imports(registry, commands_tree, tmp_path,
+                                              monkeypatch):
+    commands_tree("hello", "from rcli.commands import cog, CommandHandler\n"
+                           "@cog('hello')\nclass Hello(CommandHandler):\n"
+                           "    def run(self, args, ctx=None):\n        return 'hi'\n")
+    auto_import_subcommands("cmds")
+    out = tmp_path / "trace.json"
+    monkeypatch.setattr(sys, "argv", ["prog", "--rcli-profile=chrome",
+                                      f"--rcli-profile-out={out}", "hello"])
+    assert rCli().dispatch() == "hi"
+
+    events = json.loads(out.read_text())["traceEvents"]
+    assert {"import cmds.hello", "run"} <= {e["name"] for e in events}
+    assert all(e["ph"] == "X" and e["ts"] >= 0 for e in events)
+
+
+def test_lazy_imports_are_profiled_in_manifest_mode(registry, commands_tree,
+                                                    monkeypatch, capsys):
+    commands_tree("hello", "from rcli.commands import cog, CommandHandler\n"
+                           "@cog('hello')\nclass Hello(CommandHandler):\n"
+                           "    def run(self, args, ctx=None):\n        return 'hi'\n")
+    load_command_manifest("cmds", registry)
+    # A new process: the command is registered lazily from the manifest.
+    del sys.modules["cmds.hello"]
+    registry.__init__()
+    profiling._startup.clear()
+
+    monkeypatch.setattr(sys, "argv", ["prog", "--rcli-profile=json", "hello"])
+    cli = rCli(auto_import="cmds")
+    assert "cmds.hello" not in sys.modules
+    assert cli.dispatch() == "hi"
+
+    phases = json.loads(capsys.readouterr().err)["phases"]
+    imports = [p["name"] for p in phases if p["category"] == "import"]
+    assert imports == ["import cmds.hello"]
+
+
+def test_cprofile_format_dumps_stats(registry, tmp_path):
+    registry.register(lambda args, ctx=None: sum(range(1000)), "sum")
+    profiler = profiling.start("cprofile", output=str(tmp_path / "out.json"))
+    Dispatcher(registry).dispatch(parse_args(["prog", "sum"]))
+    profiling.stop().report()
+    assert profiler.cprofile is not None
+    assert (tmp_path / "out.json.pstats").exists()
+
+
+def test_bare_flag_and_unknown_format():
+    args = parse_args(["prog", "--rcli-profile", "ping", "sub"])
+    assert (args.command, args.subcommands, args.global_flags) == (
+        "ping", ("sub",), {"rcli-profile"})
+    profiler, args = profiling.start_from_args(args)
+    try:
+        assert profiler.format == "json" and args.global_flags == frozenset()
+    finally:
+        profiling.stop()
+
+    with pytest.raises(ValueError, match="must be one of json, chrome, cprofile"):
+        profiling.start_from_args(parse_args(["prog", "--rcli-profile=flame", "ping"]))
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from rcli import rCli
+from rcli.commands import CommandHandler, cog
+from rcli.dispatch import Dispatcher
+from rcli.parser import parse_args
+from rcli.registry import CommandRegistry
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+def test_snapshots_are_read_only_and_shared(registry):
+    registry.register(len, "len")
+    view = registry.all_commands()
+    assert view is registry.loaded() is registry.all_commands()
+    with pytest.raises(TypeError):
+        view["x"] = len
+
+    registry.register(abs, "abs")
+    # Earlier views keep the state they were taken at.
+    assert set(view) == {"len"}
+    assert set(registry.loaded()) == {"len", "abs"}
+    assert registry.snapshot().version == registry.version
+
+
+def test_scoped_registries_are_independent(registry, monkeypatch):
+    tenant = CommandRegistry.scoped("tenant-a")
+    assert CommandRegistry.scoped("tenant-a") is tenant
+    assert CommandRegistry.create() is not CommandRegistry.create()
+
+    @cog("hello", registry=tenant)
+    class Hello(CommandHandler):
+        def run(self, args, ctx=None):
+            return "hi"
+
+    assert registry.get("hello") is None
+    monkeypatch.setattr("sys.argv", ["prog", "hello"])
+    assert rCli(registry=tenant).dispatch() == "hi"
+    tenant.unregister("hello")
+
+
+def test_concurrent_registration_and_dispatch():
+    registry = CommandRegistry.create()
+    dispatcher = Dispatcher(registry)
+    errors = []
+
+    def register(start):
+        for i in range(start, start + 200):
+            registry.register(lambda args, ctx=None, i=i: i, f"c{i}")
+
+    def dispatch():
+        try:
+            for i in range(200):
+                if registry.get(f"c{i}") is not None:
+                    assert dispatcher.dispatch(parse_args(["prog", f"c{i}"])) == i
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=register, args=(n * 200,)) for n in range(4)]
+    threads += [threading.Thread(target=dispatch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(registry.loaded()) == 800
+    assert registry.version == 800
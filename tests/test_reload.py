@@ -0,0 +1,119 @@
+import logging
+import os
+
+import pytest
+
+from rcli.commands import auto_import_subcommands
+from rcli.dispatch import CommandNotFoundError, Dispatcher
+from rcli.parser import parse_args
+from rcli.reload import Reloader
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+COMMAND = """
+from rcli.commands import CommandHandler, cog
+{extra}
+@cog("{name}")
+class Handler(CommandHandler):
+    aliases = ("{name}-alias",)
+
+    def run(self, args, ctx=None):
+        return {result}
+"""
+
+
+def write(commands_tree, module, name, result="1", extra=""):
+    path = commands_tree(module, COMMAND.format(name=name, result=result, extra=extra))
+    # Make every write visible even within one mtime tick.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    return path
+
+
+def test_refresh_reloads_only_changed_modules(registry, commands_tree):
+    write(commands_tree, "alpha", "alpha")
+    write(commands_tree, "beta", "beta")
+    reloader = Reloader("cmds", registry)
+    assert reloader.refresh().imported == ["cmds.alpha", "cmds.beta"]
+    assert not reloader.refresh()
+
+    write(commands_tree, "beta", "beta", result="2")
+    report = reloader.refresh()
+    assert report.reloaded == ["cmds.beta"] and not report.imported
+    assert registry.get("beta")().run(None) == 2
+
+    # Touched but identical content is not reloaded.
+    write(commands_tree, "beta", "beta", result="2")
+    assert not reloader.refresh()
+
+
+def test_renamed_and_deleted_commands_are_unregistered(registry, commands_tree):
+    write(commands_tree, "alpha", "alpha")
+    path = write(commands_tree, "beta", "beta")
+    reloader = Reloader("cmds", registry)
+    reloader.refresh()
+    dispatcher = Dispatcher(registry)
+    assert dispatcher.resolver.resolve("@alpha-alias") == "alpha"
+
+    write(commands_tree, "alpha", "gamma")
+    report = reloader.refresh()
+    assert report.removed == ["alpha"]
+    assert sorted(registry.names()) == ["beta", "gamma"]
+    assert dispatcher.resolver.resolve("@alpha-alias") is None
+    assert dispatcher.resolver.resolve(":gam") == "gamma"
+    with pytest.raises(CommandNotFoundError):
+        dispatcher.dispatch(parse_args(["prog", "alpha"]))
+
+    path.unlink()
+    report = reloader.refresh()
+    assert report.unloaded == ["cmds.beta"] and report.removed == ["beta"]
+    assert registry.names() == ["gamma"]
+
+
+def test_dependents_are_reloaded(registry, commands_tree):
+    util = commands_tree("util", "VALUE = 1\n")
+    write(commands_tree, "alpha", "alpha", result="VALUE",
+          extra="from cmds.util import VALUE")
+    write(commands_tree, "beta", "beta")
+    reloader = Reloader("cmds", registry)
+    reloader.refresh()
+    assert registry.get("alpha")().run(None) == 1
+
+    util.write_text("VALUE = 2\n")
+    os.utime(util, ns=(0, 1))
+    report = reloader.refresh()
+    assert report.reloaded == ["cmds.util", "cmds.alpha"]
+    assert registry.get("alpha")().run(None) == 2
+
+
+def test_failed_import_is_not_retried_until_changed(registry, commands_tree):
+    write(commands_tree, "alpha", "alpha")
+    reloader = Reloader("cmds", registry)
+    reloader.refresh()
+    broken = write(commands_tree, "alpha", "alpha", result="1 +")
+    with pytest.raises(SyntaxError):
+        reloader.refresh()
+    assert not reloader.refresh()
+    assert registry.get("alpha")().run(None) == 1
+
+    broken.write_text(COMMAND.format(name="alpha", result="3", extra=""))
+    os.utime(broken, ns=(0, 2))
+    assert reloader.refresh().reloaded == ["cmds.alpha"]
+    assert registry.get("alpha")().run(None) == 3
+
+
+def test_auto_import_skips_unchanged_modules(registry, commands_tree, caplog):
+    caplog.set_level(logging.DEBUG, logger="rCli.commands")
+    write(commands_tree, "alpha", "alpha")
+    auto_import_subcommands("cmds")
+    assert "Importing cmds.alpha" in caplog.messages
+    caplog.clear()
+    auto_import_subcommands("cmds")
+    assert "Importing cmds.alpha" not in caplog.messages
+
+    # A reset registry is repopulated even though the file did not change.
+    registry.__init__()
+    auto_import_subcommands("cmds")
+    assert registry.names() == ["alpha"]
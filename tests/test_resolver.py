@@ -0,0 +1,90 @@
+import gc
+import sys
+
+import pytest
+
+from rcli.commands import CommandHandler
+from rcli.dispatch import CommandNotFoundError, Dispatcher
+from rcli.manifest import load_command_manifest
+from rcli.parser import parse_args
+from rcli.resolver import AmbiguousCommandError, CommandResolver, PrefixTrie
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Status(CommandHandler):
+    aliases = ("st",)
+    command_id = 42
+
+    def run(self, args, ctx=None):
+        return "status"
+
+
+class Stash(CommandHandler):
+    def run(self, args, ctx=None):
+        return "stash"
+
+
+def test_prefix_trie():
+    trie = PrefixTrie()
+    for name in ("status", "stash", "show"):
+        trie.insert(name)
+    assert trie.unique("stat") == "status"
+    assert trie.unique("sh") == "show"
+    assert trie.unique("x") is None
+    with pytest.raises(AmbiguousCommandError) as err:
+        trie.unique("st")
+    assert err.value.candidates == ["stash", "status"]
+    trie.remove("stash")
+    assert trie.unique("st") == "status"
+    assert sorted(trie.names()) == ["show", "status"]
+
+
+def test_resolver_indexes_incrementally(registry):
+    resolver = CommandResolver(registry)
+    assert resolver.resolve("@st") is None
+    registry.register(Status, "status")
+    registry.register(Stash, "stash")
+    assert resolver.resolve("@st") == "status"
+    assert resolver.resolve("#42") == "status"
+    assert resolver.resolve(":stas") == "stash"
+
+    # Re-registering a name retracts its old aliases.
+    registry.register(Stash, "status")
+    assert resolver.resolve("@st") is None
+    assert resolver.resolve("#42") is None
+
+
+def test_dispatch_query_commands(registry):
+    registry.register(Status, "status")
+    dispatcher = Dispatcher(registry)
+    for query in ("@st", "#42", ":sta", "status"):
+        assert dispatcher.dispatch(parse_args(["prog", query])) == "status"
+    with pytest.raises(CommandNotFoundError):
+        dispatcher.dispatch(parse_args(["prog", "@nope"]))
+
+
+def test_lazy_commands_resolve_from_the_manifest(registry, commands_tree):
+    commands_tree("status", "from rcli.commands import CommandHandler, cog\n"
+                            "@cog('status')\nclass Status(CommandHandler):\n"
+                            "    aliases = ('st',)\n    command_id = 7\n"
+                            "    def run(self, args, ctx=None):\n"
+                            "        return 'status'\n")
+    load_command_manifest("cmds", registry)
+    del sys.modules["cmds.status"]
+    registry.__init__()
+    load_command_manifest("cmds", registry)
+
+    resolver = CommandResolver(registry)
+    assert resolver.resolve("@st") == resolver.resolve("#7") == "status"
+    assert "cmds.status" not in sys.modules
+    assert Dispatcher(registry).dispatch(parse_args(["prog", "@st"])) == "status"
+
+
+def test_dropped_resolvers_stop_listening(registry):
+    CommandResolver(registry)
+    gc.collect()
+    assert registry._listeners == registry._removal_listeners == []
+    registry.register(Status, "status")
@@ -0,0 +1,81 @@
+import pytest
+
+from rcli.commands import CommandHandler, subcommand
+from rcli.dispatch import Dispatcher
+from rcli.parser import parse_args
+from rcli.schema import Option, OptionError, OptionPlan, option
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Fetch(CommandHandler):
+    options = (Option("retries", int, default=3),)
+
+    def run(self, args, ctx=None):
+        return dict(args.values)
+
+    @subcommand("url")
+    @option("format", choices=("json", "csv"), default="json")
+    @option("header", multiple=True)
+    @option("verbose", bool, aliases=("v",))
+    def url(self, args, ctx=None):
+        return dict(args.values)
+
+
+@option("limit", int, required=True)
+def top(args, ctx=None):
+    return args.values["limit"]
+
+
+@pytest.fixture
+def dispatcher(registry):
+    registry.register(Fetch, "fetch")
+    registry.register(top, "top")
+    return Dispatcher(registry)
+
+
+def dispatch(dispatcher, *argv):
+    return dispatcher.dispatch(parse_args(["prog", *argv]))
+
+
+def test_plans_compiled_at_class_creation():
+    assert isinstance(Fetch._option_plan, OptionPlan)
+    assert [o.name for o in Fetch._subcommand_plans["url"].options] == [
+        "retries", "format", "header", "verbose"]
+
+
+def test_typed_values(dispatcher):
+    assert dispatch(dispatcher, "fetch") == {"retries": 3}
+    assert dispatch(dispatcher, "fetch", "url", "--retries=5", "--header", "a",
+                    "--header=b", "-v") == {
+        "retries": 5, "format": "json", "header": ("a", "b"), "verbose": True}
+    assert dispatch(dispatcher, "--retries", "1", "fetch", "url", "--format=csv",
+                    "--verbose=no") == {
+        "retries": 1, "format": "csv", "header": (), "verbose": False}
+    assert dispatch(dispatcher, "top", "--limit", "7") == 7
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["fetch", "--retries=x"], "Invalid int value for --retries: 'x'"),
+    (["fetch", "url", "--format=xml"], "Invalid choice for --format: 'xml'"),
+    (["top"], "Missing required option --limit"),
+])
+def test_invalid_input_rejected_before_handler(dispatcher, argv, message):
+    with pytest.raises(OptionError, match=message):
+        dispatch(dispatcher, *argv)
+
+
+def show(args, ctx=None):
+    return args.values["verbose"], args.positionals, args.option("v")
+
+
+def test_bool_option_leaves_a_following_word_positional(registry):
+    registry.register(option("verbose", bool, aliases=("v",))(show), "show")
+    dispatcher = Dispatcher(registry)
+    assert dispatch(dispatcher, "show", "-v", "file.txt") == (
+        True, ("file.txt",), None)
+    assert dispatch(dispatcher, "show", "-v", "off") == (False, (), "off")
+    assert dispatch(dispatcher, "show", "x", "-v", "a", "-v", "b") == (
+        True, ("a", "b"), None)
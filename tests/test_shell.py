@@ -0,0 +1,67 @@
+import builtins
+
+import pytest
+
+from rcli.commands import CommandHandler, subcommand
+from rcli.dispatch import Dispatcher
+from rcli.schema import option
+from rcli.shell import Shell
+
+__author__ = "rrenode"
+__copyright__ = "rrenode"
+__license__ = "MIT"
+
+
+class Deploy(CommandHandler):
+    aliases = ("d",)
+
+    def run(self, args, ctx=None):
+        return (args.option("region"), sorted(args.global_flags), args.subcommands)
+
+    @subcommand("status")
+    @option("format", choices=("json", "text"))
+    def status(self, args, ctx=None):
+        return "ok"
+
+
+@pytest.fixture
+def shell(registry):
+    registry.register(Deploy, "deploy")
+    registry.register(lambda args, ctx=None: None, "dump")
+    return Shell(Dispatcher(registry), program="mycli", history_path="")
+
+
+def test_global_options_persist_across_lines(shell):
+    assert shell.execute("--region=eu -v") is None
+    assert shell.execute("deploy api") == ("eu", ["v"], ("api",))
+    assert shell.execute("--region=us deploy web") == ("us", ["v"], ("web",))
+    assert shell.execute("deploy") == ("us", ["v"], ())
+
+    shell.execute(".unset region -v")
+    assert shell.execute("deploy") == (None, [], ())
+    shell.execute(".set --region=ap")
+    assert shell.session_args() == ["--region=ap"]
+
+
+def test_errors_are_reported_and_the_loop_continues(shell, monkeypatch, capsys):
+    lines = iter(["nope", "deploy status --format=xml", "deploy 'unclosed",
+                  "deploy status", ".exit", "dump"])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(lines))
+    shell.run()
+
+    out, err = capsys.readouterr()
+    assert out == "ok\n"
+    assert "Unknown command 'nope'" in err
+    assert "Invalid choice for --format" in err
+    assert "No closing quotation" in err
+    assert next(lines) == "dump"
+
+
+def test_completion_from_live_registry(shell, registry):
+    assert shell.candidates("", "de") == ["deploy"]
+    assert shell.candidates("", ".se") == [".set"]
+    assert shell.candidates("deploy ", "") == ["status"]
+    assert shell.candidates("deploy status ", "--f") == ["--format"]
+
+    registry.register(lambda args, ctx=None: None, "debug")
+    assert shell.candidates("", "de") == ["debug", "deploy"]
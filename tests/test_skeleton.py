@@ -1,9 +0,0 @@
-import pytest
-
-from rcli.skeleton import fib, main
-
-__author__ = "rrenode"
-__copyright__ = "rrenode"
-__license__ = "MIT"
-
-#TODO: This, tests... duh